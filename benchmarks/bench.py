@@ -0,0 +1,340 @@
+"""Benchmark suite for the enrichment hot path.
+
+    python benchmarks/bench.py                          # 1k and 100k numbers
+    python benchmarks/bench.py --sizes 1k,100k,1m --spam-sizes 0,10k,1m
+    python benchmarks/bench.py --save-baseline          # store results as the baseline
+    python benchmarks/bench.py --check                  # exit 1 if anything regressed
+
+Every benchmark runs in its own subprocess against its own SQLite file, so
+the peak RSS reported is that benchmark's alone. Datasets are synthetic
+and seeded (see synthetic.py) and nothing touches the network or a
+display, so the suite runs the same on a headless CI box.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import parse_size, generate_numbers, write_numbers, fill_spam_reports
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_TOLERANCE = 0.25  # fraction a result may be worse than the baseline
+RSS_SLACK_MB = 16  # allocator noise ignored when comparing peak RSS
+
+BENCHMARKS = {}
+
+
+def benchmark(name, spam=False):
+    """Register a benchmark; spam=True runs it once per spam table size"""
+    def register(func):
+        BENCHMARKS[name] = (func, spam)
+        return func
+    return register
+
+
+def timed(calls):
+    """Run zero-argument callables, returning per-call latencies in nanoseconds"""
+    clock = time.perf_counter_ns
+    latencies = []
+    append = latencies.append
+    for call in calls:
+        start = clock()
+        call()
+        append(clock() - start)
+    return latencies
+
+
+def make_engine(ctx, **options):
+    """Engine on the benchmark's database, with metadata warm and the spam table filled"""
+    from telephony_engine import TelephonyEngine
+    from telephony_batch import warm_metadata
+
+    # Measure steady state, not phonenumbers' lazy first-use loading
+    warm_metadata()
+    engine = TelephonyEngine(ctx["db"], **options)
+    if ctx["spam_size"]:
+        fill_spam_reports(ctx["db"], ctx["spam_size"], ctx["numbers"])
+        engine.close()
+        engine = TelephonyEngine(ctx["db"], **options)  # preload the filled spam table
+    return engine
+
+
+# ==================== BENCHMARKS ====================
+
+@benchmark("detect_region")
+def bench_detect_region(ctx):
+    engine = make_engine(ctx)
+    detect = engine.detect_region_from_number
+    return {"latencies": timed(lambda n=n: detect(n) for n in ctx["numbers"])}
+
+
+@benchmark("get_number_details", spam=True)
+def bench_get_number_details(ctx):
+    """Cache on: the dataset's duplicate rate decides the hit rate"""
+    engine = make_engine(ctx)
+    details = engine.get_number_details
+    return {"latencies": timed(lambda n=n: details(n) for n in ctx["numbers"])}
+
+
+@benchmark("get_number_details_nocache", spam=True)
+def bench_get_number_details_nocache(ctx):
+    engine = make_engine(ctx, cache_size=0)
+    details = engine.get_number_details
+    return {"latencies": timed(lambda n=n: details(n) for n in ctx["numbers"])}
+
+
+@benchmark("calculate_spam_score", spam=True)
+def bench_calculate_spam_score(ctx):
+    engine = make_engine(ctx, cache_size=0)
+    args = []
+    for number in ctx["numbers"]:
+        record = engine.get_number_details(number)
+        if record is not None:
+            args.append((record.e164, record.carrier, record.country))
+    score = engine.calculate_spam_score
+    return {"latencies": timed(lambda a=a: score(*a) for a in args)}
+
+
+@benchmark("spam_score_many", spam=True)
+def bench_spam_score_many(ctx):
+    """Vectorized scoring of the enriched dataset's columns in one call"""
+    engine = make_engine(ctx, cache_size=0)
+    records = [r for r in (engine.get_number_details(n) for n in ctx["numbers"]) if r is not None]
+    numbers = [r.e164 for r in records]
+    carriers = [r.carrier for r in records]
+    countries = [r.country for r in records]
+    engine.scorer.score(numbers[:1], carriers[:1], countries[:1])  # import numpy outside the timing
+    start = time.perf_counter()
+    engine.scorer.score(numbers, carriers, countries)
+    return {"seconds": time.perf_counter() - start, "rows": len(records)}
+
+
+@benchmark("save_to_history")
+def bench_save_to_history(ctx):
+    """Per-call latency of queueing; throughput includes the final flush to disk"""
+    engine = make_engine(ctx)
+    rows = [(n, r) for n, r in ((n, engine.get_number_details(n)) for n in ctx["numbers"]) if r is not None]
+    save = engine.save_to_history
+    start = time.perf_counter()
+    latencies = timed(lambda row=row: save(*row) for row in rows)
+    engine.flush_history()
+    return {"latencies": latencies, "seconds": time.perf_counter() - start}
+
+
+@benchmark("load_history")
+def bench_load_history(ctx):
+    """Page through a history table with one row per dataset number"""
+    from telephony_history import history_row
+
+    engine = make_engine(ctx)
+    rows = [history_row(n, r) for n, r in ((n, engine.get_number_details(n)) for n in ctx["numbers"])
+            if r is not None]
+    with engine.conn:
+        engine.conn.executemany('''
+            INSERT INTO lookup_history (timestamp, phone_number, country, carrier, valid, spam_score, data)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+
+    fetched = 0
+    latencies = []
+    cursor = None
+    clock = time.perf_counter_ns
+    while True:
+        start = clock()
+        page, cursor = engine.history_page(cursor)
+        latencies.append(clock() - start)
+        fetched += len(page)
+        if cursor is None:
+            break
+    return {"latencies": latencies, "rows": fetched}
+
+
+@benchmark("batch_pipeline")
+def bench_batch_pipeline(ctx):
+    """End to end: read -> enrich on the worker pool -> stats -> CSV"""
+    from telephony_batch import run_pipeline
+
+    make_engine(ctx).close()
+    out = ctx["db"] + ".csv"
+    start = time.perf_counter()
+    stats = run_pipeline(ctx["numbers_path"], out, workers=ctx["workers"], db_path=ctx["db"])
+    seconds = time.perf_counter() - start
+    os.remove(out)
+    return {"seconds": seconds, "rows": stats.total + stats.failed}
+
+
+# ==================== RUNNER ====================
+
+def peak_rss_mb():
+    """Peak RSS of this process or any child it waited for, in MB (None where unsupported)"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def summarize(result, count):
+    """rows/sec, latency percentiles (microseconds) and peak RSS for one run"""
+    latencies = sorted(result.get("latencies") or ())
+    rows = result.get("rows", len(latencies) or count)
+    seconds = result.get("seconds", sum(latencies) / 1e9)
+    summary = {"rows": rows, "seconds": round(seconds, 4),
+               "rows_per_sec": round(rows / seconds, 1) if seconds else None}
+    if latencies:
+        def pct(p):
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] / 1000, 2)
+        summary.update(p50_us=pct(0.50), p90_us=pct(0.90), p99_us=pct(0.99),
+                       max_us=round(latencies[-1] / 1000, 2))
+    summary["peak_rss_mb"] = round(peak_rss_mb(), 1) if peak_rss_mb() is not None else None
+    return summary
+
+
+def run_child(args):
+    """Subprocess entry point: run one benchmark and print its summary as JSON"""
+    with open(args.numbers_path, encoding="utf-8") as f:
+        numbers = [line.strip() for line in f if line.strip()]
+    ctx = {"numbers": numbers, "numbers_path": args.numbers_path, "db": args.db,
+           "spam_size": args.spam_size, "workers": args.workers}
+    func, _ = BENCHMARKS[args.run]
+    print(json.dumps(summarize(func(ctx), len(numbers))))
+
+
+def run_suite(args):
+    os.makedirs(args.workdir, exist_ok=True)
+    env = dict(os.environ, TELEPHONY_OFFLINE="1", TELEPHONY_REGIONS="")
+    results = {}
+    names = args.only or list(BENCHMARKS)
+    for size in args.sizes:
+        numbers_path = os.path.join(args.workdir, f"numbers-{size}-{args.seed}.txt")
+        if not os.path.exists(numbers_path):
+            write_numbers(numbers_path, generate_numbers(size, args.seed, args.duplicate_rate))
+        for name in names:
+            _, spam = BENCHMARKS[name]
+            for spam_size in (args.spam_sizes if spam else [0]):
+                key = f"{name}/{size}" + (f"/spam{spam_size}" if spam else "")
+                db = os.path.join(args.workdir, f"{name}-{size}-{spam_size}.db")
+                for suffix in ("", "-wal", "-shm"):
+                    if os.path.exists(db + suffix):
+                        os.remove(db + suffix)
+                proc = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--run", name, "--numbers-path", numbers_path,
+                     "--db", db, "--spam-size", str(spam_size), "--workers", str(args.workers)],
+                    env=env, capture_output=True, text=True)
+                if proc.returncode != 0:
+                    print(f"{key}: FAILED\n{proc.stderr}", file=sys.stderr)
+                    results[key] = {"error": proc.stderr.strip().splitlines()[-1:]}
+                    continue
+                results[key] = json.loads(proc.stdout.strip().splitlines()[-1])
+                print(format_row(key, results[key]), flush=True)
+    return results
+
+
+def format_row(key, r):
+    def show(value, spec):
+        return format(value, spec) if value is not None else "—"
+    return (f"{key:<48} {show(r.get('rows_per_sec'), ',.0f'):>12} rows/s  "
+            f"p50 {show(r.get('p50_us'), '.1f'):>8}µs  p99 {show(r.get('p99_us'), '.1f'):>8}µs  "
+            f"rss {show(r.get('peak_rss_mb'), '.0f'):>5}MB")
+
+
+def compare(results, baseline, tolerance):
+    """Human-readable regressions against the baseline (empty if none)"""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base or "error" in result:
+            continue
+        if base.get("rows_per_sec") and result.get("rows_per_sec") is not None:
+            if result["rows_per_sec"] < base["rows_per_sec"] * (1 - tolerance):
+                regressions.append(f"{key}: {result['rows_per_sec']:,.0f} rows/s vs baseline "
+                                   f"{base['rows_per_sec']:,.0f}")
+        if base.get("peak_rss_mb") and result.get("peak_rss_mb") is not None:
+            if result["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance) + RSS_SLACK_MB:
+                regressions.append(f"{key}: peak RSS {result['peak_rss_mb']:.0f}MB vs baseline "
+                                   f"{base['peak_rss_mb']:.0f}MB")
+    return regressions
+
+
+def build_parser():
+    def sizes(value):
+        return [parse_size(s) for s in value.split(",") if s.strip()]
+
+    parser = argparse.ArgumentParser(description="Enrichment hot-path benchmarks")
+    parser.add_argument("--sizes", type=sizes, default=[1000, 100000],
+                        help="Dataset sizes, e.g. 1k,100k,1m (default: 1k,100k)")
+    parser.add_argument("--spam-sizes", type=sizes, default=[0, 10000],
+                        help="spam_reports table sizes for spam-sensitive benchmarks (default: 0,10k)")
+    parser.add_argument("--duplicate-rate", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1),
+                        help="Worker processes for batch_pipeline")
+    parser.add_argument("--only", type=lambda v: [b for b in v.split(",") if b], default=None,
+                        help="Comma-separated benchmarks to run: " + ", ".join(BENCHMARKS))
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "telephony-bench"),
+                        help="Where datasets and scratch databases go")
+    parser.add_argument("--json", help="Also write results to this file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if a result regressed past --tolerance")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+
+    # Internal: run a single benchmark in this process
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    parser.add_argument("--numbers-path", help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    parser.add_argument("--spam-size", type=int, default=0, help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.run:
+        run_child(args)
+        return 0
+    unknown = set(args.only or ()) - set(BENCHMARKS)
+    if unknown:
+        print(f"Unknown benchmarks: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+
+    results = run_suite(args)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    status = 1 if any("error" in r for r in results.values()) else 0
+    if args.check:
+        if not os.path.exists(args.baseline):
+            print(f"No baseline at {args.baseline}; run with --save-baseline first", file=sys.stderr)
+            return 2
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            status = 1
+        else:
+            print(f"No regressions against {args.baseline}", file=sys.stderr)
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+        baseline.update({k: v for k, v in results.items() if "error" not in v})
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}", file=sys.stderr)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""Load generator for the HTTP enrichment service.
+
+    python benchmarks/loadgen.py                                  # starts a local service
+    python benchmarks/loadgen.py --connections 64 --requests 50000 --workers 4
+    python benchmarks/loadgen.py --url http://127.0.0.1:8321 --mode bulk --bulk-size 1000
+
+Each connection is a keep-alive HTTP/1.1 client sending requests back to
+back, so --connections is the concurrency. Numbers come from the same
+seeded synthetic datasets as bench.py; the duplicate rate decides how
+much request coalescing and the workers' caches can help. Reports
+requests/sec, numbers/sec, latency percentiles and the status codes
+seen (503 = shed by backpressure).
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from collections import Counter
+from urllib.parse import urlsplit, quote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import parse_size, generate_numbers
+
+CLI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "telephony_cli.py")
+STARTUP_TIMEOUT = 120  # seconds for the service's workers to warm up
+
+
+async def read_response(reader):
+    """(status, body) of one Content-Length or chunked response"""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if "chunked" in headers.get("transfer-encoding", ""):
+        parts = []
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).strip(), 16)
+            data = await reader.readexactly(size + 2)
+            if not size:
+                return status, b"".join(parts)
+            parts.append(data[:-2])
+    return status, await reader.readexactly(int(headers.get("content-length", 0)))
+
+
+def build_requests(host, numbers, mode, bulk_size, advanced):
+    """(raw request bytes, numbers it carries) in send order"""
+    requests = []
+    if mode == "single":
+        for number in numbers:
+            target = f"/v1/lookup?number={quote(number)}&advanced={int(advanced)}"
+            requests.append((f"GET {target} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode(), 1))
+        return requests
+    accept = "Accept: application/x-ndjson\r\n" if mode == "ndjson" else ""
+    for i in range(0, len(numbers), bulk_size):
+        chunk = numbers[i:i + bulk_size]
+        body = json.dumps({"numbers": chunk, "advanced": advanced}).encode()
+        head = (f"POST /v1/bulk HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n{accept}"
+                f"Content-Length: {len(body)}\r\n\r\n")
+        requests.append((head.encode() + body, len(chunk)))
+    return requests
+
+
+async def connection(host, port, requests, results):
+    """Send requests one after another over a single keep-alive connection"""
+    reader, writer = await asyncio.open_connection(host, port)
+    clock = time.perf_counter_ns
+    try:
+        for request, count in requests:
+            start = clock()
+            writer.write(request)
+            status, _ = await read_response(reader)
+            results.append((clock() - start, status, count))
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, requests, connections):
+    results = []
+    # Deal requests round-robin so every connection gets a similar mix
+    lanes = [requests[i::connections] for i in range(connections)]
+    start = time.perf_counter()
+    await asyncio.gather(*(connection(host, port, lane, results) for lane in lanes if lane))
+    return results, time.perf_counter() - start
+
+
+def summarize(results, seconds):
+    latencies = sorted(r[0] for r in results)
+    statuses = Counter(r[1] for r in results)
+    numbers = sum(r[2] for r in results if r[1] in (200, 422))
+
+    def pct(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] / 1000, 1)
+
+    return {"requests": len(results), "seconds": round(seconds, 3),
+            "requests_per_sec": round(len(results) / seconds, 1),
+            "numbers_per_sec": round(numbers / seconds, 1),
+            "p50_us": pct(0.50), "p90_us": pct(0.90), "p99_us": pct(0.99),
+            "max_us": round(latencies[-1] / 1000, 1),
+            "statuses": {str(k): v for k, v in sorted(statuses.items())}}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_service(args):
+    """Launch telephony_cli.py serve on a scratch database; returns (process, url)"""
+    port = free_port()
+    db = os.path.join(tempfile.mkdtemp(prefix="telephony-loadgen-"), "service.db")
+    env = dict(os.environ, TELEPHONY_OFFLINE="1", TELEPHONY_REGIONS="")
+    proc = subprocess.Popen([sys.executable, CLI, "--db", db, "serve", "--port", str(port),
+                             "-j", str(args.workers)], env=env, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("Service exited during startup")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return proc, url
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("Service did not start in time")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Load generator for the enrichment service")
+    parser.add_argument("--url", default=None, help="Service to load (default: start a local one)")
+    parser.add_argument("--mode", choices=("single", "bulk", "ndjson"), default="single",
+                        help="GET /v1/lookup per number, or POST /v1/bulk as JSON or streamed NDJSON")
+    parser.add_argument("--requests", type=parse_size, default=20000,
+                        help="Numbers to send, e.g. 20k (default: 20k)")
+    parser.add_argument("--connections", type=int, default=32, help="Concurrent keep-alive connections")
+    parser.add_argument("--bulk-size", type=int, default=500, help="Numbers per bulk request")
+    parser.add_argument("--advanced", action="store_true", help="Request advanced lookups")
+    parser.add_argument("--duplicate-rate", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1),
+                        help="Worker processes for a locally started service")
+    parser.add_argument("--json", help="Also write the summary to this file")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    proc = None
+    url = args.url
+    if url is None:
+        proc, url = start_service(args)
+    try:
+        parts = urlsplit(url)
+        host, port = parts.hostname, parts.port or 80
+        numbers = generate_numbers(args.requests, args.seed, args.duplicate_rate)
+        requests = build_requests(host, numbers, args.mode, args.bulk_size, args.advanced)
+        results, seconds = asyncio.run(run_load(host, port, requests, args.connections))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    summary = summarize(results, seconds)
+    print(f"{args.mode} x{args.connections} connections: {summary['requests_per_sec']:,.0f} req/s  "
+          f"{summary['numbers_per_sec']:,.0f} numbers/s  p50 {summary['p50_us']:,.0f}µs  "
+          f"p90 {summary['p90_us']:,.0f}µs  p99 {summary['p99_us']:,.0f}µs  statuses {summary['statuses']}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    return 0 if set(summary["statuses"]) <= {"200", "422"} else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""Cold-start budget check for the GUI and the headless modules.
+
+    python benchmarks/startup.py                  # measure and compare with the budget
+    python benchmarks/startup.py --save-baseline  # store these timings as this machine's budget
+    python benchmarks/startup.py --check          # exit 1 if over budget
+
+Each import is timed in a fresh interpreter (median of --repeats runs),
+so nothing is served from an already-warm sys.modules. Besides time it
+checks what got imported: headless modules must never load the GUI or
+plotting stack, and neither they nor the GUI may load the phonenumbers
+prefix data (~0.5s) at import time; that happens on first enrichment or
+in the GUI's background preload. First paint (window built and drawn)
+is only measured when a display is available.
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+from statistics import median
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_baseline.json")
+DEFAULT_TOLERANCE = 0.25
+
+GUI_MODULES = ("tkinter", "PIL", "matplotlib", "folium", "geopy", "requests")
+PREFIX_DATA = ("phonenumbers.geodata", "phonenumbers.carrierdata", "phonenumbers.tzdata")
+
+# module -> top-level packages (or module prefixes) it must not import
+IMPORTS = {
+    "telephony_engine": GUI_MODULES + PREFIX_DATA,
+    "telephony_batch": GUI_MODULES + PREFIX_DATA,
+    "telephony_service": GUI_MODULES + PREFIX_DATA,
+    "telephony_cli": GUI_MODULES + PREFIX_DATA + ("telephony_service", "asyncio", "concurrent.futures"),
+    "add_some_2": GUI_MODULES[1:] + PREFIX_DATA + ("asyncio",),
+}
+
+# Budgets (ms) used when this machine has no saved baseline
+DEFAULT_BUDGET_MS = {
+    "import:telephony_engine": 150,
+    "import:telephony_batch": 200,
+    "import:telephony_service": 300,
+    "import:telephony_cli": 300,
+    "import:add_some_2": 300,
+    "first_paint": 1500,
+}
+
+IMPORT_CHILD = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+print(json.dumps({{"ms": (time.perf_counter() - start) * 1000, "modules": sorted(sys.modules)}}))
+"""
+
+PAINT_CHILD = """
+import time, json
+start = time.perf_counter()
+from add_some_2 import TelephonyGUI
+app = TelephonyGUI()
+app.update_idletasks()
+app.update()
+print(json.dumps({"ms": (time.perf_counter() - start) * 1000}))
+app.on_close()
+"""
+
+
+def run_child(code, workdir):
+    env = dict(os.environ, TELEPHONY_OFFLINE="1", TELEPHONY_PRELOAD="0", TELEPHONY_METRICS="0",
+               PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    proc = subprocess.run([sys.executable, "-c", code], cwd=workdir, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError((proc.stderr.strip().splitlines() or ["failed"])[-1])
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def forbidden_imports(modules, banned):
+    return sorted(m for m in modules if any(m == b or m.startswith(b + ".") for b in banned))
+
+
+def measure(args):
+    """(timings in ms, problems) for every import target and first paint"""
+    workdir = tempfile.mkdtemp(prefix="telephony-startup-")
+    timings, problems = {}, []
+    for module, banned in IMPORTS.items():
+        key = f"import:{module}"
+        try:
+            runs = [run_child(IMPORT_CHILD.format(module=module), workdir) for _ in range(args.repeats)]
+        except RuntimeError as e:
+            print(f"{key:<32} skipped ({e})")
+            continue
+        timings[key] = round(median(r["ms"] for r in runs), 1)
+        leaked = forbidden_imports(runs[0]["modules"], banned)
+        if leaked:
+            problems.append(f"{module} imports {', '.join(leaked[:8])}" + (" ..." if len(leaked) > 8 else ""))
+        print(f"{key:<32} {timings[key]:>8.1f} ms")
+
+    if os.environ.get("DISPLAY") or sys.platform in ("win32", "darwin"):
+        try:
+            timings["first_paint"] = round(median(run_child(PAINT_CHILD, workdir)["ms"]
+                                                  for _ in range(args.repeats)), 1)
+            print(f"{'first_paint':<32} {timings['first_paint']:>8.1f} ms")
+        except RuntimeError as e:
+            print(f"{'first_paint':<32} skipped ({e})")
+    else:
+        print(f"{'first_paint':<32} skipped (no display)")
+    return timings, problems
+
+
+def over_budget(timings, budget, tolerance):
+    """Human-readable budget overruns (empty if none)"""
+    overruns = []
+    for key, ms in timings.items():
+        limit = budget.get(key)
+        if limit is not None and ms > limit * (1 + tolerance):
+            overruns.append(f"{key}: {ms:.0f} ms, budget {limit:.0f} ms (+{tolerance:.0%})")
+    return overruns
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Import-time and first-paint budget check")
+    parser.add_argument("--repeats", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these timings as the budget")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if over budget")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    timings, problems = measure(args)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(timings, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+
+    budget = dict(DEFAULT_BUDGET_MS)
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            budget.update(json.load(f))
+    overruns = over_budget(timings, budget, args.tolerance)
+
+    for problem in problems:
+        print(f"IMPORT LEAK: {problem}", file=sys.stderr)
+    for overrun in overruns:
+        print(f"OVER BUDGET: {overrun}", file=sys.stderr)
+    if problems or (args.check and overruns):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
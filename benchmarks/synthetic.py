@@ -0,0 +1,116 @@
+"""Synthetic datasets for the benchmark suite.
+
+Numbers are generated from the phonenumbers example numbers of a spread
+of regions with randomised subscriber digits, then written in a mix of
+E.164, 00-prefixed and national formats (national only for regions in
+the engine's default candidate list, as real national input would be).
+Everything is driven by a seeded Random so runs are reproducible.
+"""
+import random
+import sqlite3
+
+import phonenumbers
+from phonenumbers import PhoneNumberFormat, PhoneNumberType
+
+# Regions numbers are drawn from, with relative weights
+REGIONS = {"US": 30, "IN": 20, "GB": 15, "CA": 5, "DE": 5, "FR": 5, "BR": 5, "JP": 3,
+           "AU": 3, "CN": 3, "NG": 2, "MX": 2, "AE": 1, "ZA": 1}
+NATIONAL_REGIONS = ("US", "IN", "GB")
+
+# Input format mix: E.164, 00-prefixed international, national, unparseable junk
+DEFAULT_MIX = {"e164": 0.55, "00": 0.2, "national": 0.2, "junk": 0.05}
+DEFAULT_DUPLICATE_RATE = 0.3
+
+_TYPES = (PhoneNumberType.MOBILE, PhoneNumberType.FIXED_LINE)
+
+
+def parse_size(text):
+    """'1k' -> 1000, '1m' -> 1000000, '250' -> 250"""
+    text = text.strip().lower()
+    scale = {"k": 1000, "m": 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def _templates():
+    templates = []
+    for region, weight in REGIONS.items():
+        for number_type in _TYPES:
+            example = phonenumbers.example_number_for_type(region, number_type)
+            if example is not None:
+                templates.append((region, example, weight))
+    return templates
+
+
+def random_number(rng, templates, weights):
+    """A PhoneNumber shaped like a real one: example prefix, random subscriber digits"""
+    region, example, _ = rng.choices(templates, weights)[0]
+    digits = str(example.national_number)
+    keep = max(1, len(digits) - 6)
+    national = digits[:keep] + "".join(rng.choice("0123456789") for _ in range(len(digits) - keep))
+    return region, phonenumbers.PhoneNumber(country_code=example.country_code, national_number=int(national))
+
+
+def format_input(rng, region, num, mix):
+    """Render a number the way it might appear in an input file"""
+    kind = rng.choices(list(mix), list(mix.values()))[0]
+    if kind == "national" and region not in NATIONAL_REGIONS:
+        kind = "e164"
+    if kind == "junk":
+        return "".join(rng.choice("0123456789abc-") for _ in range(rng.randint(3, 9)))
+    if kind == "national":
+        return phonenumbers.format_number(num, PhoneNumberFormat.NATIONAL)
+    e164 = phonenumbers.format_number(num, PhoneNumberFormat.E164)
+    return "00" + e164[1:] if kind == "00" else e164
+
+
+def generate_numbers(count, seed=0, duplicate_rate=DEFAULT_DUPLICATE_RATE, mix=None):
+    """count input lines, about duplicate_rate of which repeat an earlier number"""
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    templates = _templates()
+    weights = [w for _, _, w in templates]
+    unique = max(1, int(count * (1 - duplicate_rate)))
+    pool = [format_input(rng, *random_number(rng, templates, weights), mix) for _ in range(unique)]
+    numbers = pool + [rng.choice(pool) for _ in range(count - unique)]
+    rng.shuffle(numbers)
+    return numbers
+
+
+def write_numbers(path, numbers):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(numbers))
+        f.write("\n")
+
+
+def fill_spam_reports(db_path, count, numbers=(), seed=0, hit_rate=0.05):
+    """Insert count spam reports; about hit_rate of them are numbers from the dataset
+
+    The engine must already have created the schema. Reported dataset numbers
+    are stored in E.164 form like the app stores them.
+    """
+    rng = random.Random(seed + 1)
+    templates = _templates()
+    weights = [w for _, _, w in templates]
+    known = []
+    for number in numbers[:int(count * hit_rate) * 2]:
+        if number.startswith("+"):
+            known.append(number)
+    spam_types = ("Telemarketing", "Scam", "Robocall", None)
+
+    def rows():
+        for i in range(count):
+            if i < len(known) and i < count * hit_rate:
+                e164 = known[i]
+            else:
+                e164 = phonenumbers.format_number(random_number(rng, templates, weights)[1],
+                                                  PhoneNumberFormat.E164)
+            yield e164, rng.randint(1, 5), rng.choice(spam_types)
+
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("DELETE FROM spam_reports")
+        # phone_number is unique, so a number drawn twice gets both counts
+        conn.executemany("INSERT INTO spam_reports (phone_number, report_count, spam_type) VALUES (?, ?, ?) "
+                         "ON CONFLICT(phone_number) DO UPDATE SET report_count = report_count + excluded.report_count",
+                         rows())
+    conn.close()
@@ -0,0 +1,560 @@
+"""Batch enrichment helpers for the Telephony Intelligence Suite.
+
+Large files are split into chunks and enriched on a pool of worker
+processes; results stream back in input order. Batches are deduplicated
+first: each distinct number (in whatever spelling) is enriched once and
+its record fanned back out to every line that held it. run_pipeline chains
+read -> enrich -> stats -> write as generator stages joined by bounded
+queues, so memory stays flat however large the input is. Either can run a
+batch as a checkpointed job (telephony_jobs) that resumes where it stopped.
+"""
+import os
+import sys
+import time
+import queue
+import itertools
+import threading
+import multiprocessing
+from collections import deque, OrderedDict
+
+import phonenumbers
+from phonenumbers import NumberParseException
+
+from telephony_engine import TelephonyEngine, DEFAULT_DB_PATH
+from telephony_history import HistoryWriter
+from telephony_columns import BatchStats
+from telephony_export import open_exporter
+from telephony_prefixes import warm_index
+from telephony_jobs import JobStore
+from telephony_metrics import METRICS
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_BUFFER_SIZE = 10000
+DEFAULT_DEDUPE_SIZE = 100000  # distinct spellings (and numbers) remembered by enrich_unique
+
+# Per-process engine, created by _init_worker
+_worker_engine = None
+_worker_advanced = False
+
+_T_WAIT = METRICS.timer("batch_wait")
+_T_CHUNK = METRICS.timer("batch_chunk")
+_C_ROWS = METRICS.counter("batch_rows")
+_C_FAILED = METRICS.counter("batch_failed")
+
+
+def warm_metadata():
+    """Load phonenumbers metadata and prefix data up front instead of on first use"""
+    from phonenumbers import geocoder, carrier, timezone
+
+    for region in phonenumbers.SUPPORTED_REGIONS:
+        for num in (phonenumbers.example_number(region),
+                    phonenumbers.example_number_for_type(region, phonenumbers.PhoneNumberType.MOBILE)):
+            if num is None:
+                continue
+            geocoder.description_for_number(num, "en")
+            carrier.name_for_number(num, "en")
+            timezone.time_zones_for_number(num)
+
+
+def _init_worker(db_path, advanced, engine_options, metrics=False):
+    """Process pool initializer: warm metadata and open a private engine"""
+    global _worker_engine, _worker_advanced
+    METRICS.enable(metrics)
+    warm_metadata()
+    _worker_engine = TelephonyEngine(db_path, **engine_options)
+    _worker_advanced = advanced
+
+
+def _enrich_chunk(chunk):
+    """Enrich one chunk inside a worker process
+
+    Returns (records, metrics) where metrics is the worker's stage timings
+    for this chunk (None when instrumentation is off), for the parent to merge.
+    """
+    with _T_CHUNK:
+        records = [_worker_engine.get_number_details(number, _worker_advanced) for number in chunk]
+    return records, METRICS.drain() if METRICS.enabled else None
+
+
+def chunked(iterable, size):
+    """Split an iterable into lists of at most size items"""
+    it = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _start_pool(workers, db_path, advanced, engine_options):
+    if advanced or engine_options.get("prefix_info"):
+        warm_index(db_path, engine_options.get("prefix_table"))
+    from concurrent.futures import ProcessPoolExecutor  # only parallel runs pay for the import
+
+    # spawn keeps Tk and open SQLite handles out of the workers
+    ctx = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker,
+                               initargs=(db_path, advanced, engine_options, METRICS.enabled))
+
+
+def _chunk_results(future):
+    """Wait for one _enrich_chunk future, fold in its metrics and return its records"""
+    with _T_WAIT:
+        results, worker_metrics = future.result()
+    if worker_metrics:
+        METRICS.merge(worker_metrics)
+    _C_ROWS.inc(len(results))
+    _C_FAILED.inc(results.count(None))
+    return results
+
+
+def enrich_parallel(numbers, workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                    db_path=DEFAULT_DB_PATH, advanced=False, **engine_options):
+    """Enrich numbers on a process pool, yielding records (or None) in input order
+
+    At most two chunks per worker are in flight, so the input is consumed
+    lazily and memory stays bounded regardless of file size. Extra keyword
+    arguments (regions, cache settings) configure each worker's engine.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        engine = TelephonyEngine(db_path, **engine_options)
+        try:
+            for record in engine.enrich_many(numbers, advanced):
+                _C_ROWS.inc()
+                if record is None:
+                    _C_FAILED.inc()
+                yield record
+        finally:
+            engine.close()
+        return
+
+    pool = _start_pool(workers, db_path, advanced, engine_options)
+    pending = deque()
+    finished = False
+    try:
+        chunks = chunked(numbers, chunk_size)
+        for chunk in itertools.islice(chunks, workers * 2):
+            pending.append(pool.submit(_enrich_chunk, chunk))
+        while pending:
+            future = pending.popleft()
+            for chunk in itertools.islice(chunks, 1):
+                pending.append(pool.submit(_enrich_chunk, chunk))
+            yield from _chunk_results(future)
+        finished = True
+    finally:
+        # On early exit (cancelled, consumer gone) drop queued chunks and
+        # return without waiting for the ones already running
+        pool.shutdown(wait=finished, cancel_futures=True)
+
+
+# ==================== DEDUPLICATION ====================
+
+class DedupeStats:
+    """How many batch rows repeated a number already seen earlier in the batch"""
+
+    def __init__(self):
+        self.rows = 0
+        self.unique = 0     # distinct numbers (by E.164)
+        self.repeated = 0   # rows identical to an earlier line
+        self.respelled = 0  # rows spelling an earlier number differently (+44..., 0044..., national)
+
+    @property
+    def duplicates(self):
+        return self.repeated + self.respelled
+
+    def summary(self):
+        rows = self.rows or 1
+        return (f"Duplicate Rows: {self.duplicates} ({self.duplicates/rows*100:.1f}%) - "
+                f"{self.repeated} repeated as written, {self.respelled} spelled differently\n"
+                f"Distinct Numbers Enriched: {self.unique}")
+
+
+_PENDING = object()
+
+
+def enrich_unique(numbers, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, db_path=DEFAULT_DB_PATH,
+                  advanced=False, dedupe=None, memo_size=DEFAULT_DEDUPE_SIZE, **engine_options):
+    """Enrich each distinct number once, yielding (input, record or None) for every line in order
+
+    Lines are deduplicated here on their exact (stripped) spelling, and each
+    new spelling is parsed and canonicalized to E.164 where it is enriched,
+    so with a pool the parsing fans out to the workers too. Spellings of one
+    number ('+91 98765 43210', '0091 98765 43210', a national '098765 43210')
+    are matched on the E.164 of their record: a single process enriches such
+    a number once, each worker's result cache serves the spellings it sees,
+    and every row of the number shares one record. National input resolves
+    against the candidate regions in order (see RegionIndex), so it only
+    joins its international spelling when that region is the first one it
+    is valid in.
+    Every row keeps its original input string. Up to memo_size distinct
+    spellings (and numbers) are remembered; a number seen again after it
+    has been forgotten is simply enriched again. Counts go to dedupe, a
+    DedupeStats, if given.
+    """
+    workers = workers or os.cpu_count() or 1
+    dedupe = dedupe if dedupe is not None else DedupeStats()
+    spellings = OrderedDict()  # stripped input -> [record], [_PENDING] until its chunk returns
+    known = OrderedDict()      # E.164 -> record, to spot and share other spellings of a number
+    rows = deque()             # (input, slot, first row of its spelling) not yet yielded, in input order
+    todo = []                  # (spelling, slot) waiting to be sent to a worker
+    inflight = deque()         # (future, slots) in submission order
+    # Rows parked behind a pending number before partial chunks are sent early
+    max_rows = chunk_size * workers * 4
+
+    def enrich_one(key):
+        """Parse and enrich one spelling in this process, reusing the record of an earlier spelling"""
+        try:
+            num = engine.region_index.resolve(key)[1]
+        except NumberParseException:
+            _C_FAILED.inc()
+            return None
+        record = known.get(phonenumbers.format_number(num, phonenumbers.PhoneNumberFormat.E164))
+        if record is None:
+            record = engine.enrich_parsed(num, advanced)
+            _C_ROWS.inc()
+        return record
+
+    def emit(number, slot, first):
+        """Count a row as it is yielded, in input order, and share one record per number"""
+        record = slot[0]
+        if record is None:
+            pass
+        elif not first:
+            dedupe.repeated += 1
+        elif record.e164 in known:
+            dedupe.respelled += 1
+            known.move_to_end(record.e164)
+            record = slot[0] = known[record.e164]
+        else:
+            dedupe.unique += 1
+            known[record.e164] = record
+            if len(known) > memo_size:
+                known.popitem(last=False)
+        return number, record
+
+    def submit():
+        inflight.append((pool.submit(_enrich_chunk, [key for key, _ in todo]), [slot for _, slot in todo]))
+        todo.clear()
+
+    def complete():
+        future, chunk_slots = inflight.popleft()
+        for slot, record in zip(chunk_slots, _chunk_results(future)):
+            slot[0] = record
+
+    engine = pool = None
+    if workers == 1:
+        engine = TelephonyEngine(db_path, **engine_options)
+    else:
+        pool = _start_pool(workers, db_path, advanced, engine_options)
+    finished = False
+    try:
+        for number in numbers:
+            dedupe.rows += 1
+            key = number.strip()
+            slot = spellings.get(key)
+            first = slot is None
+            if first:
+                slot = spellings[key] = [_PENDING]
+                if len(spellings) > memo_size:
+                    spellings.popitem(last=False)
+                if engine is not None:
+                    slot[0] = enrich_one(key)
+                else:
+                    todo.append((key, slot))
+            else:
+                spellings.move_to_end(key)
+            rows.append((number, slot, first))
+
+            if pool is not None:
+                if len(todo) >= chunk_size or (todo and len(rows) > max_rows):
+                    submit()
+                while inflight and (len(inflight) > workers * 2 or len(rows) > max_rows
+                                    or inflight[0][0].done()):
+                    complete()
+            while rows and rows[0][1][0] is not _PENDING:
+                yield emit(*rows.popleft())
+
+        if todo:
+            submit()
+        while inflight:
+            complete()
+        while rows:
+            yield emit(*rows.popleft())
+        finished = True
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=finished, cancel_futures=True)
+        if engine is not None:
+            engine.close()
+
+
+# ==================== STREAMING PIPELINE ====================
+
+def read_numbers(path):
+    """Yield non-empty, stripped lines from a text/CSV file ('-' for stdin)"""
+    f = sys.stdin if path == '-' else open(path, "r", encoding="utf-8")
+    try:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+_DONE = object()
+
+
+def buffered(iterable, maxsize=DEFAULT_BUFFER_SIZE):
+    """Run an upstream stage on a background thread behind a bounded queue
+
+    The producer blocks once maxsize items are waiting, so a slow consumer
+    applies backpressure instead of letting the buffer grow.
+    """
+    buf = queue.Queue(maxsize)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buf.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(e)
+        finally:
+            # Release upstream resources (files, worker pools) on early exit
+            if hasattr(iterable, 'close'):
+                iterable.close()
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buf.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+class BatchRunner:
+    """Run a batch file through enrich_unique on a background thread
+
+    (input, record) rows are posted to the results queue in lists of up to
+    post_size, followed by a final None; dedupe counts the duplicates. progress() may be polled from any
+    thread and cancel() stops the run at the next record. An optional
+    Exporter is written to on the runner thread as records arrive and is
+    closed when the run ends. With job (a JobStore job id) the run is
+    checkpointed: the job's stored rows are posted first (resumed of them)
+    and reading continues from its saved offset.
+    """
+
+    def __init__(self, path, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, db_path=DEFAULT_DB_PATH,
+                 post_size=500, exporter=None, job=None, **engine_options):
+        self.path = path
+        self.exporter = exporter
+        self.job = job
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.db_path = db_path
+        self.post_size = post_size
+        self.engine_options = engine_options
+
+        self.results = queue.Queue()
+        self.error = None
+        self.rows = 0
+        self.dedupe = DedupeStats()
+        self.bytes_read = 0
+        self.resumed = 0
+        self.total_bytes = os.path.getsize(path)
+        if job is not None:
+            jobs = JobStore(db_path)
+            try:
+                saved = jobs.get(job)
+            finally:
+                jobs.close()
+            self.bytes_read = saved.offset
+            self.resumed = saved.rows
+        self.started = None
+        self.finished = None
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="batch-runner", daemon=True)
+
+    def start(self):
+        self.started = time.monotonic()
+        self._thread.start()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def join(self, timeout=None):
+        """Wait for the run to end (and a job's last checkpoint to be written); True if it has"""
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def _counted(self, numbers):
+        for number in numbers:
+            self.bytes_read += len(number) + 1  # byte estimate; input is ASCII digits
+            yield number
+
+    def _enrich(self, numbers):
+        return enrich_unique(self._counted(numbers), self.workers, self.chunk_size, self.db_path,
+                             dedupe=self.dedupe, **self.engine_options)
+
+    def _run(self):
+        jobs = rows = None
+        batch = []
+        try:
+            if self.job is None:
+                rows = self._enrich(read_numbers(self.path))
+            else:
+                jobs = JobStore(self.db_path)
+                rows = jobs.run(self.job, self._enrich)
+            for number, details in rows:
+                if self._cancel.is_set():
+                    break
+                self.rows += 1
+                batch.append((number, details))
+                if self.exporter is not None:
+                    self.exporter.write(details, number)
+                if len(batch) >= self.post_size:
+                    self.results.put(batch)
+                    batch = []
+        except Exception as e:
+            self.error = e
+        finally:
+            if rows is not None:
+                rows.close()  # writes the job's last checkpoint
+            if jobs is not None:
+                jobs.close()
+            if self.exporter is not None:
+                try:
+                    self.exporter.close()
+                except Exception as e:
+                    self.error = self.error or e
+            if batch:
+                self.results.put(batch)
+            self.finished = time.monotonic()
+            self.results.put(None)
+
+    def progress(self):
+        """Rows done, throughput (rows/sec), completed fraction and ETA in seconds"""
+        elapsed = ((self.finished or time.monotonic()) - self.started) if self.started else 0
+        rate = max(self.rows - self.resumed, 0) / elapsed if elapsed > 0 else 0.0
+        fraction = min(self.bytes_read / self.total_bytes, 1.0) if self.total_bytes else 1.0
+        eta = elapsed * (1 - fraction) / fraction if fraction > 0 else None
+        return {"rows": self.rows, "rate": rate, "fraction": fraction, "eta": eta}
+
+
+# ==================== JOBS ====================
+
+def job_settings(fmt=None, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, buffer_size=DEFAULT_BUFFER_SIZE,
+                 history=False, columns=None, compression=None, memo_size=DEFAULT_DEDUPE_SIZE, **engine_options):
+    """The settings stored with a batch job (run_pipeline's arguments), every default filled in"""
+    return {"fmt": fmt, "workers": workers, "chunk_size": chunk_size, "buffer_size": buffer_size,
+            "history": history, "columns": list(columns) if columns else None, "compression": compression,
+            "memo_size": memo_size, "engine": engine_options}
+
+
+def create_job(db_path, input_path, output_path=None, **settings):
+    """Register a checkpointed batch job (see job_settings for settings) and return its id"""
+    jobs = JobStore(db_path)
+    try:
+        return jobs.create(input_path, output_path, job_settings(**settings))
+    finally:
+        jobs.close()
+
+
+def run_job(job, db_path=DEFAULT_DB_PATH):
+    """Run or resume a job with run_pipeline, writing to its output file; returns the BatchStats
+
+    Raises ValueError if the job cannot be resumed (finished, no output
+    file, or its input has changed).
+    """
+    jobs = JobStore(db_path)
+    try:
+        saved = jobs.get(job)
+        jobs.check_resumable(saved, output=True)
+    finally:
+        jobs.close()
+    settings = job_settings()
+    settings.update(saved.options)
+    engine_options = settings.pop("engine")
+    return run_pipeline(saved.input_path, saved.output_path, db_path=db_path, job=job,
+                        **settings, **engine_options)
+
+
+def record_history(rows, writer):
+    """Pipeline stage: queue each (input, record) row's record on a HistoryWriter and pass it through"""
+    for row in rows:
+        record = row[1]
+        if record is not None:
+            writer.record(record.international, record)
+        yield row
+
+
+def run_pipeline(input_path, output_path, fmt=None, workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 buffer_size=DEFAULT_BUFFER_SIZE, db_path=DEFAULT_DB_PATH, history=False,
+                 columns=None, compression=None, memo_size=DEFAULT_DEDUPE_SIZE, job=None, **engine_options):
+    """Stream a file through read -> enrich -> stats -> export in a single pass
+
+    Each distinct number is enriched once (see enrich_unique) inside the
+    enrich stage's worker processes, and its record is written out for
+    every line that spelled it. With history=True every record is also
+    queued on a write-behind HistoryWriter. fmt, columns and compression
+    are passed to open_exporter (fmt and compression default to the output
+    file's extension). With job (a JobStore job id for input_path) rows
+    are checkpointed as they finish; resuming replays the stored rows into
+    a rewritten output file and enriches only the rest. Returns the
+    BatchStats gathered along the way, including duplicate counts.
+    """
+    stats = BatchStats()
+    stats.dedupe = DedupeStats()
+    writer = HistoryWriter(db_path) if history else None
+
+    def enrich(numbers):
+        rows = buffered(enrich_unique(buffered(numbers, buffer_size), workers, chunk_size, db_path,
+                                      dedupe=stats.dedupe, memo_size=memo_size, **engine_options), buffer_size)
+        # Only freshly enriched rows: replayed job rows are in the history already
+        return record_history(rows, writer) if writer is not None else rows
+
+    jobs = None
+    if job is None:
+        source = enrich(read_numbers(input_path))
+    else:
+        jobs = JobStore(db_path)
+        source = jobs.run(job, enrich)
+    rows = stats.observe(source)
+    try:
+        exporter = open_exporter(output_path, fmt, columns, compression)
+        try:
+            exporter.write_rows(rows)
+        finally:
+            exporter.close()
+    finally:
+        source.close()  # writes the job's last checkpoint
+        if jobs is not None:
+            jobs.close()
+        if writer is not None:
+            writer.close()
+    return stats
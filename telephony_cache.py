@@ -0,0 +1,150 @@
+"""Enrichment result cache for the Telephony Intelligence Suite.
+
+Records are keyed by the canonical E.164 form so '+44 20...', '0044 20...'
+and a national '020...' share one entry. The in-memory tier is a bounded
+LRU with TTL expiry; an optional persistent tier lives in the same SQLite
+database as the history so a warm cache survives restarts.
+"""
+import time
+import threading
+from collections import OrderedDict
+
+from telephony_record import NumberRecord
+from telephony_metrics import METRICS
+
+DEFAULT_CACHE_SIZE = 100000
+DEFAULT_CACHE_TTL = 24 * 3600  # seconds
+PERSIST_BATCH = 500  # persistent writes buffered before a commit
+
+_T_DB_READ = METRICS.timer("cache_db_read")
+_T_DB_WRITE = METRICS.timer("cache_db_write")
+
+
+class ResultCache:
+    """Bounded LRU cache of enrichment records with TTL expiry"""
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE, ttl=DEFAULT_CACHE_TTL, conn=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.conn = conn
+        self._data = OrderedDict()  # (e164, advanced) -> (expires, record)
+        self._pending = []
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.persistent_hits = 0
+
+        if self.conn is not None:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS enrichment_cache (
+                    e164 TEXT,
+                    advanced INTEGER,
+                    expires REAL,
+                    data TEXT,
+                    PRIMARY KEY (e164, advanced)
+                )
+            ''')
+            self.conn.execute("DELETE FROM enrichment_cache WHERE expires < ?", (time.time(),))
+            self.conn.commit()
+
+    def get(self, e164, advanced):
+        """Return the cached record (shared, treat as read-only), or None on a miss"""
+        key = (e164, bool(advanced))
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._data[key]
+                self.expirations += 1
+
+            if self.conn is not None:
+                with _T_DB_READ:
+                    row = self.conn.execute(
+                        "SELECT expires, data FROM enrichment_cache WHERE e164 = ? AND advanced = ? AND expires > ?",
+                        (key[0], key[1], now)).fetchone()
+                # Rows written in an older format decode to None and count as misses
+                record = NumberRecord.from_json(row[1]) if row else None
+                if record is not None:
+                    self._store(key, row[0], record)
+                    self.hits += 1
+                    self.persistent_hits += 1
+                    return record
+
+            self.misses += 1
+            return None
+
+    def put(self, e164, advanced, record):
+        """Cache a record under its E.164 key"""
+        if self.maxsize <= 0:
+            return
+        key = (e164, bool(advanced))
+        expires = time.time() + self.ttl
+        with self._lock:
+            self._store(key, expires, record)
+            if self.conn is not None:
+                self._pending.append((key[0], key[1], expires, record.to_json()))
+                if len(self._pending) >= PERSIST_BATCH:
+                    self._flush()
+
+    def _store(self, key, expires, record):
+        self._data[key] = (expires, record)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, e164):
+        """Drop every cached record for a number (e.g. after a spam report)"""
+        with self._lock:
+            for advanced in (False, True):
+                self._data.pop((e164, advanced), None)
+            if self.conn is not None:
+                self._pending = [p for p in self._pending if p[0] != e164]
+                self.conn.execute("DELETE FROM enrichment_cache WHERE e164 = ?", (e164,))
+                self.conn.commit()
+
+    def clear(self):
+        """Drop all cached records"""
+        with self._lock:
+            self._data.clear()
+            self._pending = []
+            if self.conn is not None:
+                self.conn.execute("DELETE FROM enrichment_cache")
+                self.conn.commit()
+
+    def flush(self):
+        """Write buffered entries to the persistent tier"""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if self.conn is None or not self._pending:
+            return
+        with _T_DB_WRITE:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO enrichment_cache (e164, advanced, expires, data) VALUES (?, ?, ?, ?)",
+                self._pending)
+            self.conn.commit()
+        self._pending = []
+
+    def stats(self):
+        """Hit/miss/eviction counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "persistent_hits": self.persistent_hits,
+            }
@@ -0,0 +1,324 @@
+"""Command-line entry point for the headless enrichment engine.
+
+    python telephony_cli.py lookup +14155550123 00919876543210
+    python telephony_cli.py batch numbers.txt -o report.csv -j 8
+    python telephony_cli.py batch numbers.txt -o report.arrow --columns e164,country,spam_score
+    python telephony_cli.py batch huge.txt -o report.csv --checkpoint    (then: jobs list / jobs resume 3)
+    python telephony_cli.py serve --port 8321 -j 4
+    python telephony_cli.py --prefix-table prefixes.csv prefixes +442079460958
+"""
+import argparse
+import json
+import sys
+
+from telephony_engine import TelephonyEngine, DEFAULT_DB_PATH
+from telephony_cache import DEFAULT_CACHE_SIZE, DEFAULT_CACHE_TTL
+from telephony_batch import (run_pipeline, create_job, run_job, DEFAULT_CHUNK_SIZE, DEFAULT_BUFFER_SIZE,
+                             DEFAULT_DEDUPE_SIZE)
+from telephony_export import EXPORTERS, resolve_columns
+from telephony_metrics import METRICS
+from telephony_prefixes import compile_index, index_path_for, configured_table
+from telephony_jobs import JobStore
+from telephony_spam import IngestStats, INGEST_CHUNK
+
+
+def cmd_lookup(engine, args):
+    """Enrich the numbers given on the command line"""
+    status = 0
+    for number in args.numbers:
+        record = engine.get_number_details(number, advanced=True)
+        if record is None:
+            print(f"Could not parse number: {number}", file=sys.stderr)
+            status = 1
+            continue
+        if args.history:
+            engine.save_to_history(number, record)
+        print(json.dumps(record.display(), ensure_ascii=False))
+    return status
+
+
+def cmd_batch(engine, args):
+    """Stream a file of numbers to CSV, JSON lines or Arrow output in one pass"""
+    options = engine_options(args)
+    options["prefix_info"] = args.prefix_info or "prefix_info" in (args.columns or ())
+    settings = dict(fmt=args.format, workers=args.workers, chunk_size=args.chunk_size,
+                    buffer_size=args.buffer_size, history=args.history, columns=args.columns,
+                    compression=args.compress, memo_size=args.dedupe_size, **options)
+    if not args.checkpoint:
+        stats = run_pipeline(args.input, args.output, db_path=args.db, **settings)
+        print(stats.summary(), file=sys.stderr)
+        return 0
+    if args.input == "-" or args.output == "-":
+        print("--checkpoint needs an input file and an output file, not stdin/stdout", file=sys.stderr)
+        return 2
+    job = create_job(args.db, args.input, args.output, **settings)
+    print(f"Job {job}: {args.input} -> {args.output}", file=sys.stderr)
+    return _run_job(job, args.db)
+
+
+def _run_job(job, db_path):
+    """run_job, reporting how to resume if the job is interrupted"""
+    try:
+        stats = run_job(job, db_path)
+    except KeyboardInterrupt:
+        print(f"\nJob {job} paused; resume with: telephony_cli.py jobs resume {job}", file=sys.stderr)
+        return 130
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(stats.summary(), file=sys.stderr)
+    return 0
+
+
+def cmd_jobs(engine, args):
+    """List, resume or discard checkpointed batch jobs"""
+    jobs = JobStore(args.db)
+    try:
+        if args.action == "list":
+            for job in jobs.jobs():
+                print(f"{job.id:>5}  {job.status:<8} {job.rows:>12,} rows {job.fraction * 100:5.1f}%  "
+                      f"{job.updated}  {job.input_path} -> {job.output_path or '-'}"
+                      + (f"  ({job.error})" if job.error else ""))
+            return 0
+        if args.job is None:
+            print(f"jobs {args.action} needs a job id", file=sys.stderr)
+            return 2
+        try:
+            job = jobs.get(args.job)
+        except KeyError as e:
+            print(e.args[0], file=sys.stderr)
+            return 1
+        if args.action == "discard":
+            jobs.discard(job.id)
+            print(f"Job {job.id} discarded", file=sys.stderr)
+            return 0
+        try:
+            jobs.check_resumable(job, output=True)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+    finally:
+        jobs.close()
+    print(f"Resuming job {job.id} at row {job.rows:,} ({job.fraction * 100:.1f}% of the input)", file=sys.stderr)
+    return _run_job(job.id, args.db)
+
+
+def cmd_prefixes(engine, args):
+    """Compile the prefix index used by prefix analysis and print a few sample matches"""
+    path = index_path_for(args.db)
+    table = configured_table(args.prefix_table)
+    count = compile_index(path, table)
+    print(f"{count} prefixes compiled into {path}", file=sys.stderr)
+    for number in args.numbers:
+        record = engine.get_number_details(number)
+        if record is None:
+            print(f"Could not parse number: {number}", file=sys.stderr)
+            continue
+        print(f"{record.e164}: {engine.analyze_prefix(record.e164, str(record.calling_code))}")
+    return 0
+
+
+def cmd_spam_ingest(engine, args):
+    """Bulk-load spam report feeds into spam_reports, printing throughput per feed"""
+    total = IngestStats()
+    for path in args.feeds:
+        stats = engine.ingest_spam_feed(path, args.format, args.chunk_size)
+        print(f"{path}: {stats.summary()}", file=sys.stderr)
+        total.add(stats)
+    if len(args.feeds) > 1:
+        print(f"Total: {total.summary()}", file=sys.stderr)
+    return 0
+
+
+def cmd_flags(engine, args):
+    """Fill the on-disk flag cache from a local bundle and/or the flag CDN"""
+    from telephony_flags import FlagCache
+
+    flags = FlagCache(args.cache_dir, offline=args.offline)
+    count = flags.prewarm(bundle_dir=args.bundle)
+    print(f"{count} flags cached in {args.cache_dir} ({flags.fetches} downloaded)", file=sys.stderr)
+    return 0
+
+
+def cmd_geocode(engine, args):
+    """Import, build or export the offline geocode cache used for location maps"""
+    from telephony_geo import GeoResolver
+
+    geo = GeoResolver(args.db, offline=args.offline)
+    try:
+        if args.import_csv:
+            count = geo.import_csv(args.import_csv)
+            print(f"{count} locations imported from {args.import_csv}", file=sys.stderr)
+        if args.build_gazetteer:
+            def progress(done, total):
+                print(f"\r{done}/{total} locations geocoded", end="", file=sys.stderr)
+            count = geo.build_gazetteer(progress=progress)
+            print(f"\n{count} locations looked up", file=sys.stderr)
+        for query in args.queries:
+            coords = geo.resolve(query)
+            print(json.dumps({"query": query, "latitude": coords[0] if coords else None,
+                              "longitude": coords[1] if coords else None}, ensure_ascii=False))
+        if args.export_csv:
+            count = geo.export_csv(args.export_csv)
+            print(f"{count} locations exported to {args.export_csv}", file=sys.stderr)
+    finally:
+        geo.close()
+    return 0
+
+
+def cmd_serve(engine, args):
+    """Run the HTTP enrichment service until interrupted"""
+    # Only serve needs asyncio and the service, so other commands start without them
+    import asyncio
+    from telephony_service import EnrichmentService
+
+    # Options left unset fall back to the service's own defaults
+    options = {name: getattr(args, name) for name in SERVICE_OPTIONS if getattr(args, name) is not None}
+    service = EnrichmentService(workers=args.workers, db_path=args.db, **options, **engine_options(args))
+
+    def ready(service):
+        print(f"Serving on {service.url} with {service.workers} workers", file=sys.stderr)
+
+    try:
+        asyncio.run(service.serve_forever(ready))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+# serve options passed through to EnrichmentService when given
+SERVICE_OPTIONS = ("host", "port", "chunk_size", "max_pending", "max_connections")
+
+
+def export_columns(value):
+    """argparse type for --columns: validated schema attributes"""
+    try:
+        return resolve_columns(c for c in value.split(",") if c.strip())
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def engine_options(args):
+    """TelephonyEngine keyword arguments from the global options"""
+    return {
+        "regions": args.regions,
+        "cache_size": args.cache_size,
+        "cache_ttl": args.cache_ttl,
+        "persist_cache": args.persist_cache,
+        "prefix_table": args.prefix_table,
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Headless telephony number enrichment")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="SQLite database path")
+    parser.add_argument("--regions", type=lambda v: [r.strip() for r in v.split(",") if r.strip()],
+                        default=None, help="Candidate regions for national-format numbers, "
+                                           "e.g. IN,GB,US (default: $TELEPHONY_REGIONS or built-in list)")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE,
+                        help="Cached results kept in memory (0 disables the cache)")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_CACHE_TTL,
+                        help="Seconds before a cached result expires")
+    parser.add_argument("--persist-cache", action="store_true",
+                        help="Keep cached results in the SQLite database across runs")
+    parser.add_argument("--prefix-table", metavar="CSV", default=None,
+                        help="Extra prefix,description[,carrier] rows for prefix analysis "
+                             "(default: $TELEPHONY_PREFIXES)")
+    parser.add_argument("--metrics", metavar="PATH", default=None,
+                        help="Time every stage and write the results to PATH on exit "
+                             "(Prometheus text for .prom, JSON otherwise)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("lookup", help="Enrich one or more numbers")
+    p.add_argument("numbers", nargs="+")
+    p.add_argument("--history", action="store_true", help="Record lookups in history")
+    p.set_defaults(func=cmd_lookup)
+
+    p = sub.add_parser("batch", help="Enrich a file of numbers (one per line)")
+    p.add_argument("input", help="Input file, '-' for stdin")
+    p.add_argument("-o", "--output", default="-", help="Output file, '-' for stdout")
+    p.add_argument("--format", choices=sorted(EXPORTERS), default=None,
+                   help="Output format (default: from the output file extension, else csv)")
+    p.add_argument("--compress", choices=("gzip", "zstd"), default=None,
+                   help="Compress the output (default: from a .gz/.zst extension)")
+    p.add_argument("--columns", type=export_columns, default=None,
+                   help="Comma-separated columns to export, by attribute or label "
+                        "(e.g. e164,country,carrier,spam_score)")
+    p.add_argument("-j", "--workers", type=int, default=None,
+                   help="Worker processes (default: one per CPU core, 1 = in-process)")
+    p.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                   help="Numbers sent to a worker per task")
+    p.add_argument("--buffer-size", type=int, default=DEFAULT_BUFFER_SIZE,
+                   help="Maximum records queued between pipeline stages")
+    p.add_argument("--dedupe-size", type=int, default=DEFAULT_DEDUPE_SIZE,
+                   help="Distinct numbers remembered so repeats are enriched only once")
+    p.add_argument("--prefix-info", action="store_true",
+                   help="Include prefix analysis (implied by --columns with prefix_info)")
+    p.add_argument("--history", action="store_true", help="Record every number in lookup history")
+    p.add_argument("--checkpoint", action="store_true",
+                   help="Run as a resumable job: progress and results are checkpointed in the database")
+    p.set_defaults(func=cmd_batch)
+
+    p = sub.add_parser("jobs", help="List, resume or discard checkpointed batch jobs")
+    p.add_argument("action", nargs="?", choices=("list", "resume", "discard"), default="list")
+    p.add_argument("job", nargs="?", type=int, help="Job id (see jobs list)")
+    p.set_defaults(func=cmd_jobs)
+
+    p = sub.add_parser("prefixes", help="Compile the prefix analysis index")
+    p.add_argument("numbers", nargs="*", help="Numbers to show prefix matches for")
+    p.set_defaults(func=cmd_prefixes)
+
+    p = sub.add_parser("spam-ingest", help="Bulk-load spam report feeds (CSV or NDJSON)")
+    p.add_argument("feeds", nargs="+", help="Feed files ('-' for stdin, .gz allowed)")
+    p.add_argument("--format", choices=("csv", "ndjson"), default=None,
+                   help="Feed format (default: from the file extension, else csv)")
+    p.add_argument("--chunk-size", type=int, default=INGEST_CHUNK,
+                   help="Distinct numbers staged per merge into spam_reports")
+    p.set_defaults(func=cmd_spam_ingest)
+
+    p = sub.add_parser("flags", help="Prewarm the flag image cache")
+    p.add_argument("--bundle", default="flags", help="Directory of <code>.png files to import")
+    p.add_argument("--cache-dir", default="flag_cache")
+    p.add_argument("--offline", action="store_true", help="Never download, only import the bundle")
+    p.set_defaults(func=cmd_flags)
+
+    p = sub.add_parser("geocode", help="Manage the offline geocode cache for location maps")
+    p.add_argument("queries", nargs="*", help="Location queries to resolve, e.g. 'London, United Kingdom'")
+    p.add_argument("--import", dest="import_csv", metavar="CSV",
+                   help="Load query,latitude,longitude rows into the cache")
+    p.add_argument("--build-gazetteer", action="store_true",
+                   help="Geocode every location in the phonenumbers data (resumable, ~1 request/sec)")
+    p.add_argument("--export", dest="export_csv", metavar="CSV", help="Write the cache to a CSV file")
+    p.add_argument("--offline", action="store_true", help="Only answer from the cache, never geocode")
+    p.set_defaults(func=cmd_geocode)
+
+    p = sub.add_parser("serve", help="Serve lookups over HTTP (single, bulk JSON and NDJSON)")
+    p.add_argument("--host", default=None, help="Interface to listen on (default: 127.0.0.1)")
+    p.add_argument("--port", type=int, default=None, help="Port to listen on (default: 8321, 0 = any free port)")
+    p.add_argument("-j", "--workers", type=int, default=None,
+                   help="Worker processes (default: one per CPU core)")
+    p.add_argument("--chunk-size", type=int, default=None,
+                   help="Numbers sent to a worker per task (default: 256)")
+    p.add_argument("--max-pending", type=int, default=None,
+                   help="Queued numbers before single lookups are refused with 503")
+    p.add_argument("--max-connections", type=int, default=None)
+    p.set_defaults(func=cmd_serve)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.metrics:
+        METRICS.enable()
+    engine = TelephonyEngine(args.db, **engine_options(args))
+    try:
+        return args.func(engine, args)
+    finally:
+        engine.close()
+        if args.metrics:
+            METRICS.write(args.metrics)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
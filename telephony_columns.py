@@ -0,0 +1,332 @@
+"""Columnar batch result store for the Telephony Intelligence Suite.
+
+Instead of one NumberRecord per row, each field is kept as a column:
+low-cardinality fields (country, carrier, type, ...) as dictionary codes
+in an array, the per-row number strings packed into one UTF-8 buffer,
+validity flags and the spam score as one byte each.
+Counts, validity and the spam-score histogram are updated as rows are
+appended, so analytics are available at any point during a run.
+BatchStats keeps the same aggregates for pipelines that don't keep rows.
+"""
+import heapq
+from array import array
+from bisect import bisect_right
+from collections import Counter
+
+from telephony_record import NumberRecord, TYPE_MAP, SPAM_SCORE_MAX, format_value
+
+
+class CategoryColumn:
+    """Dictionary-encoded column with running per-value counts"""
+
+    def __init__(self):
+        self.codes = array('I')
+        self.values = []  # code -> value
+        self.index = {}   # value -> code
+        self.counts = []  # code -> rows with that value
+
+    def append(self, value):
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+            self.counts.append(0)
+        self.codes.append(code)
+        self.counts[code] += 1
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        return self.values[self.codes[i]]
+
+    def most_common(self, n=None):
+        """(value, count) pairs, most frequent first, like Counter.most_common"""
+        pairs = zip(self.values, self.counts)
+        if n is None:
+            return sorted(pairs, key=lambda p: p[1], reverse=True)
+        return heapq.nlargest(n, pairs, key=lambda p: p[1])
+
+    def counter(self):
+        return Counter(dict(zip(self.values, self.counts)))
+
+    def encoded(self):
+        """(per-row codes, code -> value)"""
+        return self.codes, self.values
+
+
+class TextColumn:
+    """Per-row strings packed into one UTF-8 buffer with end offsets"""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.ends = array('Q')
+
+    def append(self, value):
+        self.data += value.encode("utf-8")
+        self.ends.append(len(self.data))
+
+    def __len__(self):
+        return len(self.ends)
+
+    def __getitem__(self, i):
+        start = self.ends[i - 1] if i else 0
+        return self.data[start:self.ends[i]].decode("utf-8")
+
+    def encoded(self):
+        return None  # every row has its own value
+
+    def rows_containing(self, text):
+        """Indexes of rows whose value contains text, ignoring ASCII case, found in the packed buffer"""
+        needle = text.lower().encode("utf-8")
+        data = self.data.lower()
+        rows = set()
+        at = data.find(needle)
+        while at >= 0:
+            row = bisect_right(self.ends, at)
+            if at + len(needle) <= self.ends[row]:
+                rows.add(row)
+                at = data.find(needle, self.ends[row])  # on to the next row
+            else:
+                at = data.find(needle, at + 1)
+        return rows
+
+
+class FlagColumn:
+    """Booleans stored as one byte per row"""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def append(self, value):
+        self.data.append(bool(value))
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, i):
+        return bool(self.data[i])
+
+    def encoded(self):
+        return self.data, [False, True]
+
+
+class ScoreColumn:
+    """Spam scores (0..SPAM_SCORE_MAX) stored as one byte per row"""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def append(self, value):
+        self.data.append(value)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, i):
+        return self.data[i]
+
+    def encoded(self):
+        return self.data, list(range(SPAM_SCORE_MAX + 1))
+
+
+# NumberRecord attributes kept for batch rows, with the column type holding each
+BATCH_SCHEMA = (
+    ("e164", TextColumn),
+    ("country", CategoryColumn),
+    ("calling_code", CategoryColumn),
+    ("region_code", CategoryColumn),
+    ("state_region", CategoryColumn),
+    ("city", CategoryColumn),
+    ("location", CategoryColumn),
+    ("carrier", CategoryColumn),
+    ("national", TextColumn),
+    ("international", TextColumn),
+    ("number_type", CategoryColumn),
+    ("valid", FlagColumn),
+    ("possible", FlagColumn),
+    ("timezones", CategoryColumn),
+    ("spam_score", ScoreColumn),
+)
+
+
+class ColumnView:
+    """Display-formatted row tuples over a subset of a store's columns, for VirtualGrid
+
+    sort_keys and matcher work one column at a time: dictionary-encoded and
+    one-byte columns format and test each distinct value once, text columns
+    (shown as stored) are searched in their packed buffer, so sorting and
+    filtering never build whole display rows.
+    """
+
+    def __init__(self, store, fields):
+        self.store = store
+        self.fields = tuple(fields)
+        self.columns = [store.columns[field] for field in fields]
+        self._text_keys = {}  # column -> (key function, per-row keys so far) for text columns
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, i):
+        return tuple(format_value(field, column[i]) for field, column in zip(self.fields, self.columns))
+
+    def sort_keys(self, col, key):
+        """Per-row keys for column col that order rows as key(display value) would"""
+        field, column = self.fields[col], self.columns[col]
+        encoded = column.encoded()
+        if encoded is None:
+            # Text keys never change once computed, so only new rows are keyed
+            cached_key, keys = self._text_keys.get(col, (None, []))
+            if cached_key is not key:
+                keys = []
+            keys.extend(key(format_value(field, column[i])) for i in range(len(keys), len(column)))
+            self._text_keys[col] = (key, keys)
+            return keys
+        codes, values = encoded
+        # Rank the distinct values once; each row then sorts on its value's rank
+        order = sorted(range(len(values)), key=lambda code: key(format_value(field, values[code])))
+        rank = [0] * len(values)
+        for position, code in enumerate(order):
+            rank[code] = position
+        return list(map(rank.__getitem__, codes))
+
+    def matcher(self, text):
+        """Predicate on a row index: does some column's display string contain text (lowercase)?"""
+        tests = []
+        for field, column in zip(self.fields, self.columns):
+            encoded = column.encoded()
+            if encoded is None:
+                tests.append(column.rows_containing(text).__contains__)
+                continue
+            codes, values = encoded
+            hits = [text in str(format_value(field, value)).lower() for value in values]
+            if any(hits):
+                tests.append(lambda i, codes=codes, hits=hits: hits[codes[i]])
+        return lambda i: any(test(i) for test in tests)
+
+
+class BatchStats:
+    """Aggregate batch statistics, updated one record at a time"""
+
+    dedupe = None  # DedupeStats, when the batch was deduplicated
+
+    def __init__(self):
+        self.total = 0
+        self.failed = 0
+        self.valid = 0
+        self.spam_total = 0
+        self.countries = Counter()
+        self.carriers = Counter()
+        self.types = Counter()
+
+    def add(self, record):
+        """Fold one NumberRecord (or None for an unparseable line) into the totals"""
+        if record is None:
+            self.failed += 1
+            return
+        self.total += 1
+        self.valid += record.valid
+        self.spam_total += record.spam_score
+        self.countries[record.country] += 1
+        self.carriers[record.carrier] += 1
+        self.types[TYPE_MAP.get(record.number_type, "Unknown")] += 1
+
+    def observe(self, rows):
+        """Pipeline stage: update the totals and pass (input, record) rows through"""
+        for row in rows:
+            self.add(row[1])
+            yield row
+
+    def summary(self):
+        """Human-readable analytics report"""
+        total = self.total or 1
+        invalid = self.total - self.valid
+        report = f"""📊 Batch Analytics Report
+=========================
+Total Numbers: {self.total}
+Valid Numbers: {self.valid} ({self.valid/total*100:.1f}%)
+Invalid Numbers: {invalid} ({invalid/total*100:.1f}%)
+Unparseable Lines: {self.failed}
+
+Top Countries: {', '.join([f"{c} ({count})" for c, count in self.countries.most_common(3)])}
+Top Carriers: {', '.join([f"{c} ({count})" for c, count in self.carriers.most_common(3)])}
+Number Types: {', '.join([f"{t} ({count})" for t, count in self.types.most_common()])}"""
+        if self.dedupe is not None:
+            report += "\n\n" + self.dedupe.summary()
+        return report
+
+
+class BatchStore(BatchStats):
+    """Batch results held column by column, with aggregates kept up to date"""
+
+    def __init__(self):
+        self.fields = tuple(field for field, _ in BATCH_SCHEMA)
+        self.columns = {field: kind() for field, kind in BATCH_SCHEMA}
+        self.inputs = TextColumn()  # each row's line as written in the batch file
+        self.failed = 0
+        self.valid = 0
+        self.spam_total = 0
+        self.spam_histogram = array('Q', [0] * (SPAM_SCORE_MAX + 1))
+
+    def add(self, record, number=None):
+        """Append one NumberRecord and its input line (or count None as an unparseable line)"""
+        if record is None:
+            self.failed += 1
+            return
+        for field, column in self.columns.items():
+            column.append(getattr(record, field))
+        self.inputs.append(number if number is not None else record.e164)
+        self.valid += record.valid
+        self.spam_total += record.spam_score
+        self.spam_histogram[record.spam_score] += 1
+
+    def __len__(self):
+        return len(self.columns["country"])
+
+    @property
+    def total(self):
+        return len(self)
+
+    @property
+    def countries(self):
+        return self.columns["country"]
+
+    @property
+    def carriers(self):
+        return self.columns["carrier"]
+
+    @property
+    def types(self):
+        # Only a handful of distinct types, so label them on demand
+        return Counter({TYPE_MAP.get(t, "Unknown"): n for t, n in self.columns["number_type"].most_common()})
+
+    def validity_rate(self):
+        return self.valid / len(self) if len(self) else 0.0
+
+    def top(self, field, n=10):
+        """The n most frequent values of a dictionary-encoded field"""
+        return self.columns[field].most_common(n)
+
+    def record(self, i):
+        """Row i as a NumberRecord"""
+        return NumberRecord(**{field: column[i] for field, column in self.columns.items()})
+
+    def records(self):
+        for i in range(len(self)):
+            yield self.record(i)
+
+    def rows(self):
+        """(input, NumberRecord) for every row, for Exporter.write_rows"""
+        for i in range(len(self)):
+            yield self.inputs[i], self.record(i)
+
+    def rescore(self, scorer):
+        """Recompute every row's spam score with a SpamScorer in one vectorized pass"""
+        scores = scorer.score(self.columns["e164"], self.columns["carrier"], self.columns["country"]).tobytes()
+        self.columns["spam_score"].data[:] = scores
+        self.spam_total = sum(scores)
+        self.spam_histogram = array('Q', (scores.count(score) for score in range(SPAM_SCORE_MAX + 1)))
+
+    def view(self, fields):
+        return ColumnView(self, fields)
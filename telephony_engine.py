@@ -0,0 +1,331 @@
+"""Headless enrichment engine for the Telephony Intelligence Suite.
+
+Everything here works without Tk so numbers can be enriched from servers,
+batch jobs and the command line. The GUI in add_some_2.py is one client.
+"""
+import logging
+import sqlite3
+
+import phonenumbers
+from phonenumbers import number_type, region_code_for_number, NumberParseException
+
+from telephony_regions import RegionIndex
+from telephony_record import NumberRecord
+from telephony_cache import ResultCache, DEFAULT_CACHE_SIZE, DEFAULT_CACHE_TTL
+from telephony_spam import SpamStore, SpamScorer, load_rules, read_feed, INGEST_CHUNK
+from telephony_history import HistoryWriter, HistoryReader, tune_connection
+from telephony_metrics import METRICS
+from telephony_prefixes import prefix_index, index_path_for, configured_table
+
+DEFAULT_DB_PATH = 'telephony_data.db'
+
+log = logging.getLogger(__name__)
+
+# phonenumbers' geocoder, carrier and timezone modules load all of their
+# prefix data on import (~0.5s), so they are imported on first enrichment
+geocoder = carrier = timezone = None
+
+# Per-stage timers (no-ops unless METRICS is enabled)
+_T_RESOLVE = METRICS.timer("resolve")
+_T_CACHE = METRICS.timer("cache_lookup")
+_T_BUILD = METRICS.timer("build_record")
+_T_GEOCODER = METRICS.timer("geocoder")
+_T_CARRIER = METRICS.timer("carrier")
+_T_SPAM = METRICS.timer("spam_score")
+_T_FORMAT = METRICS.timer("format")
+_T_VALIDITY = METRICS.timer("validity")
+_T_TIMEZONE = METRICS.timer("timezone")
+_T_ADVANCED = METRICS.timer("advanced_lookups")
+_T_PREFIX = METRICS.timer("prefix_info")
+_C_PARSE_ERRORS = METRICS.counter("parse_errors")
+
+
+def load_prefix_data():
+    """Import the phonenumbers prefix data modules; safe to call from any thread, repeatedly"""
+    global geocoder, carrier, timezone
+    if timezone is None:
+        from phonenumbers import geocoder as _geocoder, carrier as _carrier, timezone as _timezone
+        geocoder, carrier, timezone = _geocoder, _carrier, _timezone  # timezone last: it marks done
+
+
+class TelephonyEngine:
+    """Number enrichment backed by phonenumbers and the local SQLite store"""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, regions=None, cache_size=DEFAULT_CACHE_SIZE,
+                 cache_ttl=DEFAULT_CACHE_TTL, persist_cache=False, preload_spam=True,
+                 prefix_info=False, prefix_table=None, spam_rules=None):
+        self.db_path = db_path
+        # prefix_info: also fill in prefix analysis for basic (non-advanced) lookups, e.g. in batches
+        self.prefix_info = prefix_info
+        self.prefix_table = configured_table(prefix_table)
+        self.prefixes = None  # PrefixIndex, opened on first analyze_prefix
+        self.region_index = RegionIndex(regions)
+        self.init_databases()
+        self.cache = ResultCache(cache_size, cache_ttl, self.conn if persist_cache else None)
+        self.spam = SpamStore(self.conn, self.normalize, preload_spam)
+        # spam_rules: a rule list, or a JSON file of one (default: $TELEPHONY_SPAM_RULES or DEFAULT_RULES)
+        self.scorer = SpamScorer(self.spam, spam_rules if isinstance(spam_rules, (list, tuple))
+                                 else load_rules(spam_rules))
+        self.history = None  # HistoryWriter, started on first save_to_history
+        self.history_reader = HistoryReader(self.conn)
+        cache = self.cache
+        METRICS.gauge("cache_size", lambda: cache.stats()["size"])
+        METRICS.gauge("cache_hit_rate", lambda: cache.stats()["hit_rate"])
+
+    def init_databases(self):
+        """Initialize SQLite databases for history and spam data"""
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        tune_connection(self.conn)
+        self.cursor = self.conn.cursor()
+
+        # Create tables
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS lookup_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                phone_number TEXT,
+                country TEXT,
+                carrier TEXT,
+                valid INTEGER,
+                spam_score REAL,
+                data TEXT
+            )
+        ''')
+
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS spam_reports (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                phone_number TEXT,
+                report_count INTEGER DEFAULT 1,
+                last_reported DATETIME DEFAULT CURRENT_TIMESTAMP,
+                spam_type TEXT
+            )
+        ''')
+
+        self.conn.commit()
+
+    def close(self):
+        """Flush pending history and cache writes and close the database connection"""
+        if self.history is not None:
+            self.history.close()
+        self.cache.flush()
+        self.conn.close()
+
+    # ==================== ENRICHMENT API ====================
+
+    def enrich(self, number, advanced=True):
+        """Enrich a single number; raises NumberParseException if it cannot be parsed"""
+        number = number.strip()
+
+        # Detect the region and parse in a single step
+        with _T_RESOLVE:
+            detected_region, num = self.region_index.resolve(number)
+        return self.enrich_parsed(num, advanced)
+
+    def enrich_parsed(self, num, advanced=True):
+        """Enrich an already parsed PhoneNumber, serving repeats from the cache"""
+        with _T_CACHE:
+            e164 = phonenumbers.format_number(num, phonenumbers.PhoneNumberFormat.E164)
+            record = self.cache.get(e164, advanced)
+        wants_prefix = advanced or self.prefix_info
+        if record is None:
+            with _T_BUILD:
+                record = self._build_record(e164, num, advanced)
+            if wants_prefix:
+                with _T_PREFIX:
+                    record.prefix_info = self.analyze_prefix(e164, str(num.country_code))
+            self.cache.put(e164, advanced, record)
+        elif record.prefix_info is None and wants_prefix:
+            # Cached records are shared: cache a copy with the prefix analysis, never change one in place
+            with _T_PREFIX:
+                record = record.replace(prefix_info=self.analyze_prefix(e164, str(num.country_code)))
+            self.cache.put(e164, advanced, record)
+        return record
+
+    def _build_record(self, number, num, advanced):
+        """Run every lookup for a parsed number; number is its E.164 form"""
+        if timezone is None:
+            load_prefix_data()
+        with _T_GEOCODER:
+            country_code = region_code_for_number(num)
+            country = geocoder.country_name_for_number(num, "en") or "Unknown"
+            location_desc = geocoder.description_for_number(num, "en") or "Unknown"
+        with _T_CARRIER:
+            carr = carrier.name_for_number(num, "en") or "Unknown"
+        with _T_SPAM:
+            spam_score = self.calculate_spam_score(number, carr, country)
+        with _T_FORMAT:
+            national = phonenumbers.format_number(num, phonenumbers.PhoneNumberFormat.NATIONAL)
+            international = phonenumbers.format_number(num, phonenumbers.PhoneNumberFormat.INTERNATIONAL)
+        with _T_VALIDITY:
+            num_type = number_type(num)
+            valid = phonenumbers.is_valid_number(num)
+            possible = phonenumbers.is_possible_number(num)
+        with _T_TIMEZONE:
+            timezones = tuple(timezone.time_zones_for_number(num))
+
+        record = NumberRecord(
+            e164=number,
+            country=country,
+            calling_code=num.country_code,
+            region_code=country_code or "Unknown",
+            state_region=self.extract_state_region(location_desc, country),
+            city=self.extract_city(location_desc, country),
+            location=location_desc,
+            carrier=carr,
+            national=national,
+            international=international,
+            number_type=num_type,
+            valid=valid,
+            possible=possible,
+            timezones=timezones,
+            spam_score=spam_score,
+        )
+
+        if advanced:
+            with _T_ADVANCED:
+                record.portability = self.check_portability(number, carr, country)
+                record.social_media = self.social_media_lookup_auto(number)
+
+        return record
+
+    def enrich_many(self, numbers, advanced=False):
+        """Lazily enrich an iterable of numbers, yielding None for unparseable input"""
+        for number in numbers:
+            yield self.get_number_details(number, advanced)
+
+    def get_number_details(self, number, advanced=False):
+        """Get details for batch processing with auto region detection"""
+        try:
+            return self.enrich(number, advanced)
+        except NumberParseException:
+            _C_PARSE_ERRORS.inc()
+            return None
+
+    def normalize(self, number):
+        """Canonical E.164 form of a number, or None if it cannot be parsed"""
+        try:
+            region, num = self.region_index.resolve(number)
+        except NumberParseException:
+            return None
+        return phonenumbers.format_number(num, phonenumbers.PhoneNumberFormat.E164)
+
+    def report_spam(self, number, spam_type=None):
+        """Record a spam report and drop any cached result for the number"""
+        e164 = self.normalize(number)
+        if e164 is None:
+            raise ValueError(f"Could not parse number: {number}")
+        self.spam.add_report(e164, spam_type)
+        self.cache.invalidate(e164)
+
+    def ingest_spam_feed(self, path, fmt=None, chunk_size=INGEST_CHUNK):
+        """Bulk-load a CSV or NDJSON spam feed and return its IngestStats
+
+        Cached results carry old spam scores, so the whole cache is dropped.
+        """
+        stats = self.spam.ingest(read_feed(path, fmt), chunk_size)
+        self.cache.clear()
+        return stats
+
+    def detect_region_from_number(self, number):
+        """Automatically detect region/country from phone number"""
+        try:
+            return self.region_index.resolve(number)[0]
+        except NumberParseException:
+            return self.region_index.default_region
+        except Exception:
+            log.exception("Region detection failed for %r", number)
+            return self.region_index.default_region  # Default fallback
+
+    # ==================== SCORING & ANALYSIS ====================
+
+    def calculate_spam_score(self, number, carrier, country):
+        """1. Spam/Fraud Detection - score an E.164 number with the configured rules"""
+        return self.scorer.score_one(number, carrier, country)
+
+    def check_portability(self, number, current_carrier, country):
+        """2. Number Portability Detection"""
+        # Simulate portability check
+        portability_db = {
+            'US': ['Verizon', 'AT&T', 'T-Mobile', 'Sprint'],
+            'GB': ['Vodafone', 'O2', 'EE', 'Three'],
+            'IN': ['Airtel', 'Jio', 'Vodafone', 'BSNL']
+        }
+
+        possible_carriers = portability_db.get(country, [])
+        if current_carrier not in possible_carriers and current_carrier != 'Unknown':
+            return f"Portable (from {possible_carriers[0] if possible_carriers else 'unknown'})"
+
+        return "Original Carrier"
+
+    def social_media_lookup_auto(self, number):
+        """3. Social Media Lookup (Auto)"""
+        platforms = []
+
+        # Simulate social media checks
+        if len(number) > 8:  # Basic validity check
+            platforms.append("WhatsApp✓")
+            platforms.append("Telegram✓")
+
+        # Add more platform checks based on country/pattern
+        if number.startswith('+1'):
+            platforms.append("iMessage✓")
+
+        return ", ".join(platforms) if platforms else "Not found"
+
+    def analyze_prefix(self, number, country_code):
+        """7. Area Code & Prefix Analysis - longest matching place and carrier prefixes
+
+        number is E.164 and country_code its calling code, e.g. '1'.
+        """
+        if self.prefixes is None:
+            self.prefixes = prefix_index(index_path_for(self.db_path), self.prefix_table)
+        return self.prefixes.describe(number, country_code)
+
+    # ==================== HISTORICAL TRACKING ====================
+
+    def save_to_history(self, number, record):
+        """5. Historical Tracking - Queue a lookup for the write-behind history writer"""
+        if self.history is None:
+            self.history = HistoryWriter(self.db_path)
+        self.history.record(number, record)
+
+    def flush_history(self):
+        """Block until queued history rows are committed; False if some had to be dropped"""
+        return self.history is None or self.history.flush()
+
+    def history_page(self, after=None, **filters):
+        """One keyset page of lookup history, newest first; see HistoryReader.page"""
+        self.flush_history()
+        return self.history_reader.page(after, **filters)
+
+    # ==================== HELPER METHODS ====================
+
+    @staticmethod
+    def extract_state_region(location_desc, country):
+        """Extract state/region from location description"""
+        if location_desc == "Unknown":
+            return "Unknown"
+
+        location_parts = location_desc.split(',')
+
+        if len(location_parts) > 1:
+            if len(location_parts) >= 3:
+                return location_parts[1].strip()
+            elif len(location_parts) == 2:
+                return location_parts[0].strip()
+
+        return location_desc
+
+    @staticmethod
+    def extract_city(location_desc, country):
+        """Extract city from location description"""
+        if location_desc == "Unknown":
+            return "Unknown"
+
+        location_parts = location_desc.split(',')
+
+        if len(location_parts) >= 2:
+            return location_parts[0].strip()
+
+        return "Unknown"
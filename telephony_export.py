@@ -0,0 +1,326 @@
+"""Streaming batch exporters for the Telephony Intelligence Suite.
+
+Every exporter writes NumberRecords against one fixed schema with an
+optional column selection (plus "input", the line as it appeared in the
+batch file), buffering CHUNK_ROWS rows at a time so output
+streams to disk while a batch is still running and memory stays flat
+however many rows are written. Formats:
+
+    csv      CSV with display strings (optionally gzip or zstd compressed)
+    jsonl    newline-delimited JSON objects keyed by display label
+    arrow    Arrow IPC file with native column types (needs pyarrow); load
+             it zero-copy with pyarrow.ipc.open_file(pyarrow.memory_map(path))
+
+New formats subclass Exporter (write_chunk is required) and are added
+with register_exporter.
+"""
+import io
+import os
+import sys
+import csv
+import gzip
+import json
+from abc import ABC, abstractmethod
+from operator import attrgetter
+
+from telephony_record import FIELDS, ADVANCED_FIELDS, TYPE_MAP
+from telephony_metrics import METRICS
+
+CHUNK_ROWS = 65536
+WRITE_BUFFER = 1 << 20  # bytes
+
+_T_EXPORT = METRICS.timer("export_chunk")
+
+# attribute -> (display label, formatter) for every exportable column, in schema order
+SCHEMA = {"input": ("Input", None), "e164": ("E.164", None)}
+SCHEMA.update({attr: (label, fmt) for attr, label, fmt in FIELDS + ADVANCED_FIELDS})
+# Native Arrow column types, so downstream analytics never re-parse display strings
+ARROW_TYPES = {
+    "input": "string", "e164": "string", "country": "dictionary", "calling_code": "uint16", "region_code": "dictionary",
+    "state_region": "dictionary", "city": "dictionary", "location": "dictionary",
+    "carrier": "dictionary", "national": "string", "international": "string",
+    "number_type": "dictionary", "valid": "bool", "possible": "bool", "timezones": "list",
+    "spam_score": "uint8", "portability": "dictionary", "prefix_info": "dictionary",
+    "social_media": "dictionary",
+}
+DEFAULT_COLUMNS = ("input",) + tuple(attr for attr, _, _ in FIELDS)
+
+EXPORTERS = {}
+_EXTENSIONS = {}
+
+
+def register_exporter(name, cls, *extensions):
+    """Make an Exporter subclass available to open_exporter under name and file extensions"""
+    EXPORTERS[name] = cls
+    for ext in extensions:
+        _EXTENSIONS[ext] = name
+
+
+def resolve_columns(columns):
+    """Schema attributes for a selection given as attributes or display labels"""
+    if not columns:
+        return DEFAULT_COLUMNS
+    by_label = {label.lower(): attr for attr, (label, _) in SCHEMA.items()}
+    resolved = []
+    for column in columns:
+        attr = column if column in SCHEMA else by_label.get(column.strip().lower())
+        if attr is None:
+            raise ValueError(f"Unknown export column: {column}")
+        resolved.append(attr)
+    return tuple(resolved)
+
+
+def _open_binary(path, compression=None):
+    """(stream, raw file) for a path ('-' = stdout); stream compresses into raw if asked"""
+    if compression not in (None, "none", "gzip", "zstd"):
+        raise ValueError(f"Unknown compression: {compression}")
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstd compression needs the zstandard package (pip install zstandard)")
+    raw = sys.stdout.buffer if path == "-" else open(path, "wb", buffering=WRITE_BUFFER)
+    if compression == "gzip":
+        # compresslevel 6 keeps gzip close to disk speed; 9 is ~3x slower for ~2% smaller files
+        return gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6), raw
+    if compression == "zstd":
+        return zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=False), raw
+    return raw, raw
+
+
+class _Memo(dict):
+    """value -> fmt(value), computed on first use"""
+
+    def __init__(self, fmt):
+        super().__init__()
+        self.fmt = fmt
+
+    def __missing__(self, value):
+        result = self[value] = self.fmt(value)
+        return result
+
+
+class Exporter(ABC):
+    """Base class: buffer records into chunks and hand each chunk to write_chunk"""
+
+    binary = False
+
+    def __init__(self, path, columns=None, compression=None, chunk_rows=CHUNK_ROWS):
+        self.path = path
+        self.columns = resolve_columns(columns)
+        self.labels = [SCHEMA[attr][0] for attr in self.columns]
+        self.compression = compression
+        self.chunk_rows = chunk_rows
+        self.rows = 0
+        self._chunk = []
+        self._formatters = None
+        # "input" is not a record attribute: it is spliced in at its position by write
+        attrs = [attr for attr in self.columns if attr != "input"]
+        self._input_at = self.columns.index("input") if "input" in self.columns else None
+        if not attrs:
+            self._values = lambda record: ()
+        elif len(attrs) > 1:
+            self._values = attrgetter(*attrs)
+        else:
+            self._values = lambda record, get=attrgetter(attrs[0]): (get(record),)
+        self._stream, self._raw = _open_binary(path, compression)
+        try:
+            self.out = self._stream if self.binary else io.TextIOWrapper(self._stream, encoding="utf-8",
+                                                                         newline="")
+            self.open()
+        except BaseException:
+            # e.g. a missing optional dependency: leave no open handle or empty file behind
+            self._discard()
+            raise
+
+    def open(self):
+        """Write any header; called once the output stream exists"""
+
+    def _discard(self):
+        if self._raw is sys.stdout.buffer:
+            return
+        self._raw.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def write(self, record, number=None):
+        """Queue one NumberRecord (None, for an unparseable line, is skipped)
+
+        number is the input line it came from, for the "input" column;
+        it defaults to the record's E.164 form.
+        """
+        if record is None:
+            return
+        values = self._values(record)
+        at = self._input_at
+        if at is not None:
+            number = number if number is not None else record.e164
+            values = (number,) + values if at == 0 else values[:at] + (number,) + values[at:]
+        self._chunk.append(values)
+        if len(self._chunk) >= self.chunk_rows:
+            self.flush()
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+        return self.rows
+
+    def write_rows(self, rows):
+        """Write (input, record) rows, e.g. from telephony_batch.enrich_unique"""
+        for number, record in rows:
+            self.write(record, number)
+        return self.rows
+
+    def observe(self, records):
+        """Pipeline stage: export records and pass them through"""
+        for record in records:
+            self.write(record)
+            yield record
+
+    def flush(self):
+        if self._chunk:
+            with _T_EXPORT:
+                self.write_chunk(self._chunk)
+            self.rows += len(self._chunk)
+            self._chunk = []
+
+    @abstractmethod
+    def write_chunk(self, rows):
+        """Write one chunk of value tuples, in self.columns order"""
+
+    def finish(self):
+        """Write any footer; called after the last chunk"""
+
+    def close(self):
+        """Write out the last chunk and any footer and close the file (stdout stays open)"""
+        self.flush()
+        self.finish()
+        if self.out is not self._stream:
+            self.out.flush()
+            self.out.detach()
+        if self._stream is not self._raw:
+            self._stream.close()  # writes the compression trailer, leaves raw open
+        if self._raw is sys.stdout.buffer:
+            self._raw.flush()
+        else:
+            self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def formatted(self, rows):
+        """Rows with every value turned into its display string"""
+        if self._formatters is None:
+            # Formatted columns are all low-cardinality, so memoize each display string
+            self._formatters = [(i, _Memo(SCHEMA[attr][1])) for i, attr in enumerate(self.columns)
+                                if SCHEMA[attr][1]]
+        if not self._formatters:
+            return rows
+        # Format column by column: one C-level dict lookup per value
+        columns = list(zip(*rows))
+        for i, memo in self._formatters:
+            columns[i] = map(memo.__getitem__, columns[i])
+        return zip(*columns)
+
+
+class CsvExporter(Exporter):
+    """CSV with a header row of display labels"""
+
+    def open(self):
+        self.writer = csv.writer(self.out)
+        self.writer.writerow(self.labels)
+
+    def write_chunk(self, rows):
+        self.writer.writerows(self.formatted(rows))
+
+
+class JsonlExporter(Exporter):
+    """One JSON object per line, keyed by display label"""
+
+    def write_chunk(self, rows):
+        labels = self.labels
+        self.out.write("".join(json.dumps(dict(zip(labels, row)), ensure_ascii=False) + "\n"
+                               for row in self.formatted(rows)))
+
+
+class ArrowExporter(Exporter):
+    """Arrow IPC file, one record batch per chunk, with native column types"""
+
+    binary = True
+
+    def open(self):
+        try:
+            import pyarrow
+        except ImportError:
+            raise RuntimeError("Arrow export needs pyarrow (pip install pyarrow)")
+        self.pa = pyarrow
+        types = {
+            "string": pyarrow.string(),
+            "dictionary": pyarrow.dictionary(pyarrow.int32(), pyarrow.string()),
+            "uint16": pyarrow.uint16(),
+            "uint8": pyarrow.uint8(),
+            "bool": pyarrow.bool_(),
+            "list": pyarrow.list_(pyarrow.string()),
+        }
+        self.types = [types[ARROW_TYPES[attr]] for attr in self.columns]
+        self.schema = pyarrow.schema([pyarrow.field(label, t) for label, t in zip(self.labels, self.types)])
+        # Dictionaries grow across batches and are written as deltas, so every
+        # batch shares one dictionary per column instead of re-encoding it
+        self.dictionaries = [({}, []) for _ in self.columns]
+        options = pyarrow.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+        self.writer = pyarrow.ipc.new_file(self.out, self.schema, options=options)
+
+    def write_chunk(self, rows):
+        pa = self.pa
+        arrays = []
+        for i, (attr, arrow_type) in enumerate(zip(self.columns, self.types)):
+            values = [row[i] for row in rows]
+            if attr == "number_type":
+                values = [TYPE_MAP.get(v, "Unknown") for v in values]
+            if pa.types.is_dictionary(arrow_type):
+                index, dictionary = self.dictionaries[i]
+                codes = []
+                for value in values:
+                    code = index.get(value)
+                    if code is None:
+                        code = index[value] = len(dictionary)
+                        dictionary.append(value)
+                    codes.append(code)
+                arrays.append(pa.DictionaryArray.from_arrays(pa.array(codes, pa.int32()),
+                                                             pa.array(dictionary, pa.string())))
+            else:
+                arrays.append(pa.array(values, arrow_type))
+        self.writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+
+    def finish(self):
+        self.writer.close()
+
+
+register_exporter("csv", CsvExporter, ".csv", ".txt")
+register_exporter("jsonl", JsonlExporter, ".jsonl", ".ndjson", ".json")
+register_exporter("arrow", ArrowExporter, ".arrow", ".feather", ".ipc")
+
+_COMPRESSION_EXTENSIONS = {".gz": "gzip", ".zst": "zstd"}
+
+
+def open_exporter(path, fmt=None, columns=None, compression=None, chunk_rows=CHUNK_ROWS):
+    """Open an exporter, inferring format and compression from the file name when not given
+
+    e.g. 'out.csv.zst' -> zstd-compressed CSV, 'out.arrow' -> Arrow IPC.
+    """
+    name = path.lower()
+    for ext, codec in _COMPRESSION_EXTENSIONS.items():
+        if name.endswith(ext):
+            compression = compression or codec
+            name = name[:-len(ext)]
+    if fmt is None:
+        dot = name.rfind(".")
+        fmt = _EXTENSIONS.get(name[dot:], "csv") if dot >= 0 else "csv"
+    if fmt not in EXPORTERS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    return EXPORTERS[fmt](path, columns, compression, chunk_rows)
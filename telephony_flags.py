@@ -0,0 +1,143 @@
+"""Country flag cache for the Telephony Intelligence Suite.
+
+Flags are stored already resized, as PNG bytes, in memory and on disk
+keyed by lower-case region code. Only a cache miss touches the network,
+fetches run on a small thread pool off the UI thread, and a local bundle
+directory can prewarm the cache so air-gapped hosts never fetch at all.
+requests and Pillow are only imported once an image has to be fetched
+or resized, so serving cached flags costs neither import.
+"""
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+FLAG_URL = os.environ.get("TELEPHONY_FLAG_URL", "https://flagcdn.com/w160/{code}.png")
+FLAG_SIZE = (120, 80)
+DEFAULT_FLAG_DIR = "flag_cache"
+DEFAULT_BUNDLE_DIR = "flags"
+
+
+class FlagCache:
+    """Resized flag images cached in memory and on disk"""
+
+    def __init__(self, cache_dir=DEFAULT_FLAG_DIR, url=FLAG_URL, size=FLAG_SIZE, timeout=5, offline=None):
+        self.cache_dir = cache_dir
+        self.url = url
+        self.size = size
+        self.timeout = timeout
+        if offline is None:
+            offline = os.environ.get("TELEPHONY_OFFLINE", "") not in ("", "0")
+        self.offline = offline
+
+        self._memory = {}    # code -> PNG bytes
+        self._missing = set()  # codes the server has no flag for
+        self._inflight = {}  # code -> Future
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(2, thread_name_prefix="flags")
+        self.fetches = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def path(self, code):
+        return os.path.join(self.cache_dir, f"{code.lower()}.png")
+
+    def get(self, code):
+        """Resized PNG bytes for a region code, or None if unavailable"""
+        code = code.lower()
+        if len(code) != 2 or not code.isalpha():
+            return None
+        data = self._memory.get(code)
+        if data is not None or code in self._missing:
+            return data
+
+        try:
+            with open(self.path(code), "rb") as f:
+                data = f.read()
+        except OSError:
+            data = self._fetch(code)
+
+        if data is None:
+            self._missing.add(code)
+        else:
+            self._memory[code] = data
+        return data
+
+    def get_async(self, code):
+        """Future resolving to get(code); repeated requests share one fetch"""
+        code = code.lower()
+        with self._lock:
+            future = self._inflight.get(code)
+            if future is None:
+                future = self._executor.submit(self.get, code)
+                self._inflight[code] = future
+                future.add_done_callback(lambda f: self._inflight.pop(code, None))
+            return future
+
+    def cached(self, code):
+        """Bytes already in memory, without any I/O"""
+        return self._memory.get(code.lower())
+
+    def _fetch(self, code):
+        if self.offline:
+            return None
+        import requests
+
+        try:
+            resp = requests.get(self.url.format(code=code), timeout=self.timeout)
+        except requests.RequestException:
+            return None
+        self.fetches += 1
+        if resp.status_code != 200:
+            return None
+        try:
+            return self.store(code, resp.content)
+        except OSError:  # not an image, or the cache dir is unwritable
+            return None
+
+    def store(self, code, image_bytes):
+        """Resize an image and write it to the disk cache, returning the PNG bytes"""
+        from PIL import Image
+
+        pil_img = Image.open(io.BytesIO(image_bytes)).convert("RGBA").resize(self.size)
+        buf = io.BytesIO()
+        pil_img.save(buf, format="PNG")
+        data = buf.getvalue()
+
+        # Write atomically so a crash never leaves a truncated flag behind
+        tmp = self.path(code) + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self.path(code))
+        self._memory[code.lower()] = data
+        self._missing.discard(code.lower())
+        return data
+
+    def prewarm(self, codes=None, bundle_dir=DEFAULT_BUNDLE_DIR):
+        """Fill the cache from a local bundle of <code>.png files, then the network
+
+        codes defaults to every bundled flag plus, when online, every
+        phonenumbers region. Returns how many of those flags are now cached.
+        """
+        bundled = []
+        if bundle_dir and os.path.isdir(bundle_dir):
+            for name in os.listdir(bundle_dir):
+                code, ext = os.path.splitext(name)
+                if ext.lower() != ".png":
+                    continue
+                bundled.append(code.lower())
+                if not os.path.exists(self.path(code)):
+                    with open(os.path.join(bundle_dir, name), "rb") as f:
+                        self.store(code, f.read())
+
+        if codes is None:
+            codes = set(bundled)
+            if not self.offline:
+                import phonenumbers
+                codes.update(r.lower() for r in phonenumbers.SUPPORTED_REGIONS)
+        return sum(data is not None for data in self._executor.map(self.get, codes))
+
+    def prewarm_async(self, codes=None, bundle_dir=DEFAULT_BUNDLE_DIR):
+        """Run prewarm on a background thread"""
+        thread = threading.Thread(target=self.prewarm, args=(codes, bundle_dir), daemon=True)
+        thread.start()
+        return thread
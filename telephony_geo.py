@@ -0,0 +1,227 @@
+"""Geocode resolution for the Telephony Intelligence Suite.
+
+show_precise_location only ever asks for "<City>, <Country>" strings taken
+from the phonenumbers geocoding data, so coordinates are kept in a
+geocode_cache table. build_gazetteer precomputes every such string once;
+after that (or after import_csv on an air-gapped host) lookups are a dict
+hit. Nominatim is only a rate-limited fallback for strings not cached yet.
+"""
+import os
+import csv
+import time
+import logging
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from telephony_engine import TelephonyEngine, DEFAULT_DB_PATH
+from telephony_history import tune_connection
+
+USER_AGENT = "advanced_telephony_app"
+MIN_REQUEST_INTERVAL = 1.0  # seconds; Nominatim's usage policy allows 1 request/sec
+
+log = logging.getLogger(__name__)
+
+
+def location_query(record):
+    """The geocode query for a NumberRecord, or None if it has no usable location"""
+    return place_query(record.city, record.state_region, record.country)
+
+
+def place_query(city, state_region, country):
+    """'<most specific known place>, <country>', or None if every part is Unknown"""
+    for location_name in (city, state_region, country):
+        if location_name and location_name != "Unknown":
+            return location_name + ", " + country
+    return None
+
+
+def _prefix_region(calling_code, rest, regions):
+    """Best region for a geocoding prefix under a calling code shared by several regions"""
+    import re
+    import phonenumbers
+    from phonenumbers import PhoneMetadata
+
+    for region in regions:
+        metadata = PhoneMetadata.metadata_for_region(region)
+        if metadata and metadata.leading_digits and re.match(metadata.leading_digits, rest):
+            return region
+    # Otherwise pick the first region for which some completion of the prefix is valid
+    for region in regions:
+        metadata = PhoneMetadata.metadata_for_region(region)
+        if metadata is None:
+            continue
+        for length in metadata.general_desc.possible_length:
+            if length <= len(rest):
+                continue
+            for digit in "0123456789":
+                num = phonenumbers.PhoneNumber(country_code=calling_code,
+                                               national_number=int(rest + digit * (length - len(rest))))
+                if phonenumbers.is_valid_number_for_region(num, region):
+                    return region
+    return regions[0]
+
+
+def gazetteer_queries(lang="en"):
+    """Every distinct location query the phonenumbers geocoding data can produce"""
+    import phonenumbers
+    from phonenumbers import geocoder
+    from phonenumbers.geodata import GEOCODE_DATA
+
+    country_names = {}
+    prefix_regions = {}
+    queries = set()
+    for prefix, names in GEOCODE_DATA.items():
+        desc = names.get(lang)
+        if not desc:
+            continue
+        for length in (1, 2, 3):
+            calling_code = int(prefix[:length])
+            regions = phonenumbers.COUNTRY_CODE_TO_REGION_CODE.get(calling_code)
+            if regions:
+                rest = prefix[length:]
+                break
+        else:
+            continue
+
+        if len(regions) == 1:
+            region = regions[0]
+        else:
+            key = (calling_code, rest[:3])
+            if key not in prefix_regions:
+                prefix_regions[key] = _prefix_region(calling_code, rest, regions)
+            region = prefix_regions[key]
+
+        if region not in country_names:
+            example = phonenumbers.example_number(region)
+            country_names[region] = geocoder.country_name_for_number(example, lang) if example else ""
+        country = country_names[region] or "Unknown"
+        query = place_query(TelephonyEngine.extract_city(desc, country),
+                            TelephonyEngine.extract_state_region(desc, country), country)
+        if query:
+            queries.add(query)
+
+    # Numbers with no finer location fall back to the country itself
+    for country in country_names.values():
+        query = place_query("Unknown", "Unknown", country)
+        if query:
+            queries.add(query)
+    return sorted(queries)
+
+
+class GeoResolver:
+    """Cached, rate-limited geocoding of location query strings"""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, offline=None, min_interval=MIN_REQUEST_INTERVAL,
+                 user_agent=USER_AGENT):
+        if offline is None:
+            offline = os.environ.get("TELEPHONY_OFFLINE", "") not in ("", "0")
+        self.offline = offline
+        self.min_interval = min_interval
+        self.user_agent = user_agent
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        tune_connection(self.conn)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS geocode_cache (
+                query TEXT PRIMARY KEY,
+                latitude REAL,
+                longitude REAL,
+                source TEXT,
+                updated DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        self.conn.commit()
+
+        self._lock = threading.Lock()
+        self._rate_lock = threading.Lock()
+        self._last_request = 0.0
+        self._geolocator = None
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="geocode")
+        # query -> (lat, lon), or None for a query the geocoder could not resolve
+        self._coords = {q: (lat, lon) if lat is not None else None
+                        for q, lat, lon in self.conn.execute("SELECT query, latitude, longitude FROM geocode_cache")}
+
+    def cached(self, query):
+        """True if the query resolves locally without a network call"""
+        return query in self._coords
+
+    def resolve(self, query):
+        """(latitude, longitude) for a location query, or None"""
+        if query in self._coords:
+            return self._coords[query]
+        if self.offline:
+            return None
+        coords = self._geocode(query)
+        self._store([(query, coords, "nominatim")])
+        return coords
+
+    def resolve_async(self, query):
+        """Future resolving to resolve(query), run off the calling thread"""
+        return self._executor.submit(self.resolve, query)
+
+    def _geocode(self, query):
+        # One request at a time, spaced at least min_interval apart
+        with self._rate_lock:
+            wait = self._last_request + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                if self._geolocator is None:
+                    from geopy.geocoders import Nominatim
+                    self._geolocator = Nominatim(user_agent=self.user_agent)
+                location = self._geolocator.geocode(query)
+            finally:
+                self._last_request = time.monotonic()
+        return (location.latitude, location.longitude) if location else None
+
+    def _store(self, entries):
+        with self._lock:
+            self.conn.executemany('''
+                INSERT OR REPLACE INTO geocode_cache (query, latitude, longitude, source)
+                VALUES (?, ?, ?, ?)
+            ''', [(q, c[0] if c else None, c[1] if c else None, source) for q, c, source in entries])
+            self.conn.commit()
+            for q, c, source in entries:
+                self._coords[q] = c
+
+    def build_gazetteer(self, queries=None, progress=None):
+        """Geocode every gazetteer query not cached yet; safe to stop and rerun
+
+        Returns the number of queries resolved over the network.
+        """
+        todo = [q for q in (queries or gazetteer_queries()) if q not in self._coords]
+        for i, query in enumerate(todo, 1):
+            try:
+                coords = self._geocode(query)
+            except Exception as e:
+                log.warning("Geocode failed for %r: %s", query, e)
+                continue
+            self._store([(query, coords, "gazetteer")])
+            if progress:
+                progress(i, len(todo))
+        return len(todo)
+
+    def import_csv(self, path):
+        """Load query,latitude,longitude rows (e.g. a gazetteer built on another host)"""
+        entries = []
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.reader(f):
+                if len(row) < 3 or row[0] == "query":
+                    continue
+                coords = (float(row[1]), float(row[2])) if row[1] and row[2] else None
+                entries.append((row[0], coords, "import"))
+        self._store(entries)
+        return len(entries)
+
+    def export_csv(self, path):
+        """Write the cache as query,latitude,longitude rows"""
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["query", "latitude", "longitude"])
+            for query, coords in sorted(self._coords.items()):
+                writer.writerow([query, coords[0] if coords else "", coords[1] if coords else ""])
+        return len(self._coords)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.conn.close()
@@ -0,0 +1,231 @@
+"""Lookup history persistence for the Telephony Intelligence Suite.
+
+Lookups are queued in memory and written by a dedicated thread with
+executemany, one transaction per batch_size rows or flush_interval
+seconds, so recording history no longer costs an fsync per lookup.
+"""
+import json
+import time
+import queue
+import logging
+import sqlite3
+import threading
+
+from telephony_metrics import METRICS
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 0.25  # seconds
+WRITE_ATTEMPTS = 3  # tries per batch before its rows are dropped (e.g. database locked for good)
+
+log = logging.getLogger(__name__)
+
+_T_COMMIT = METRICS.timer("history_commit")
+_T_PAGE = METRICS.timer("history_page")
+_C_WRITTEN = METRICS.counter("history_rows")
+_C_DROPPED = METRICS.counter("history_dropped")
+
+
+def tune_connection(conn):
+    """WAL journal and relaxed sync: readers never block the writer, commits skip the full fsync"""
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-16000")  # 16 MB page cache
+
+
+def history_row(number, record):
+    """lookup_history column values for one NumberRecord"""
+    return (time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime()), number,
+            record.country, record.carrier, record.valid, record.spam_score,
+            json.dumps(record.display()))
+
+
+class HistoryWriter:
+    """Write-behind queue for lookup_history rows
+
+    A batch that fails to commit is retried (the rows stay queued) up to
+    WRITE_ATTEMPTS times, then dropped and counted in dropped, so callers
+    can tell; flush() and close() report whether anything was lost.
+    """
+
+    _FLUSH = object()
+    _STOP = object()
+
+    def __init__(self, db_path, batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()  # orders flush markers before the stop marker
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, number, record):
+        """Queue one lookup for writing"""
+        if self._closed:
+            raise RuntimeError("History writer is closed")
+        self._queue.put(history_row(number, record))
+
+    def record_many(self, rows):
+        """Queue (number, record) pairs for writing"""
+        for number, record in rows:
+            self.record(number, record)
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far has been committed
+
+        Returns False if the timeout expired or rows were dropped meanwhile.
+        """
+        done = threading.Event()
+        dropped = self.dropped
+        with self._lock:
+            if self._closed:
+                return True
+            self._queue.put((self._FLUSH, done))
+        return done.wait(timeout) and self.dropped == dropped
+
+    def close(self):
+        """Write out everything still queued and stop the writer thread; False if any row was dropped"""
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(self._STOP)
+        self._thread.join()
+        return not self.dropped
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path)
+        tune_connection(conn)
+        pending = []
+        waiters = []
+        attempts = 0
+        stopping = False
+        try:
+            while not stopping or pending:
+                deadline = time.monotonic() + self.flush_interval
+                while len(pending) < self.batch_size:
+                    try:
+                        item = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if item is self._STOP:
+                        stopping = True
+                        break
+                    if isinstance(item, tuple) and item[0] is self._FLUSH:
+                        waiters.append(item[1])
+                        break
+                    pending.append(item)
+
+                if pending:
+                    try:
+                        with _T_COMMIT, conn:
+                            conn.executemany('''
+                                INSERT INTO lookup_history (timestamp, phone_number, country, carrier, valid, spam_score, data)
+                                VALUES (?, ?, ?, ?, ?, ?, ?)
+                            ''', pending)
+                        self.written += len(pending)
+                        _C_WRITTEN.inc(len(pending))
+                    except sqlite3.Error as e:
+                        attempts += 1
+                        if attempts < WRITE_ATTEMPTS:
+                            # Keep the rows (and any flush waiting on them) for the next try
+                            log.warning("History write failed, retrying %d rows: %s", len(pending), e)
+                            time.sleep(self.flush_interval)
+                            continue
+                        log.error("History write failed %d times, dropping %d rows: %s",
+                                  attempts, len(pending), e)
+                        self.dropped += len(pending)
+                        _C_DROPPED.inc(len(pending))
+                    pending = []
+                    attempts = 0
+                for done in waiters:
+                    done.set()
+                waiters = []
+        finally:
+            conn.close()
+            # Never leave a flush() waiting on a writer that has stopped
+            for done in waiters:
+                done.set()
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, tuple) and item[0] is self._FLUSH:
+                    item[1].set()
+
+
+HISTORY_PAGE_SIZE = 100
+
+
+class HistoryReader:
+    """Indexed, keyset-paginated queries over lookup_history"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        # Every filter column leads a (column, timestamp, id) index so filtered
+        # pages come back already in timestamp order without a sort step
+        self.conn.executescript('''
+            CREATE INDEX IF NOT EXISTS idx_history_timestamp ON lookup_history(timestamp, id);
+            CREATE INDEX IF NOT EXISTS idx_history_phone ON lookup_history(phone_number, timestamp, id);
+            CREATE INDEX IF NOT EXISTS idx_history_country ON lookup_history(country, timestamp, id);
+            CREATE INDEX IF NOT EXISTS idx_history_carrier ON lookup_history(carrier, timestamp, id);
+        ''')
+
+    def page(self, after=None, limit=HISTORY_PAGE_SIZE, **filters):
+        """Return (rows, cursor) for the next page, newest first
+
+        after is the cursor returned by the previous call (None for the first
+        page); the returned cursor is None once there are no more rows. number,
+        country and carrier match exactly (a trailing '*' on number makes it a
+        prefix match), since/until bound the timestamp ('YYYY-MM-DD' or full
+        'YYYY-MM-DD HH:MM:SS').
+        """
+        sql, params = self._query(after, limit, **filters)
+        with _T_PAGE:
+            rows = self.conn.execute(sql, params).fetchall()
+
+        cursor = (rows[-1][1], rows[-1][0]) if len(rows) == limit else None
+        return rows, cursor
+
+    def _query(self, after, limit, number=None, country=None, carrier=None, since=None, until=None):
+        """(sql, params) for one page"""
+        clauses = []
+        params = []
+        if number and number.endswith("*"):
+            # Prefix range instead of LIKE so the phone_number index is used
+            clauses.append("phone_number >= ? AND phone_number < ?")
+            params += [number[:-1], number[:-1] + "\uffff"]
+        elif number:
+            clauses.append("phone_number = ?")
+            params.append(number)
+        if country:
+            clauses.append("country = ?")
+            params.append(country)
+        if carrier:
+            clauses.append("carrier = ?")
+            params.append(carrier)
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            # A bare date includes that whole day
+            clauses.append("timestamp <= ?" if len(until) > 10 else "timestamp < date(?, '+1 day')")
+            params.append(until)
+        if after is not None:
+            # Row-value comparison, so SQLite seeks the (..., timestamp, id) index
+            # to the cursor instead of scanning down to it from the newest row
+            clauses.append("(timestamp, id) < (?, ?)")
+            params += [after[0], after[1]]
+
+        where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+        return f'''
+            SELECT id, timestamp, phone_number, country, carrier, valid, spam_score
+            FROM lookup_history
+            {where}
+            ORDER BY timestamp DESC, id DESC
+            LIMIT ?
+        ''', params + [limit]
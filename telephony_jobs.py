@@ -0,0 +1,232 @@
+"""Checkpointed, resumable batch jobs for the Telephony Intelligence Suite.
+
+A job is one batch file being enriched. batch_jobs records the input
+file's identity (path, size, mtime and a hash of its first block), its
+options, how many rows are done and the byte offset just past the last
+done line; batch_job_rows holds every finished (input, record) row. Both
+are written together, one transaction per checkpoint, so after a crash,
+a cancel or a closed window the job restarts from its last checkpoint:
+the stored rows are replayed (into the grid or a rewritten output file)
+and reading resumes at the saved offset.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from collections import deque
+
+from telephony_record import NumberRecord
+from telephony_history import tune_connection
+from telephony_metrics import METRICS
+
+CHECKPOINT_ROWS = 5000
+CHECKPOINT_SECONDS = 5.0
+_HEAD_BYTES = 1 << 16  # hashed to tell a rewritten input file from the original
+
+# A job still "running" after its process died is resumable like a paused one
+RESUMABLE = ("running", "paused", "failed")
+
+_T_CHECKPOINT = METRICS.timer("job_checkpoint")
+
+
+def file_identity(path):
+    """(size, mtime_ns, sha1 of the first block) for an input file"""
+    st = os.stat(path)
+    with open(path, "rb") as f:
+        head = hashlib.sha1(f.read(_HEAD_BYTES)).hexdigest()
+    return st.st_size, st.st_mtime_ns, head
+
+
+def read_numbers_from(path, offset=0, offsets=None):
+    """Yield non-empty, stripped lines from offset on, appending the byte offset past each to offsets"""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for raw in f:
+            offset += len(raw)
+            line = raw.decode("utf-8").strip()
+            if line:
+                if offsets is not None:
+                    offsets.append(offset)
+                yield line
+
+
+class Job:
+    """One batch_jobs row"""
+
+    __slots__ = ("id", "input_path", "output_path", "options", "status", "rows", "offset",
+                 "input_size", "input_mtime", "input_head", "created", "updated", "error")
+
+    def __init__(self, id, input_path, output_path, options, status, rows, offset,
+                 input_size, input_mtime, input_head, created, updated, error):
+        self.id = id
+        self.input_path = input_path
+        self.output_path = output_path
+        self.options = json.loads(options) if options else {}
+        self.status = status
+        self.rows = rows
+        self.offset = offset
+        self.input_size = input_size
+        self.input_mtime = input_mtime
+        self.input_head = input_head
+        self.created = created
+        self.updated = updated
+        self.error = error
+
+    @property
+    def fraction(self):
+        return min(self.offset / self.input_size, 1.0) if self.input_size else 1.0
+
+    @property
+    def resumable(self):
+        return self.status in RESUMABLE
+
+    def __repr__(self):
+        return f"Job({self.id}, {self.input_path!r}, {self.status!r}, rows={self.rows})"
+
+
+_JOB_COLUMNS = ("id, input_path, output_path, options, status, rows, byte_offset, "
+                "input_size, input_mtime, input_head, created, updated, error")
+
+
+class JobStore:
+    """batch_jobs and batch_job_rows in the app database (one connection per thread)"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        tune_connection(self.conn)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS batch_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                input_path TEXT,
+                output_path TEXT,
+                options TEXT,
+                status TEXT,
+                rows INTEGER DEFAULT 0,
+                byte_offset INTEGER DEFAULT 0,
+                input_size INTEGER,
+                input_mtime INTEGER,
+                input_head TEXT,
+                created DATETIME DEFAULT CURRENT_TIMESTAMP,
+                updated DATETIME DEFAULT CURRENT_TIMESTAMP,
+                error TEXT
+            )
+        ''')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS batch_job_rows (
+                job_id INTEGER,
+                row INTEGER,
+                input TEXT,
+                data TEXT,
+                PRIMARY KEY (job_id, row)
+            ) WITHOUT ROWID
+        ''')
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def create(self, input_path, output_path=None, options=None):
+        """Register a new job for input_path and return its id"""
+        input_path = os.path.abspath(input_path)
+        size, mtime, head = file_identity(input_path)
+        with self.conn:
+            cursor = self.conn.execute('''
+                INSERT INTO batch_jobs (input_path, output_path, options, status, input_size, input_mtime, input_head)
+                VALUES (?, ?, ?, 'running', ?, ?, ?)
+            ''', (input_path, output_path and os.path.abspath(output_path), json.dumps(options or {}),
+                  size, mtime, head))
+        return cursor.lastrowid
+
+    def get(self, job_id):
+        row = self.conn.execute(f"SELECT {_JOB_COLUMNS} FROM batch_jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"No batch job {job_id}")
+        return Job(*row)
+
+    def jobs(self):
+        """Every job, newest first"""
+        return [Job(*row) for row in self.conn.execute(f"SELECT {_JOB_COLUMNS} FROM batch_jobs ORDER BY id DESC")]
+
+    def discard(self, job_id):
+        """Delete a job and its stored rows"""
+        with self.conn:
+            self.conn.execute("DELETE FROM batch_job_rows WHERE job_id = ?", (job_id,))
+            self.conn.execute("DELETE FROM batch_jobs WHERE id = ?", (job_id,))
+
+    def check_resumable(self, job, output=False):
+        """Raise ValueError unless the job is unfinished and its input file is still the one it started on
+
+        With output=True the job must also have an output file to rewrite
+        (GUI batches that were not streamed to a file only have the grid).
+        """
+        if not job.resumable:
+            raise ValueError(f"Job {job.id} is {job.status}; only unfinished jobs can be resumed")
+        if output and not job.output_path:
+            raise ValueError(f"Job {job.id} has no output file; resume it from the GUI's Batch Jobs window")
+        try:
+            identity = file_identity(job.input_path)
+        except OSError as e:
+            raise ValueError(f"Input file for job {job.id} is gone: {e}")
+        if identity != (job.input_size, job.input_mtime, job.input_head):
+            raise ValueError(f"Input file for job {job.id} has changed since it started: {job.input_path}")
+
+    def results(self, job_id):
+        """Stored (input, record or None) rows, in input order"""
+        cursor = self.conn.execute("SELECT input, data FROM batch_job_rows WHERE job_id = ? ORDER BY row",
+                                   (job_id,))
+        for number, data in cursor:
+            yield number, NumberRecord.from_json(data) if data is not None else None
+
+    def checkpoint(self, job_id, rows, offset, total, status="running", error=None):
+        """Store finished rows and the new byte offset and row count in one transaction"""
+        with _T_CHECKPOINT, self.conn:
+            if rows:
+                self.conn.executemany("INSERT OR REPLACE INTO batch_job_rows (job_id, row, input, data) "
+                                      "VALUES (?, ?, ?, ?)", rows)
+            self.conn.execute('''
+                UPDATE batch_jobs SET rows = ?, byte_offset = ?, status = ?, error = ?,
+                    updated = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (total, offset, status, error, job_id))
+
+    def run(self, job_id, enrich, every=CHECKPOINT_ROWS, interval=CHECKPOINT_SECONDS):
+        """Yield (input, record) for every line of a job: stored rows first, then the rest, checkpointed
+
+        enrich turns an iterable of numbers into (input, record) rows in
+        the same order (e.g. enrich_unique). A checkpoint is written every
+        `every` rows or `interval` seconds and when the run stops; the job
+        ends "done", "failed" (with the error) or, if the consumer stopped
+        early, "paused".
+        """
+        job = self.get(job_id)
+        self.check_resumable(job)
+        yield from self.results(job_id)
+
+        offsets = deque()
+        rows = enrich(read_numbers_from(job.input_path, job.offset, offsets))
+        done, offset = job.rows, job.offset
+        pending = []
+        status, error = "paused", None
+        last = time.monotonic()
+        try:
+            for number, record in rows:
+                offset = offsets.popleft()
+                pending.append((job_id, done + len(pending), number,
+                                record.to_json() if record is not None else None))
+                if len(pending) >= every or time.monotonic() - last >= interval:
+                    done += len(pending)
+                    self.checkpoint(job_id, pending, offset, done)
+                    pending = []
+                    last = time.monotonic()
+                yield number, record
+            status = "done"
+        except Exception as e:
+            status, error = "failed", str(e)
+            raise
+        finally:
+            close = getattr(rows, "close", None)
+            if close is not None:
+                close()
+            self.checkpoint(job_id, pending, offset, done + len(pending), status, error)
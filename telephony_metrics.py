@@ -0,0 +1,225 @@
+"""Stage timers and counters for the Telephony Intelligence Suite.
+
+Hot-path stages are wrapped in named timers created once at import:
+
+    _T_CARRIER = METRICS.timer("carrier")
+    ...
+    with _T_CARRIER:
+        carr = carrier.name_for_number(num, "en")
+
+While METRICS is disabled (the default) a timer costs one attribute check;
+enable it with TELEPHONY_METRICS=1, METRICS.enable() or the CLI's
+--metrics option. Timers keep a count, total, max and a log-bucketed
+histogram, so snapshot() (JSON) and to_prometheus() (text exposition
+format) can report latency percentiles without storing samples.
+"""
+import os
+import json
+import time
+import threading
+from bisect import bisect_left
+
+# Histogram bucket upper bounds, in seconds
+BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+           1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_BUCKETS_NS = tuple(int(b * 1e9) for b in BUCKETS)
+
+
+class Timer:
+    """Context manager accumulating the wall time of one stage"""
+
+    __slots__ = ("name", "registry", "count", "total_ns", "max_ns", "buckets", "_start", "_lock")
+
+    def __init__(self, name, registry):
+        self.name = name
+        self.registry = registry
+        self._lock = threading.Lock()
+        self._start = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.count = 0
+            self.total_ns = 0
+            self.max_ns = 0
+            self.buckets = [0] * (len(BUCKETS) + 1)  # last bucket is +Inf
+
+    def __enter__(self):
+        if self.registry.enabled:
+            self._start.t = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        if self.registry.enabled:
+            start = getattr(self._start, "t", None)
+            if start is not None:
+                self._start.t = None
+                self.observe(time.perf_counter_ns() - start)
+
+    def observe(self, elapsed_ns, count=1):
+        """Record one (or count identical) measurements of elapsed_ns"""
+        with self._lock:
+            self.count += count
+            self.total_ns += elapsed_ns * count
+            if elapsed_ns > self.max_ns:
+                self.max_ns = elapsed_ns
+            self.buckets[bisect_left(_BUCKETS_NS, elapsed_ns)] += count
+
+    def percentile(self, p):
+        """Approximate percentile in seconds: the upper bound of the bucket holding it"""
+        if not self.count:
+            return 0.0
+        rank = p * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return BUCKETS[i] if i < len(BUCKETS) else self.max_ns / 1e9
+        return self.max_ns / 1e9
+
+    def snapshot(self):
+        with self._lock:
+            return {"count": self.count, "total_ns": self.total_ns, "max_ns": self.max_ns,
+                    "buckets": list(self.buckets)}
+
+    def merge(self, snap):
+        """Fold in a snapshot() taken elsewhere (e.g. in a worker process)"""
+        with self._lock:
+            self.count += snap["count"]
+            self.total_ns += snap["total_ns"]
+            self.max_ns = max(self.max_ns, snap["max_ns"])
+            for i, n in enumerate(snap["buckets"]):
+                self.buckets[i] += n
+
+
+class Counter:
+    """Monotonic event counter"""
+
+    __slots__ = ("name", "registry", "value", "_lock")
+
+    def __init__(self, name, registry):
+        self.name = name
+        self.registry = registry
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, n=1):
+        if self.registry.enabled:
+            with self._lock:
+                self.value += n
+
+
+class Metrics:
+    """Registry of named timers and counters, switchable on and off"""
+
+    def __init__(self, enabled=None):
+        if enabled is None:
+            enabled = os.environ.get("TELEPHONY_METRICS", "") not in ("", "0")
+        self.enabled = enabled
+        self.timers = {}
+        self.counters = {}
+        self.gauges = {}  # name -> zero-argument callable, sampled on snapshot
+        self._lock = threading.Lock()
+
+    def enable(self, on=True):
+        self.enabled = on
+
+    def timer(self, name):
+        """The Timer for a stage, created on first use"""
+        with self._lock:
+            if name not in self.timers:
+                self.timers[name] = Timer(name, self)
+            return self.timers[name]
+
+    def counter(self, name):
+        with self._lock:
+            if name not in self.counters:
+                self.counters[name] = Counter(name, self)
+            return self.counters[name]
+
+    def gauge(self, name, read):
+        """Report read() under name in every snapshot (e.g. cache size)"""
+        self.gauges[name] = read
+
+    def reset(self):
+        for timer in list(self.timers.values()):
+            timer.reset()
+        for counter in list(self.counters.values()):
+            counter.value = 0
+
+    def snapshot(self):
+        """JSON-serialisable view of every timer, counter and gauge"""
+        gauges = {}
+        for name, read in list(self.gauges.items()):
+            try:
+                gauges[name] = read()
+            except Exception:
+                continue
+        return {
+            "enabled": self.enabled,
+            "time": time.time(),
+            "timers": {name: t.snapshot() for name, t in sorted(self.timers.items())},
+            "counters": {name: c.value for name, c in sorted(self.counters.items())},
+            "gauges": gauges,
+        }
+
+    def drain(self):
+        """Snapshot of timers and counters with any activity, then reset them"""
+        snap = {"timers": {n: s for n, s in ((n, t.snapshot()) for n, t in self.timers.items()) if s["count"]},
+                "counters": {n: c.value for n, c in self.counters.items() if c.value}}
+        self.reset()
+        return snap
+
+    def merge(self, snap):
+        """Fold in a drain() from another process"""
+        for name, timer_snap in snap.get("timers", {}).items():
+            self.timer(name).merge(timer_snap)
+        for name, value in snap.get("counters", {}).items():
+            counter = self.counter(name)
+            with counter._lock:
+                counter.value += value
+
+    def rows(self):
+        """(stage, count, mean s, p50 s, p99 s, max s, total s) per timer, busiest first"""
+        rows = []
+        for name, t in self.timers.items():
+            if t.count:
+                rows.append((name, t.count, t.total_ns / t.count / 1e9, t.percentile(0.5),
+                             t.percentile(0.99), t.max_ns / 1e9, t.total_ns / 1e9))
+        return sorted(rows, key=lambda r: r[6], reverse=True)
+
+    def to_prometheus(self, prefix="telephony"):
+        """Prometheus text exposition format"""
+        lines = [f"# HELP {prefix}_stage_seconds Wall time spent per stage",
+                 f"# TYPE {prefix}_stage_seconds histogram"]
+        for name, t in sorted(self.timers.items()):
+            snap = t.snapshot()
+            cumulative = 0
+            for bound, n in zip(BUCKETS + (float("inf"),), snap["buckets"]):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {snap["total_ns"] / 1e9}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {snap["count"]}')
+        for name, c in sorted(self.counters.items()):
+            metric = f"{prefix}_{name.replace('.', '_')}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {c.value}"]
+        for name, value in sorted(self.snapshot()["gauges"].items()):
+            if isinstance(value, (int, float)):
+                metric = f"{prefix}_{name.replace('.', '_')}"
+                lines += [f"# TYPE {metric} gauge", f"{metric} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Dump to path: Prometheus text for .prom/.txt, JSON otherwise (written atomically)"""
+        if path.endswith((".prom", ".txt")):
+            data = self.to_prometheus()
+        else:
+            data = json.dumps(self.snapshot(), indent=2)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+
+METRICS = Metrics()
@@ -0,0 +1,239 @@
+"""Compiled prefix index for the Telephony Intelligence Suite.
+
+phonenumbers ships ~290k geographic and ~30k carrier prefixes as Python
+dicts that take ~0.5s to import. They are compiled once into a digit
+trie held in flat int32 arrays in one file:
+
+    header    magic, byte order, counts, source stamp
+    children  int32[internal nodes * 10]  child per digit, -1 if none
+    place     int32[nodes]  label of the place prefix ending here, -1 if none
+    carrier   int32[nodes]  label of the carrier prefix ending here, -1 if none
+    offsets   uint32[labels + 1], then the UTF-8 label bytes
+
+Nodes with children are numbered first, so a node's row in children is
+its own number. The file is memory-mapped: loading is instant and every
+process shares one copy through the page cache. A longest-prefix match
+reads one child per digit and allocates nothing on the way down.
+
+An optional CSV of prefix,description[,carrier] rows (--prefix-table or
+TELEPHONY_PREFIXES; prefixes include the calling code, e.g. +44 20) is
+merged in, its labels winning over phonenumbers' for the same prefix.
+The index is rebuilt automatically when phonenumbers or the table changes.
+"""
+import os
+import csv
+import sys
+import mmap
+import struct
+import threading
+from array import array
+
+import phonenumbers
+
+DEFAULT_INDEX_NAME = "telephony_prefixes.idx"
+MAGIC = b"TPX1"
+_HEADER = struct.Struct("<4sIIIIII")  # magic, little-endian, nodes, internal, labels, label bytes, stamp bytes
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def index_path_for(db_path):
+    """Default index file for a database: next to it"""
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), DEFAULT_INDEX_NAME)
+
+
+def configured_table(table=None):
+    """The user prefix table to merge: table, else $TELEPHONY_PREFIXES, else None"""
+    return table or os.environ.get("TELEPHONY_PREFIXES") or None
+
+
+def _stamp(table):
+    """Identifies the sources an index was compiled from"""
+    stamp = f"phonenumbers {phonenumbers.__version__}"
+    if table:
+        st = os.stat(table)
+        stamp += f"|{os.path.abspath(table)}|{st.st_size}|{st.st_mtime_ns}"
+    return stamp.encode("utf-8")
+
+
+def _label(descriptions):
+    """English description if there is one, else the first language's"""
+    return descriptions.get("en") or descriptions[min(descriptions)]
+
+
+def read_table(path):
+    """{digits: (description, carrier or None)} from a user prefix CSV"""
+    entries = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if len(row) < 2:
+                continue
+            digits = "".join(ch for ch in row[0] if ch.isdigit())
+            if not digits:
+                continue  # header or comment
+            carrier = row[2].strip() if len(row) > 2 and row[2].strip() else None
+            entries[digits] = (row[1].strip(), carrier)
+    return entries
+
+
+def compile_index(path, table=None):
+    """Build the index file at path from phonenumbers' prefix data and an optional table"""
+    from phonenumbers.geodata import GEOCODE_DATA
+    from phonenumbers.carrierdata import CARRIER_DATA
+
+    # prefix -> [place, carrier]
+    entries = {prefix: [_label(d), None] for prefix, d in GEOCODE_DATA.items() if d}
+    for prefix, d in CARRIER_DATA.items():
+        if d:
+            entries.setdefault(prefix, [None, None])[1] = _label(d)
+    if table:
+        for prefix, (place, carrier) in read_table(table).items():
+            entry = entries.setdefault(prefix, [None, None])
+            entry[0] = place or entry[0]
+            entry[1] = carrier or entry[1]
+
+    nodes = {""}
+    for prefix in entries:
+        for i in range(1, len(prefix) + 1):
+            nodes.add(prefix[:i])
+    internal = sorted({node[:-1] for node in nodes if node})  # "" (the root) sorts first
+    ids = {node: i for i, node in enumerate(internal)}
+    for node in sorted(nodes - ids.keys()):
+        ids[node] = len(ids)
+
+    children = array('i', [-1]) * (len(internal) * 10)
+    for node, i in ids.items():
+        if node:
+            children[ids[node[:-1]] * 10 + int(node[-1])] = i
+
+    labels, label_ids = [], {}
+
+    def label_id(text):
+        if text is None:
+            return -1
+        if text not in label_ids:
+            label_ids[text] = len(labels)
+            labels.append(text)
+        return label_ids[text]
+
+    place = array('i', [-1]) * len(ids)
+    carrier = array('i', [-1]) * len(ids)
+    for prefix, (place_label, carrier_label) in entries.items():
+        place[ids[prefix]] = label_id(place_label)
+        carrier[ids[prefix]] = label_id(carrier_label)
+
+    blob = bytearray()
+    offsets = array('I', [0])
+    for text in labels:
+        blob += text.encode("utf-8")
+        offsets.append(len(blob))
+
+    stamp = _stamp(table)
+    header = _HEADER.pack(MAGIC, sys.byteorder == "little", len(ids), len(internal), len(labels),
+                          len(blob), len(stamp)) + stamp
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(header + b"\0" * (-len(header) % 8))
+        for part in (children, place, carrier, offsets):
+            part.tofile(f)
+        f.write(blob)
+    os.replace(tmp, path)
+    return len(entries)
+
+
+class PrefixIndex:
+    """Memory-mapped longest-prefix lookup over a compiled index file"""
+
+    def __init__(self, path, table=None):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        magic, little, nodes, internal, labels, blob_len, stamp_len = _HEADER.unpack_from(view)
+        stamp = bytes(view[_HEADER.size:_HEADER.size + stamp_len])
+        if magic != MAGIC or little != (sys.byteorder == "little") or stamp != _stamp(table):
+            view.release()
+            self._mmap.close()
+            raise ValueError(f"Stale or foreign prefix index: {path}")
+
+        offset = _HEADER.size + stamp_len
+        offset += -offset % 8
+
+        def take(typecode, count, itemsize=4):
+            nonlocal offset
+            part = view[offset:offset + count * itemsize].cast(typecode)
+            offset += count * itemsize
+            return part
+
+        self.internal = internal
+        self.children = take('i', internal * 10)
+        self.place = take('i', nodes)
+        self.carrier = take('i', nodes)
+        self._offsets = take('I', labels + 1)
+        self._blob = view[offset:offset + blob_len]
+        self._labels = [None] * labels  # decoded on first use
+
+    def label(self, i):
+        text = self._labels[i]
+        if text is None:
+            text = self._labels[i] = str(self._blob[self._offsets[i]:self._offsets[i + 1]], "utf-8")
+        return text
+
+    def match(self, digits):
+        """(place prefix length, place label id, carrier prefix length, carrier label id); ids are -1 if none
+
+        digits is the number's digits without "+"; matching stops at the first non-digit.
+        """
+        children, place, carrier, internal = self.children, self.place, self.carrier, self.internal
+        node = depth = place_len = carrier_len = 0
+        place_id = carrier_id = -1
+        for ch in digits:
+            digit = ord(ch) - 48
+            if node >= internal or not 0 <= digit <= 9:
+                break  # a leaf, or a non-digit (the match covers the digits before it)
+            node = children[node * 10 + digit]
+            if node < 0:
+                break
+            depth += 1
+            if place[node] >= 0:
+                place_id, place_len = place[node], depth
+            if carrier[node] >= 0:
+                carrier_id, carrier_len = carrier[node], depth
+        return place_len, place_id, carrier_len, carrier_id
+
+    def describe(self, e164, calling_code):
+        """Human-readable prefix analysis for an E.164 number"""
+        digits = e164[1:] if e164.startswith("+") else e164
+        place_len, place_id, carrier_len, carrier_id = self.match(digits)
+        cc = len(calling_code)
+        parts = []
+        if place_id >= 0:
+            parts.append(f"Prefix +{calling_code} {digits[cc:place_len]}".rstrip() + f": {self.label(place_id)}")
+        if carrier_id >= 0:
+            parts.append(f"Carrier block +{calling_code} {digits[cc:carrier_len]}".rstrip()
+                         + f": {self.label(carrier_id)}")
+        return "; ".join(parts) or "No prefix data"
+
+
+def prefix_index(path, table=None):
+    """The shared PrefixIndex for path, compiling it first if missing or stale"""
+    key = (path, table)
+    index = _indexes.get(key)
+    if index is None:
+        with _lock:
+            index = _indexes.get(key)
+            if index is None:
+                try:
+                    index = PrefixIndex(path, table)
+                except (OSError, ValueError, struct.error):
+                    compile_index(path, table)
+                    index = PrefixIndex(path, table)
+                _indexes[key] = index
+    return index
+
+
+def warm_index(db_path, table=None):
+    """Open (compiling if needed) the index for db_path before starting worker processes,
+    so they find it ready instead of each compiling their own"""
+    return prefix_index(index_path_for(db_path), configured_table(table))
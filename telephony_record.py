@@ -0,0 +1,135 @@
+"""Compact enrichment record for the Telephony Intelligence Suite.
+
+A NumberRecord holds one enriched number with native field types: the
+calling code as an int, validity as bools, the number type as the
+phonenumbers enum value and the spam score as an int. Display strings
+('+91', 'True', '7/10', ...) are only produced by display() at the GUI
+and export edges.
+"""
+import json
+
+from phonenumbers import PhoneNumberType
+
+SPAM_SCORE_MAX = 10
+
+# Mapping of number type
+TYPE_MAP = {
+    PhoneNumberType.FIXED_LINE: "Fixed line",
+    PhoneNumberType.MOBILE: "Mobile",
+    PhoneNumberType.FIXED_LINE_OR_MOBILE: "Fixed line or Mobile",
+    PhoneNumberType.TOLL_FREE: "Toll free",
+    PhoneNumberType.PREMIUM_RATE: "Premium rate",
+    PhoneNumberType.SHARED_COST: "Shared cost",
+    PhoneNumberType.VOIP: "VoIP",
+    PhoneNumberType.PERSONAL_NUMBER: "Personal number",
+    PhoneNumberType.PAGER: "Pager",
+    PhoneNumberType.UAN: "UAN",
+    PhoneNumberType.VOICEMAIL: "Voicemail",
+    PhoneNumberType.UNKNOWN: "Unknown",
+}
+
+# (attribute, display label, formatter) for every displayed field, in display order
+FIELDS = (
+    ("country", "Country", None),
+    ("calling_code", "Country Code", lambda v: f"+{v}"),
+    ("region_code", "Region Code", None),
+    ("state_region", "State/Region", None),
+    ("city", "City", None),
+    ("location", "Location", None),
+    ("carrier", "Carrier", None),
+    ("national", "Formatted Number", None),
+    ("international", "International Number", None),
+    ("number_type", "Network Type", lambda v: TYPE_MAP.get(v, "Unknown")),
+    ("valid", "Valid", str),
+    ("possible", "Possible", str),
+    ("timezones", "Timezones", lambda v: ", ".join(v) or "Unknown"),
+    ("spam_score", "Spam Score", lambda v: f"{v}/{SPAM_SCORE_MAX}"),
+)
+# Only filled in by advanced lookups
+ADVANCED_FIELDS = (
+    ("portability", "Portability Status", None),
+    ("prefix_info", "Prefix Info", None),
+    ("social_media", "Social Media", None),
+)
+
+LABELS = {attr: label for attr, label, _ in FIELDS + ADVANCED_FIELDS}
+_FORMATTERS = {attr: fmt for attr, _, fmt in FIELDS + ADVANCED_FIELDS if fmt}
+
+
+def format_value(attr, value):
+    """Display string for one field value"""
+    fmt = _FORMATTERS.get(attr)
+    return fmt(value) if fmt else value
+
+
+class NumberRecord:
+    """One enriched number with native field types"""
+
+    __slots__ = ("e164", "country", "calling_code", "region_code", "state_region", "city", "location",
+                 "carrier", "national", "international", "number_type", "valid", "possible",
+                 "timezones", "spam_score", "portability", "prefix_info", "social_media")
+
+    def __init__(self, e164, country, calling_code, region_code, state_region, city, location,
+                 carrier, national, international, number_type, valid, possible, timezones,
+                 spam_score, portability=None, prefix_info=None, social_media=None):
+        self.e164 = e164
+        self.country = country
+        self.calling_code = calling_code
+        self.region_code = region_code
+        self.state_region = state_region
+        self.city = city
+        self.location = location
+        self.carrier = carrier
+        self.national = national
+        self.international = international
+        self.number_type = number_type
+        self.valid = valid
+        self.possible = possible
+        self.timezones = timezones
+        self.spam_score = spam_score
+        self.portability = portability
+        self.prefix_info = prefix_info
+        self.social_media = social_media
+
+    @property
+    def advanced(self):
+        """True if the advanced lookups were run for this record"""
+        return self.portability is not None
+
+    def as_tuple(self):
+        return tuple(getattr(self, attr) for attr in self.__slots__)
+
+    def replace(self, **changes):
+        """A copy with some fields changed (records served from the cache are shared)"""
+        values = dict(zip(self.__slots__, self.as_tuple()))
+        values.update(changes)
+        return NumberRecord(**values)
+
+    def __reduce__(self):
+        # Pickle as a bare tuple so records cross process boundaries cheaply
+        return (NumberRecord, self.as_tuple())
+
+    def __eq__(self, other):
+        return isinstance(other, NumberRecord) and self.as_tuple() == other.as_tuple()
+
+    def __repr__(self):
+        return f"NumberRecord({self.e164!r}, {self.country!r}, {self.carrier!r})"
+
+    def display(self):
+        """Display label -> display string, in the order the GUI and exports show them"""
+        fields = FIELDS + ADVANCED_FIELDS if self.advanced else FIELDS
+        return {label: fmt(getattr(self, attr)) if fmt else getattr(self, attr)
+                for attr, label, fmt in fields}
+
+    def to_json(self):
+        return json.dumps(self.as_tuple(), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text):
+        """Inverse of to_json; None for data stored in another format"""
+        values = json.loads(text)
+        if not isinstance(values, list) or len(values) != len(cls.__slots__):
+            return None
+        record = cls(*values)
+        record.timezones = tuple(record.timezones)
+        return record
@@ -0,0 +1,244 @@
+"""Region resolution for the Telephony Intelligence Suite.
+
+National-format numbers carry no calling code, so the region has to be
+guessed. RegionIndex precomputes each candidate region's valid national
+number patterns (the union of its number-type patterns), possible lengths
+and national prefix from the phonenumbers metadata, picks the matching
+region in one pass over plain regexes and then parses the number exactly
+once.
+
+RegionDetector does the same for text still being typed: it reads the
+calling code from a prefix table as soon as it is complete and narrows
+the candidate regions as more digits arrive instead of starting over on
+every keystroke.
+"""
+import os
+import re
+
+import phonenumbers
+from phonenumbers import PhoneMetadata, region_code_for_number, NumberParseException
+
+# Candidate regions for national-format input, in priority order. Override
+# per deployment with TELEPHONY_REGIONS="IN,GB,US" or RegionIndex(regions=...).
+DEFAULT_REGIONS = ("US", "IN", "GB", "CA", "AU", "DE", "FR", "JP", "CN", "BR")
+DEFAULT_REGION = "US"
+
+# Number-type descriptions that make a number valid for its region
+_TYPE_DESCS = ("fixed_line", "mobile", "toll_free", "premium_rate", "shared_cost",
+               "personal_number", "voip", "pager", "uan", "voicemail")
+
+# Calling code (as typed digits) -> its regions, main region first
+CALLING_CODES = {str(code): regions for code, regions in phonenumbers.COUNTRY_CODE_TO_REGION_CODE.items()}
+_MAX_CALLING_CODE = max(len(code) for code in CALLING_CODES)
+# Digits a national prefix or unprefixed calling code may add in front of a national number
+_MAX_PREFIX = 4
+
+# Regions the phonenumbers locale data has no name for
+_EXTRA_NAMES = {"AC": "Ascension Island", "TA": "Tristan da Cunha", "XK": "Kosovo",
+                "001": "International Networks"}
+
+
+def region_name(region_code, lang="en"):
+    """Display name of a region code, e.g. 'GB' -> 'United Kingdom' (the code itself if unknown)"""
+    # Importing the locale table loads all geocoding data, so wait until a name is needed
+    from phonenumbers.geodata.locale import LOCALE_DATA
+
+    names = LOCALE_DATA.get(region_code)
+    if names is None:
+        return _EXTRA_NAMES.get(region_code, region_code)
+    name = names.get(lang) or names.get("en", "")
+    if name.startswith("*"):  # shared with another language
+        name = names.get(name[1:], "")
+    return name or _EXTRA_NAMES.get(region_code, region_code)
+
+
+def _region_patterns(regions):
+    """Union of the valid national number patterns of regions, or None"""
+    patterns = []
+    for region in regions:
+        metadata = PhoneMetadata.metadata_for_region(region)
+        if metadata is None:
+            continue
+        for name in _TYPE_DESCS:
+            desc = getattr(metadata, name)
+            if desc is not None and desc.national_number_pattern:
+                patterns.append(f"(?:{desc.national_number_pattern})")
+    return re.compile("|".join(patterns)) if patterns else None
+
+
+def split_international(cleaned):
+    """(calling code or None, national digits) for '+'/'00' input, or None for national input
+
+    The calling code is None until enough digits are typed to settle it;
+    calling codes are prefix-free, so the first match is the only one.
+    """
+    if cleaned.startswith("+"):
+        digits = phonenumbers.normalize_digits_only(cleaned[1:])
+    elif cleaned.startswith("00"):
+        digits = phonenumbers.normalize_digits_only(cleaned[2:])
+    else:
+        return None
+    for size in range(1, min(_MAX_CALLING_CODE, len(digits)) + 1):
+        if digits[:size] in CALLING_CODES:
+            return digits[:size], digits[size:]
+    return None, digits
+
+
+def configured_regions():
+    """Candidate regions from the TELEPHONY_REGIONS environment variable, or the defaults"""
+    env = os.environ.get("TELEPHONY_REGIONS", "")
+    regions = [r.strip().upper() for r in env.split(",") if r.strip()]
+    return tuple(regions) or DEFAULT_REGIONS
+
+
+class RegionIndex:
+    """Precomputed national number patterns for a set of candidate regions"""
+
+    def __init__(self, regions=None):
+        self.regions = tuple(r.upper() for r in (regions or configured_regions()))
+        self.default_region = self.regions[0] if self.regions else DEFAULT_REGION
+        self._entries = []
+
+        for region in self.regions:
+            metadata = PhoneMetadata.metadata_for_region(region)
+            if metadata is None:
+                continue
+            # A number is valid if it is valid for any region sharing the
+            # calling code (e.g. Canadian area codes parsed as US)
+            pattern = _region_patterns(phonenumbers.COUNTRY_CODE_TO_REGION_CODE.get(metadata.country_code,
+                                                                                     (region,)))
+            if pattern is None:
+                continue
+            prefix = metadata.national_prefix_for_parsing or metadata.national_prefix
+            self._entries.append((
+                region,
+                str(metadata.country_code),
+                re.compile(prefix) if prefix else None,
+                frozenset(metadata.general_desc.possible_length),
+                pattern,
+            ))
+
+    def candidates(self, digits, entries=None):
+        """Yield regions where the digits form a valid national number, in priority order"""
+        for region, calling_code, prefix_re, lengths, pattern in (self._entries if entries is None else entries):
+            nsn = digits
+            if prefix_re is not None:
+                m = prefix_re.match(digits)
+                if m and m.end() and len(digits) - m.end() in lengths:
+                    nsn = digits[m.end():]
+            if len(nsn) in lengths and pattern.fullmatch(nsn):
+                yield region
+            # Calling code written without the leading + (e.g. 447911123456)
+            elif digits.startswith(calling_code):
+                nsn = digits[len(calling_code):]
+                if len(nsn) in lengths and pattern.fullmatch(nsn):
+                    yield region
+
+    def resolve(self, number):
+        """Parse a number once, returning (region, PhoneNumber)
+
+        Raises NumberParseException if the number cannot be parsed.
+        """
+        cleaned = number.strip()
+
+        # If number starts with + (or 00), the calling code decides the region
+        if cleaned.startswith('+'):
+            num = phonenumbers.parse(cleaned, None)
+            return region_code_for_number(num) or self.default_region, num
+
+        if cleaned.startswith('00'):
+            try:
+                num = phonenumbers.parse('+' + cleaned[2:], None)
+                return region_code_for_number(num) or self.default_region, num
+            except NumberParseException:
+                pass
+
+        digits = phonenumbers.normalize_digits_only(cleaned)
+        region = next(self.candidates(digits), self.default_region)
+        num = phonenumbers.parse(cleaned, region)
+        return region, num
+
+
+class RegionDetector:
+    """Incremental region detection for a number that is still being typed
+
+    detect() remembers the previous input: when the new text only extends
+    it, the regions already ruled out stay ruled out (a number only gets
+    longer, so a region whose longest number is exceeded never comes back)
+    and only the survivors are checked. quick() is a dict lookup for
+    immediate feedback once a calling code is complete.
+    """
+
+    def __init__(self, index=None):
+        self.index = index or RegionIndex()
+        self._own = {}  # region -> (lengths, longest, own pattern), built on first use
+        self._key = None  # (calling code or None, digits) of the last detect()
+        self._alive = None  # candidates still possible for that input
+        self._result = ((), False)
+
+    def _entry(self, region):
+        if region not in self._own:
+            metadata = PhoneMetadata.metadata_for_region(region)
+            if metadata is None:  # non-geographic ("001") entities
+                self._own[region] = None
+            else:
+                lengths = frozenset(metadata.general_desc.possible_length)
+                self._own[region] = (lengths, max(lengths, default=0), _region_patterns((region,)))
+        return self._own[region]
+
+    def quick(self, text):
+        """Main region of the calling code in text, if one is complete and new since the last detect()"""
+        split = split_international(text.strip())
+        if split is None or split[0] is None or (self._key and self._key[0] == split[0]):
+            return None
+        return CALLING_CODES[split[0]][0]
+
+    def detect(self, text):
+        """(regions, exact): candidate regions best first, and whether regions[0] validates the number"""
+        cleaned = text.strip()
+        split = split_international(cleaned)
+        if split is None:
+            key = (None, phonenumbers.normalize_digits_only(cleaned))
+        elif split[0] is None:
+            return (), False  # calling code not complete yet
+        else:
+            key = split
+        if key == self._key:
+            return self._result
+
+        previous, alive = self._key, self._alive
+        narrowing = previous is not None and previous[0] == key[0] and key[1].startswith(previous[1])
+        self._key = key
+        if key[0] is None:
+            self._result = self._detect_national(key[1], alive if narrowing else self.index._entries)
+        else:
+            self._result = self._detect_international(key[0], key[1], alive if narrowing else None)
+        return self._result
+
+    def _detect_national(self, digits, entries):
+        longest = len(digits) - _MAX_PREFIX
+        self._alive = [entry for entry in entries if max(entry[3], default=0) >= longest]
+        matched = list(self.index.candidates(digits, self._alive))
+        if matched:
+            return tuple(matched), True
+        return tuple(entry[0] for entry in self._alive), False
+
+    def _detect_international(self, calling_code, nsn, alive):
+        regions = CALLING_CODES[calling_code] if alive is None else alive
+        if len(regions) > 1:
+            survivors = []
+            for region in regions:
+                entry = self._entry(region)
+                if entry is None or entry[1] >= len(nsn):
+                    survivors.append(region)
+            regions = tuple(survivors) or regions[:1]
+        self._alive = regions
+        matched = []
+        for region in regions:
+            entry = self._entry(region)
+            if entry is not None and entry[2] is not None and len(nsn) in entry[0] \
+                    and entry[2].fullmatch(nsn):
+                matched.append(region)
+        if matched:
+            return tuple(matched) + tuple(r for r in regions if r not in matched), True
+        return regions, False
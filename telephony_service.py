@@ -0,0 +1,600 @@
+"""Local HTTP enrichment service for the Telephony Intelligence Suite.
+
+    python telephony_cli.py serve --port 8321 -j 4
+
+An asyncio server accepts keep-alive HTTP/1.1 connections and hands the
+CPU-bound enrichment to a pool of worker processes, so the event loop only
+parses requests and writes responses. Endpoints:
+
+    GET  /v1/lookup?number=+14155550123&advanced=1   one number -> JSON object
+    POST /v1/lookup    {"number": "...", "advanced": true}
+    POST /v1/bulk      {"numbers": [...]} or one number per line (NDJSON or
+                       plain text); answered as one JSON document, or streamed
+                       as NDJSON when the client sends Accept: application/x-ndjson
+    GET  /v1/health    pool, queue and connection counts
+    GET  /v1/metrics   stage timers in Prometheus text format
+
+Concurrent lookups of the same number, in any spelling (they are keyed by
+E.164, like the result cache), share one worker call, and single lookups
+arriving together go to the pool as one chunk. Every queue is bounded:
+past max_pending queued numbers single lookups get 503 with Retry-After,
+bulk requests wait for pool capacity, and responses are written with
+drain() so a slow reader only holds up its own request.
+"""
+import os
+import re
+import json
+import time
+import asyncio
+import logging
+import functools
+import threading
+import http.client
+import multiprocessing
+from collections import deque
+from urllib.parse import urlsplit, parse_qs, urlencode
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+import phonenumbers
+from phonenumbers import NumberParseException
+
+from telephony_engine import TelephonyEngine, DEFAULT_DB_PATH
+from telephony_batch import warm_metadata, chunked
+from telephony_regions import RegionIndex
+from telephony_prefixes import warm_index
+from telephony_metrics import METRICS
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8321
+DEFAULT_URL = f"http://{DEFAULT_HOST}:{DEFAULT_PORT}"
+DEFAULT_CHUNK_SIZE = 256
+DEFAULT_MAX_PENDING = 50000  # numbers queued for or running on the pool
+DEFAULT_MAX_CONNECTIONS = 512
+DEFAULT_MAX_BODY = 8 << 20  # bytes
+DEFAULT_IDLE_TIMEOUT = 30.0  # seconds a keep-alive connection may sit idle
+MAX_HEADER_SIZE = 16384
+CANONICAL_MEMO = 65536  # spellings whose E.164 the event loop remembers
+
+NDJSON = "application/x-ndjson"
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           411: "Length Required", 413: "Payload Too Large", 422: "Unprocessable Entity",
+           431: "Request Header Fields Too Large", 500: "Internal Server Error",
+           503: "Service Unavailable"}
+
+_T_REQUEST = METRICS.timer("service_request")
+_T_LOOKUP_CHUNK = METRICS.timer("service_chunk")
+_C_COALESCED = METRICS.counter("service_coalesced")
+_C_REJECTED = METRICS.counter("service_rejected")
+
+_IS_E164 = re.compile(r"\+[1-9][0-9]{1,14}").fullmatch
+
+log = logging.getLogger(__name__)
+
+# Per-process engine, created by _init_worker
+_worker_engine = None
+
+
+def _init_worker(db_path, engine_options, metrics=False):
+    """Process pool initializer: warm metadata and open a private engine"""
+    global _worker_engine
+    METRICS.enable(metrics)
+    warm_metadata()
+    _worker_engine = TelephonyEngine(db_path, **engine_options)
+
+
+def _ping():
+    return os.getpid()
+
+
+def _lookup_chunk(numbers, advanced):
+    """Enrich numbers inside a worker process
+
+    Returns (results, metrics): each number's record as a JSON object of
+    e164 and details (None if it could not be parsed) and the worker's stage
+    timings for the parent to merge. Encoding to JSON here keeps that work
+    off the event loop.
+    """
+    results = []
+    with _T_LOOKUP_CHUNK:
+        for number in numbers:
+            record = _worker_engine.get_number_details(number, advanced)
+            results.append(None if record is None else json.dumps(
+                {"e164": record.e164, "details": record.display()}, ensure_ascii=False))
+    return results, METRICS.drain() if METRICS.enabled else None
+
+
+def _response_line(number, result):
+    """Response line for a number as the client wrote it, around its _lookup_chunk result"""
+    if result is None:
+        return json.dumps({"number": number, "error": "Could not parse number"}, ensure_ascii=False)
+    return '{"number": ' + json.dumps(number, ensure_ascii=False) + ", " + result[1:]
+
+
+def _flag(value):
+    """Query-string or JSON boolean"""
+    if isinstance(value, str):
+        return value.lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+class Overloaded(Exception):
+    """The lookup queue is full; the client should retry later"""
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_bulk(body, content_type):
+    """(numbers, advanced) from a bulk request body
+
+    application/json takes {"numbers": [...], "advanced": bool} or a bare
+    list; anything else is read one number per line, where a line may be a
+    JSON string or {"number": ...} object (NDJSON) or the bare number.
+    """
+    try:
+        text = body.decode("utf-8")
+    except UnicodeDecodeError:
+        raise HttpError(400, "Body is not UTF-8")
+    advanced = False
+    try:
+        if content_type.startswith("application/json"):
+            data = json.loads(text)
+            if isinstance(data, dict):
+                advanced = _flag(data.get("advanced", False))
+                data = data.get("numbers")
+            if not isinstance(data, list):
+                raise HttpError(400, "Expected a list of numbers")
+            return [str(n) for n in data], advanced
+        numbers = []
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if line[0] in '"{':
+                item = json.loads(line)
+                line = item.get("number", "") if isinstance(item, dict) else item
+            numbers.append(str(line))
+        return numbers, advanced
+    except ValueError as e:
+        raise HttpError(400, f"Invalid JSON: {e}")
+
+
+class EnrichmentService:
+    """asyncio HTTP server in front of a process pool of enrichment engines"""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None, db_path=DEFAULT_DB_PATH,
+                 chunk_size=DEFAULT_CHUNK_SIZE, max_pending=DEFAULT_MAX_PENDING,
+                 max_connections=DEFAULT_MAX_CONNECTIONS, max_body=DEFAULT_MAX_BODY,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT, **engine_options):
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.db_path = db_path
+        self.chunk_size = chunk_size
+        self.max_pending = max_pending
+        self.max_connections = max_connections
+        self.max_body = max_body
+        self.idle_timeout = idle_timeout
+        self.engine_options = engine_options
+        self.region_index = RegionIndex(engine_options.get("regions"))
+        self._canonical = functools.lru_cache(CANONICAL_MEMO)(self._parse_e164)
+
+        self.pool = None
+        self.server = None
+        self.pending = 0  # numbers queued for or running on the pool
+        self.connections = 0
+        self.requests = 0
+        self._slots = None  # bounds chunks in flight to the pool
+        self._inflight = {}  # (E.164, advanced) -> Future shared by concurrent lookups
+        self._waiting = []  # single lookups not yet sent to the pool
+        self._flush_scheduled = False
+        self._loop = None
+        self._thread = None
+
+    # ==================== LIFECYCLE ====================
+
+    async def start(self):
+        """Start the worker pool (warm) and begin listening"""
+        self._loop = asyncio.get_running_loop()
+        self._slots = asyncio.Semaphore(self.workers * 2)
+        # Advanced lookups use the prefix index; compile it once before the workers start
+        await self._loop.run_in_executor(None, warm_index, self.db_path, self.engine_options.get("prefix_table"))
+        # spawn keeps Tk and open SQLite handles out of the workers
+        ctx = multiprocessing.get_context("spawn")
+        self.pool = ProcessPoolExecutor(self.workers, mp_context=ctx, initializer=_init_worker,
+                                        initargs=(self.db_path, self.engine_options, METRICS.enabled))
+        await asyncio.gather(*(self._loop.run_in_executor(self.pool, _ping) for _ in range(self.workers)))
+        self.server = await asyncio.start_server(self._handle, self.host, self.port, limit=MAX_HEADER_SIZE)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+    async def serve_forever(self, ready=None):
+        await self.start()
+        if ready is not None:
+            ready(self)
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.stop()
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def run(self):
+        """Serve until interrupted"""
+        try:
+            asyncio.run(self.serve_forever())
+        except KeyboardInterrupt:
+            pass
+
+    def start_in_thread(self):
+        """Serve from a daemon thread; returns a Future that resolves to the URL once listening"""
+        started = Future()
+
+        def serve():
+            try:
+                asyncio.run(self.serve_forever(ready=lambda service: started.set_result(service.url)))
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                if not started.done():
+                    started.set_exception(e)
+
+        self._thread = threading.Thread(target=serve, name="enrichment-service", daemon=True)
+        self._thread.start()
+        return started
+
+    def stop_thread(self):
+        """Stop a service started with start_in_thread"""
+        if self._loop is not None and self.server is not None:
+            self._loop.call_soon_threadsafe(self.server.close)
+        if self._thread is not None:
+            self._thread.join(5)
+
+    # ==================== ENRICHMENT ====================
+
+    async def _run_chunk(self, numbers, advanced):
+        """Response lines for numbers, computed on the pool once a slot is free"""
+        self.pending += len(numbers)
+        try:
+            async with self._slots:
+                lines, worker_metrics = await self._loop.run_in_executor(
+                    self.pool, _lookup_chunk, numbers, advanced)
+        finally:
+            self.pending -= len(numbers)
+        if worker_metrics:
+            METRICS.merge(worker_metrics)
+        return lines
+
+    def _parse_e164(self, number):
+        try:
+            num = self.region_index.resolve(number)[1]
+        except NumberParseException:
+            return None
+        return phonenumbers.format_number(num, phonenumbers.PhoneNumberFormat.E164)
+
+    def canonical(self, number):
+        """E.164 for a number as written (None if unparseable): the key lookups are coalesced on"""
+        number = number.strip()
+        return number if _IS_E164(number) else self._canonical(number)
+
+    async def lookup(self, number, advanced=False):
+        """Record JSON for one number (None if unparseable), sharing work with concurrent lookups
+
+        Lookups are keyed by E.164, so '+1 415 555 0123', '(415) 555-0123'
+        and '+14155550123' arriving together make one worker call.
+        """
+        e164 = self.canonical(number)
+        if e164 is None:
+            return None
+        key = (e164, advanced)
+        future = self._inflight.get(key)
+        if future is not None:
+            _C_COALESCED.inc()
+            return await asyncio.shield(future)
+        if self.pending + len(self._waiting) >= self.max_pending:
+            _C_REJECTED.inc()
+            raise Overloaded()
+        future = self._inflight[key] = self._loop.create_future()
+        self._waiting.append(key)
+        if not self._flush_scheduled:
+            # Everything that arrives during this loop iteration goes out together
+            self._flush_scheduled = True
+            self._loop.call_soon(self._flush_lookups)
+        return await asyncio.shield(future)
+
+    def _flush_lookups(self):
+        self._flush_scheduled = False
+        waiting, self._waiting = self._waiting, []
+        for advanced in (False, True):
+            keys = [key for key in waiting if key[1] == advanced]
+            for chunk in chunked(keys, self.chunk_size):
+                asyncio.ensure_future(self._resolve_lookups(chunk, advanced))
+
+    async def _resolve_lookups(self, keys, advanced):
+        try:
+            lines = await self._run_chunk([number for number, _ in keys], advanced)
+        except Exception as e:
+            for key in keys:
+                future = self._inflight.pop(key)
+                future.set_exception(e)
+                future.exception()  # retrieved by whoever awaits it, if anyone still does
+            return
+        for key, result in zip(keys, lines):
+            self._inflight.pop(key).set_result(result)
+
+    async def bulk(self, numbers, advanced=False):
+        """Yield (chunk, lines) in input order, keeping at most two chunks per worker in flight"""
+        window = deque()
+        try:
+            for chunk in chunked(numbers, self.chunk_size):
+                window.append((chunk, asyncio.ensure_future(self._run_chunk(chunk, advanced))))
+                if len(window) >= self.workers * 2:
+                    chunk, task = window.popleft()
+                    yield chunk, await task
+            while window:
+                chunk, task = window.popleft()
+                yield chunk, await task
+        finally:
+            # Client gone: drop chunks that have not reached a worker yet
+            for _, task in window:
+                task.cancel()
+
+    # ==================== HTTP ====================
+
+    async def _handle(self, reader, writer):
+        """Serve one connection: requests are answered in order until it closes or idles out"""
+        self.connections += 1
+        try:
+            if self.connections > self.max_connections:
+                _C_REJECTED.inc()
+                await self._send(writer, 503, {"error": "Too many connections"}, False, {"Retry-After": "1"})
+                return
+            keep_alive = True
+            while keep_alive:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.idle_timeout)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._send(writer, 431, {"error": "Headers too large"}, False)
+                    return
+                start = time.perf_counter_ns()
+                keep_alive, body = False, None
+                try:
+                    method, target, version, headers = self._parse_head(head)
+                    keep_alive = self._keep_alive(version, headers)
+                    body = await self._read_body(reader, headers)
+                    await self._route(writer, method, target, headers, body, keep_alive)
+                except HttpError as e:
+                    # Only keep the connection if the request body was consumed
+                    keep_alive = keep_alive and body is not None
+                    await self._send(writer, e.status, {"error": str(e)}, keep_alive)
+                except Overloaded:
+                    await self._send(writer, 503, {"error": "Overloaded, retry later"}, keep_alive,
+                                     {"Retry-After": "1"})
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    raise
+                except Exception:
+                    log.exception("Service error in %s", head.split(b"\r\n", 1)[0].decode("latin-1"))
+                    await self._send(writer, 500, {"error": "Internal server error"}, False)
+                    return
+                self.requests += 1
+                if METRICS.enabled:
+                    _T_REQUEST.observe(time.perf_counter_ns() - start)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception:
+            log.exception("Service connection error")
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    @staticmethod
+    def _parse_head(head):
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            raise HttpError(400, "Malformed request line")
+        headers = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, sep, value = line.partition(":")
+            if not sep:
+                raise HttpError(400, "Malformed header")
+            headers[name.strip().lower()] = value.strip()
+        return method.upper(), target, version.upper(), headers
+
+    @staticmethod
+    def _keep_alive(version, headers):
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    async def _read_body(self, reader, headers):
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise HttpError(411, "Chunked request bodies are not supported; send Content-Length")
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HttpError(400, "Invalid Content-Length")
+        if length > self.max_body:
+            raise HttpError(413, f"Body larger than {self.max_body} bytes")
+        return await reader.readexactly(length) if length else b""
+
+    async def _route(self, writer, method, target, headers, body, keep_alive):
+        url = urlsplit(target)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        path = url.path.rstrip("/")
+
+        if path == "/v1/lookup":
+            if method == "GET":
+                number, advanced = query.get("number", ""), _flag(query.get("advanced", "0"))
+            elif method == "POST":
+                try:
+                    data = json.loads(body or b"{}")
+                except ValueError as e:
+                    raise HttpError(400, f"Invalid JSON: {e}")
+                if not isinstance(data, dict):
+                    raise HttpError(400, "Expected a JSON object")
+                number, advanced = str(data.get("number", "")), _flag(data.get("advanced", False))
+            else:
+                raise HttpError(405, "Use GET or POST")
+            if not number.strip():
+                raise HttpError(400, "Missing number")
+            result = await self.lookup(number, advanced)
+            await self._send(writer, 200 if result is not None else 422, _response_line(number, result),
+                             keep_alive)
+
+        elif path == "/v1/bulk":
+            if method != "POST":
+                raise HttpError(405, "Use POST")
+            numbers, advanced = parse_bulk(body, headers.get("content-type", ""))
+            if "advanced" in query:
+                advanced = _flag(query["advanced"])
+            if NDJSON in headers.get("accept", ""):
+                await self._stream_bulk(writer, numbers, advanced, keep_alive)
+            else:
+                parts = []
+                async for chunk, results in self.bulk(numbers, advanced):
+                    parts.extend(map(_response_line, chunk, results))
+                await self._send(writer, 200, '{"results": [' + ", ".join(parts) + "]}", keep_alive)
+
+        elif path == "/v1/health":
+            await self._send(writer, 200, {"status": "ok", "workers": self.workers, "pending": self.pending,
+                                           "inflight": len(self._inflight), "connections": self.connections,
+                                           "requests": self.requests}, keep_alive)
+
+        elif path == "/v1/metrics":
+            await self._send(writer, 200, METRICS.to_prometheus(), keep_alive,
+                             content_type="text/plain; version=0.0.4")
+
+        else:
+            raise HttpError(404, f"No such endpoint: {url.path}")
+
+    async def _stream_bulk(self, writer, numbers, advanced, keep_alive):
+        """NDJSON response in chunked transfer encoding, one chunk per pool result
+
+        A failure after the head is sent ends the stream with an error line,
+        since the status can no longer change.
+        """
+        writer.write(self._head(200, NDJSON, keep_alive, {"Transfer-Encoding": "chunked"}))
+        try:
+            async for chunk, results in self.bulk(numbers, advanced):
+                data = "".join(line + "\n" for line in map(_response_line, chunk, results)).encode("utf-8")
+                writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            raise
+        except Exception:
+            log.exception("Service error in a streamed bulk response")
+            data = b'{"error": "Internal server error"}\n'
+            writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    @staticmethod
+    def _head(status, content_type, keep_alive, headers=None):
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", f"Content-Type: {content_type}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    async def _send(self, writer, status, body, keep_alive, headers=None,
+                    content_type="application/json; charset=utf-8"):
+        if not isinstance(body, (str, bytes)):
+            body = json.dumps(body, ensure_ascii=False)
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        headers = dict(headers or {}, **{"Content-Length": str(len(body))})
+        writer.write(self._head(status, content_type, keep_alive, headers) + body)
+        await writer.drain()
+
+
+# ==================== CLIENT ====================
+
+class ServiceError(Exception):
+    def __init__(self, status, message):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+
+
+class ServiceClient:
+    """Blocking client for the enrichment service over one keep-alive connection"""
+
+    def __init__(self, url=DEFAULT_URL, timeout=30.0):
+        parts = urlsplit(url)
+        self.url = url
+        self.host = parts.hostname or DEFAULT_HOST
+        self.port = parts.port or DEFAULT_PORT
+        self.timeout = timeout
+        self._conn = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="service-client")
+
+    def request(self, method, path, body=None, headers=None):
+        """(status, response bytes); reconnects once if a kept-alive connection went stale"""
+        with self._lock:
+            for attempt in (0, 1):
+                if self._conn is None:
+                    self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+                try:
+                    self._conn.request(method, path, body, headers or {})
+                    response = self._conn.getresponse()
+                    data = response.read()
+                    if response.getheader("Connection", "").lower() == "close":
+                        self._conn.close()
+                        self._conn = None
+                    return response.status, data
+                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                    self._conn.close()
+                    self._conn = None
+                    if attempt:
+                        raise
+
+    def _json(self, method, path, payload=None, ok=(200,)):
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        status, data = self.request(method, path, body, {"Content-Type": "application/json"})
+        result = json.loads(data) if data else {}
+        if status not in ok:
+            raise ServiceError(status, result.get("error", data[:200]) if isinstance(result, dict) else data[:200])
+        return result
+
+    def lookup(self, number, advanced=True):
+        """{"number", "e164", "details"} for one number, or {"number", "error"} if unparseable"""
+        query = urlencode({"number": number, "advanced": int(advanced)})
+        return self._json("GET", f"/v1/lookup?{query}", ok=(200, 422))
+
+    def bulk(self, numbers, advanced=False):
+        return self._json("POST", "/v1/bulk", {"numbers": list(numbers), "advanced": advanced})["results"]
+
+    def health(self):
+        return self._json("GET", "/v1/health")
+
+    def metrics(self):
+        status, data = self.request("GET", "/v1/metrics")
+        return data.decode("utf-8")
+
+    def submit(self, method, *args):
+        """Future resolving to method(*args), run off the calling thread"""
+        return self._executor.submit(getattr(self, method), *args)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,633 @@
+"""Spam report store and spam scoring for the Telephony Intelligence Suite.
+
+spam_reports holds one row per number, stored in E.164 form under a
+unique index. Lookups are served from an in-memory hash loaded from the
+table (kept in sync by add_report/reload) or, with preload off, from
+indexed queries that fetch a whole chunk of numbers at once.
+
+Report feeds (CSV or NDJSON, millions of rows) are loaded with ingest:
+numbers are normalized and pre-aggregated in memory, staged into a temp
+table with executemany and merged with one upsert per chunk, all in one
+transaction. The in-memory hash is swapped for a fresh one once the load
+has committed.
+
+Scores come from a declarative rule table (DEFAULT_RULES, or a JSON list
+of the same dicts via TELEPHONY_SPAM_RULES). SpamScorer applies it to one
+number at a time during enrichment, or to whole columns at once with
+NumPy: every rule feature is computed as an array, report counts are
+joined with one sorted-array search, and a score array comes back.
+"""
+import os
+import re
+import csv
+import sys
+import gzip
+import json
+import time
+import operator
+import itertools
+import threading
+from datetime import datetime, timezone
+
+from telephony_record import SPAM_SCORE_MAX
+from telephony_metrics import METRICS
+
+LOOKUP_CHUNK = 500  # stays under SQLite's bound-parameter limit
+INGEST_CHUNK = 100000  # distinct numbers staged per merge
+_NORMALIZE_MEMO = 1 << 20  # feed spellings remembered while ingesting
+
+# Feed column names (CSV header or NDJSON key) per field, first match wins
+FEED_FIELDS = {
+    "number": ("number", "phone_number", "phone", "e164", "msisdn"),
+    "spam_type": ("spam_type", "type", "category"),
+    "count": ("report_count", "count", "reports"),
+    "reported": ("last_reported", "reported_at", "timestamp", "date"),
+}
+
+_T_QUERY = METRICS.timer("spam_query")
+_T_REPORT = METRICS.timer("spam_report")
+_T_SCORE_MANY = METRICS.timer("spam_score_many")
+_T_INGEST_MERGE = METRICS.timer("spam_ingest_merge")
+
+# Rules are summed in order and the total capped at SPAM_SCORE_MAX.
+#   feature  reports (report count), digits (number length), repeated_digits
+#            (longest run of one digit), carrier, country
+#   op       "per": points per unit of the feature, up to cap
+#            ">=", "<": points when the feature compares true against value
+#            "in": points when the (lower-cased) carrier/country is in value
+DEFAULT_RULES = (
+    {"name": "reported", "feature": "reports", "op": "per", "points": 2, "cap": 6},
+    {"name": "repeated_digits", "feature": "repeated_digits", "op": ">=", "value": 6, "points": 2},
+    {"name": "short_number", "feature": "digits", "op": "<", "value": 6, "points": 1},
+    {"name": "unknown_carrier", "feature": "carrier", "op": "in", "value": ("unknown", "voip"), "points": 1},
+)
+FEATURES = ("reports", "digits", "repeated_digits", "carrier", "country")
+_CATEGORICAL = ("carrier", "country")
+_OPS = ("per", ">=", "<", "in")
+_MAX_INT_DIGITS = 18  # longer numbers do not fit an int64 key
+
+_DIGIT_RUN = re.compile(r"(\d)\1*")
+# Already E.164 (the form normalize_existing leaves alone), so feeds skip parsing it
+_IS_E164 = re.compile(r"\+[1-9][0-9]{1,14}").fullmatch
+
+
+class SpamStore:
+    """Indexed spam-report lookups with an optional in-memory front"""
+
+    def __init__(self, conn, normalize, preload=True):
+        self.conn = conn
+        self.normalize = normalize
+        self.preload = preload
+        self._lock = threading.Lock()
+        self._reports = None
+        self._arrays = None  # (keys, counts) for vectorized joins, rebuilt after changes
+
+        self.normalize_existing()
+        self.ensure_unique()
+        if preload:
+            self.reload()
+
+    def normalize_existing(self):
+        """Rewrite reports stored in national, 00-prefixed or spaced form to E.164"""
+        rows = self.conn.execute(
+            "SELECT id, phone_number FROM spam_reports "
+            "WHERE phone_number NOT GLOB '+[1-9]*' OR phone_number GLOB '+*[^0-9]*'").fetchall()
+        updates = []
+        for row_id, number in rows:
+            e164 = self.normalize(number or "")
+            if e164:
+                updates.append((e164, row_id))
+        if updates:
+            with self.conn:
+                # A rewritten number may now collide with its E.164 row; ensure_unique folds them
+                self.conn.execute("DROP INDEX IF EXISTS idx_spam_reports_number")
+                self.conn.executemany("UPDATE spam_reports SET phone_number = ? WHERE id = ?", updates)
+
+    def ensure_unique(self):
+        """Fold duplicate rows for a number into one, then keep it that way with a unique index"""
+        if self.conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' "
+                             "AND name = 'idx_spam_reports_number'").fetchone():
+            return
+        with self.conn:
+            self.conn.execute('''
+                UPDATE spam_reports SET
+                    report_count = (SELECT SUM(d.report_count) FROM spam_reports d
+                                    WHERE d.phone_number = spam_reports.phone_number),
+                    spam_type = (SELECT d.spam_type FROM spam_reports d
+                                 WHERE d.phone_number = spam_reports.phone_number AND d.spam_type IS NOT NULL
+                                 ORDER BY d.last_reported DESC LIMIT 1),
+                    last_reported = (SELECT MAX(d.last_reported) FROM spam_reports d
+                                     WHERE d.phone_number = spam_reports.phone_number)
+                WHERE id IN (SELECT MIN(id) FROM spam_reports GROUP BY phone_number HAVING COUNT(*) > 1)
+            ''')
+            self.conn.execute("DELETE FROM spam_reports WHERE id NOT IN "
+                              "(SELECT MIN(id) FROM spam_reports GROUP BY phone_number)")
+            self.conn.execute("DROP INDEX IF EXISTS idx_spam_reports_phone")
+            self.conn.execute("CREATE UNIQUE INDEX idx_spam_reports_number ON spam_reports(phone_number)")
+
+    def reload(self):
+        """Rebuild the in-memory hash from the table and swap it in atomically"""
+        with self._lock:
+            reports = {}
+            cursor = self.conn.execute("SELECT phone_number, report_count, spam_type FROM spam_reports")
+            for number, count, spam_type in cursor:
+                reports[number] = (count, spam_type)
+            self._reports = reports
+            self._arrays = None
+
+    def lookup(self, e164):
+        """(report_count, spam_type) for an E.164 number, or None"""
+        reports = self._reports
+        if reports is not None:
+            return reports.get(e164)
+        with _T_QUERY:
+            return self.conn.execute('''
+                SELECT SUM(report_count), MAX(spam_type) FROM spam_reports
+                WHERE phone_number = ? HAVING COUNT(*) > 0
+            ''', (e164,)).fetchone()
+
+    def lookup_many(self, numbers):
+        """Map each reported E.164 number in an iterable to (report_count, spam_type)"""
+        reports = self._reports
+        if reports is not None:
+            return {n: reports[n] for n in numbers if n in reports}
+
+        found = {}
+        numbers = list(set(numbers))
+        for i in range(0, len(numbers), LOOKUP_CHUNK):
+            chunk = numbers[i:i + LOOKUP_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            with _T_QUERY:
+                cursor = self.conn.execute(f'''
+                    SELECT phone_number, SUM(report_count), MAX(spam_type) FROM spam_reports
+                    WHERE phone_number IN ({placeholders}) GROUP BY phone_number
+                ''', chunk)
+                for number, count, spam_type in cursor:
+                    found[number] = (count, spam_type)
+        return found
+
+    def add_report(self, e164, spam_type=None):
+        """Record one report for an E.164 number"""
+        with self._lock, _T_REPORT:
+            self.conn.execute('''
+                INSERT INTO spam_reports (phone_number, spam_type) VALUES (?, ?)
+                ON CONFLICT(phone_number) DO UPDATE SET
+                    report_count = report_count + 1, last_reported = CURRENT_TIMESTAMP,
+                    spam_type = COALESCE(excluded.spam_type, spam_type)
+            ''', (e164, spam_type))
+            self.conn.commit()
+
+            if self._reports is not None:
+                count, old_type = self._reports.get(e164, (0, None))
+                self._reports[e164] = (count + 1, spam_type or old_type)
+            self._arrays = None
+
+    def ingest(self, records, chunk_size=INGEST_CHUNK):
+        """Upsert a stream of (number, spam_type, count, reported) feed records in one transaction
+
+        Each count is added to the number's report_count, last_reported
+        keeps the later timestamp and spam_type follows the most recent
+        report that names one. Returns an IngestStats. The in-memory hash
+        is rebuilt after the commit and swapped in at once, so lookups
+        never see a half-loaded feed.
+        """
+        stats = IngestStats()
+        now = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+        normalize, is_e164 = self.normalize, _IS_E164
+        memo = {}
+        pending = {}  # e164 -> [count, last reported, spam_type]
+        conn = self.conn
+        with self._lock:
+            before = conn.execute("SELECT COUNT(*) FROM spam_reports").fetchone()[0]
+            conn.execute('''
+                CREATE TEMP TABLE IF NOT EXISTS spam_stage (
+                    phone_number TEXT PRIMARY KEY, report_count INTEGER, last_reported TEXT, spam_type TEXT
+                ) WITHOUT ROWID
+            ''')
+            try:
+                for number, spam_type, count, reported in records:
+                    stats.rows += 1
+                    e164 = number if is_e164(number) else memo.get(number, _UNSEEN)
+                    if e164 is _UNSEEN:
+                        if len(memo) >= _NORMALIZE_MEMO:
+                            memo.clear()
+                        e164 = memo[number] = normalize(number)
+                    if e164 is None:
+                        stats.invalid += 1
+                        continue
+                    stats.reports += count
+                    reported = reported or now
+                    entry = pending.get(e164)
+                    if entry is None:
+                        pending[e164] = [count, reported, spam_type]
+                        if len(pending) >= chunk_size:
+                            self._merge(pending, stats)
+                            pending = {}
+                    elif reported >= entry[1]:
+                        entry[0] += count
+                        entry[1] = reported
+                        entry[2] = spam_type or entry[2]
+                    else:
+                        entry[0] += count
+                        entry[2] = entry[2] or spam_type
+                self._merge(pending, stats)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            stats.new = conn.execute("SELECT COUNT(*) FROM spam_reports").fetchone()[0] - before
+        if self._reports is not None:
+            self.reload()
+        else:
+            self._arrays = None
+        stats.finish()
+        return stats
+
+    def _merge(self, pending, stats):
+        """Stage one chunk of aggregated reports and fold it into spam_reports"""
+        if not pending:
+            return
+        with _T_INGEST_MERGE:
+            self.conn.executemany("INSERT INTO spam_stage VALUES (?, ?, ?, ?)",
+                                  [(number, *entry) for number, entry in pending.items()])
+            # "WHERE true" stops SQLite parsing ON CONFLICT as part of the SELECT
+            self.conn.execute('''
+                INSERT INTO spam_reports (phone_number, report_count, last_reported, spam_type)
+                SELECT phone_number, report_count, last_reported, spam_type FROM spam_stage WHERE true
+                ON CONFLICT(phone_number) DO UPDATE SET
+                    report_count = report_count + excluded.report_count,
+                    spam_type = CASE WHEN excluded.last_reported >= last_reported
+                                     THEN COALESCE(excluded.spam_type, spam_type)
+                                     ELSE COALESCE(spam_type, excluded.spam_type) END,
+                    last_reported = MAX(last_reported, excluded.last_reported)
+            ''')
+            self.conn.execute("DELETE FROM spam_stage")
+        stats.numbers += len(pending)
+
+    def report_arrays(self, numbers=None):
+        """(sorted int64 keys, report counts) as NumPy arrays, for joining whole columns at once
+
+        A key is the number's digits as an integer (E.164 never starts with 0).
+        With preload on this covers every report and is cached until the
+        reports change; otherwise it covers the reported numbers among numbers.
+        """
+        import numpy as np
+
+        def build(reports):
+            pairs = sorted((int(number[1:]), count) for number, (count, _) in reports.items()
+                           if number[1:].isdigit() and len(number) <= _MAX_INT_DIGITS + 1)
+            return (np.array([key for key, _ in pairs], dtype=np.int64),
+                    np.array([count for _, count in pairs], dtype=np.int64))
+
+        if self._reports is None:
+            return build(self.lookup_many(numbers or ()))
+        with self._lock:
+            if self._arrays is None:
+                self._arrays = build(self._reports)
+            return self._arrays
+
+
+_UNSEEN = object()
+
+
+class IngestStats:
+    """Row counts and throughput of one feed load"""
+
+    def __init__(self):
+        self.rows = 0
+        self.invalid = 0
+        self.reports = 0  # report counts added
+        self.numbers = 0  # distinct numbers merged, counted per chunk
+        self.new = 0      # numbers with no reports before the load
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self.started
+
+    @property
+    def rate(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def add(self, other):
+        """Fold in the stats of another load (e.g. the next feed file)"""
+        for name in ("rows", "invalid", "reports", "numbers", "new", "seconds"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def summary(self):
+        return (f"Ingested {self.rows:,} feed rows ({self.invalid:,} unparseable) in {self.seconds:.2f}s"
+                f" - {self.rate:,.0f} rows/s\n"
+                f"{self.reports:,} reports across {self.numbers:,} numbers, {self.new:,} newly reported")
+
+
+def _open_feed(path):
+    """Text stream for a feed path ('-' = stdin, .gz decompressed)"""
+    if path == "-":
+        return sys.stdin
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def _timestamp(value):
+    """'YYYY-MM-DD HH:MM:SS' (UTC) for an ISO date/time or epoch seconds; None if missing or unreadable"""
+    if value is None or value == "":
+        return None
+    try:
+        if isinstance(value, (int, float)) or str(value).replace(".", "", 1).isdigit():
+            moment = datetime.fromtimestamp(float(value), timezone.utc)
+        else:
+            moment = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+            if moment.tzinfo is not None:
+                moment = moment.astimezone(timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        return None
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _feed_record(number, spam_type, count, reported):
+    """Clean one feed row; counts default to 1"""
+    try:
+        count = max(int(count), 0) if count not in (None, "") else 1
+    except (TypeError, ValueError):
+        count = 1
+    spam_type = (str(spam_type).strip() or None) if spam_type is not None else None
+    return str(number).strip(), spam_type, count, _timestamp(reported)
+
+
+def read_feed(path, fmt=None):
+    """Yield (number, spam_type, count, reported) records from a CSV or NDJSON spam feed
+
+    fmt is "csv" or "ndjson" (default: from the extension; .gz files are
+    decompressed). A CSV header may name any FEED_FIELDS columns; without
+    one the columns are number[,spam_type[,count[,reported]]].
+    """
+    if fmt is None:
+        name = path[:-3] if path.endswith(".gz") else path
+        fmt = "ndjson" if name.endswith((".ndjson", ".jsonl", ".json")) else "csv"
+    if fmt not in ("csv", "ndjson"):
+        raise ValueError(f"Unknown feed format: {fmt}")
+    f = _open_feed(path)
+    try:
+        if fmt == "ndjson":
+            loads = json.loads
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    row = loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(row, dict):
+                    continue
+                number, spam_type, count, reported = (next((row[k] for k in names if k in row), None)
+                                                      for names in FEED_FIELDS.values())
+                if number is not None:
+                    yield _feed_record(number, spam_type, count, reported)
+            return
+
+        reader = csv.reader(f)
+        first = next(reader, None)
+        if first is None:
+            return
+        header = [cell.strip().lower() for cell in first]
+        at = [next((header.index(name) for name in names if name in header), None)
+              for names in FEED_FIELDS.values()]
+        if at[0] is None:
+            # No header: number[,spam_type[,count[,reported]]]
+            at = [0, 1, 2, 3]
+            reader = itertools.chain([first], reader)
+        # Missing columns read a padding cell past the end of every row
+        width = max(i for i in at if i is not None) + 1
+        pick = operator.itemgetter(*(width if i is None else i for i in at))
+        pad = [""] * (width + 1)
+        for row in reader:
+            if len(row) <= width:
+                row += pad[len(row):]
+            if row[at[0]].strip():
+                yield _feed_record(*pick(row))
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def load_rules(path=None):
+    """Scoring rules from a JSON file (path or $TELEPHONY_SPAM_RULES), else DEFAULT_RULES"""
+    path = path or os.environ.get("TELEPHONY_SPAM_RULES")
+    if not path:
+        return DEFAULT_RULES
+    with open(path, encoding="utf-8") as f:
+        return validate_rules(json.load(f))
+
+
+def validate_rules(rules):
+    """Check a rule list, raising ValueError on the first bad rule"""
+    rules = tuple(dict(rule) for rule in rules)
+    for rule in rules:
+        name = rule.get("name", rule.get("feature"))
+        if rule.get("feature") not in FEATURES:
+            raise ValueError(f"Spam rule {name}: unknown feature {rule.get('feature')!r}")
+        if rule.get("op") not in _OPS:
+            raise ValueError(f"Spam rule {name}: unknown op {rule.get('op')!r}")
+        if (rule["op"] == "in") != (rule["feature"] in _CATEGORICAL):
+            raise ValueError(f"Spam rule {name}: 'in' is for carrier/country, other ops for numeric features")
+        if rule["op"] in (">=", "<") and not isinstance(rule.get("value"), (int, float)):
+            raise ValueError(f"Spam rule {name}: needs a numeric value")
+        if not isinstance(rule.get("points"), (int, float)):
+            raise ValueError(f"Spam rule {name}: needs numeric points")
+        if rule["op"] == "in":
+            rule["value"] = frozenset(str(v).lower() for v in rule.get("value", ()))
+    return rules
+
+
+class SpamScorer:
+    """Applies scoring rules to one number, or vectorized to whole columns of numbers"""
+
+    def __init__(self, store, rules=None):
+        self.store = store
+        self.rules = validate_rules(DEFAULT_RULES if rules is None else rules)
+        self._checks = [self._compile(rule) for rule in self.rules]
+
+    # ---------- one number ----------
+
+    def _compile(self, rule):
+        """fn(e164, carrier, country) -> points, for scoring one number under one rule"""
+        feature, op, points = rule["feature"], rule["op"], rule["points"]
+        if feature == "reports":
+            lookup, cap = self.store.lookup, rule.get("cap", SPAM_SCORE_MAX)
+
+            def value(e164, carrier, country):
+                found = lookup(e164)
+                return found[0] if found else 0
+            if op == "per":
+                return lambda e164, carrier, country: min(value(e164, carrier, country) * points, cap)
+        elif feature == "repeated_digits":
+            # A threshold only needs a search for a long enough run, not the longest one
+            if op in (">=", "<"):
+                run = re.compile(r"(\d)\1{%d,}" % max(int(rule["value"]) - 1, 0))
+                hit = op == ">="
+                return lambda e164, carrier, country: points if bool(run.search(e164)) == hit else 0
+
+            def value(e164, carrier, country):
+                return max((len(m.group()) for m in _DIGIT_RUN.finditer(e164)), default=0)
+        elif feature == "digits":
+            def value(e164, carrier, country):
+                return len(e164) - e164.startswith("+")
+        elif op == "in":
+            values = rule["value"]
+            if feature == "carrier":
+                return lambda e164, carrier, country: points if carrier.lower() in values else 0
+            return lambda e164, carrier, country: points if country.lower() in values else 0
+
+        if op == "per":
+            cap = rule.get("cap", SPAM_SCORE_MAX)
+            return lambda e164, carrier, country: min(value(e164, carrier, country) * points, cap)
+        threshold = rule["value"]
+        if op == ">=":
+            return lambda e164, carrier, country: points if value(e164, carrier, country) >= threshold else 0
+        return lambda e164, carrier, country: points if value(e164, carrier, country) < threshold else 0
+
+    def score_one(self, e164, carrier, country):
+        """Spam score for one E.164 number"""
+        score = 0
+        for check in self._checks:
+            score += check(e164, carrier, country)
+        return int(min(score, SPAM_SCORE_MAX))
+
+    # ---------- whole columns ----------
+
+    def score(self, numbers, carriers, countries=None):
+        """uint8 NumPy array of spam scores for columns of E.164 numbers, carriers and countries
+
+        numbers is a sequence of strings or a TextColumn; carriers and
+        countries are sequences of strings or CategoryColumns (their codes
+        are used directly, so each distinct value is tested once).
+        """
+        try:
+            import numpy as np
+        except ImportError:
+            raise RuntimeError("Vectorized spam scoring needs numpy (pip install numpy)")
+
+        with _T_SCORE_MANY:
+            digits = _digit_matrix(np, numbers)
+            n = len(digits)
+            features = {}
+
+            def feature(name):
+                if name not in features:
+                    if name == "digits":
+                        features[name] = np.count_nonzero(digits >= 0, axis=1)
+                    elif name == "repeated_digits":
+                        features[name] = _longest_runs(np, digits)
+                    elif name == "reports":
+                        features[name] = self._report_counts(np, numbers, digits)
+                    else:
+                        features[name] = _categories(np, carriers if name == "carrier" else countries, n)
+                return features[name]
+
+            score = np.zeros(n, dtype=np.int64)
+            for rule in self.rules:
+                op = rule["op"]
+                if op == "in":
+                    codes, values = feature(rule["feature"])
+                    hit = np.array([str(v).lower() in rule["value"] for v in values] + [False], dtype=bool)
+                    score += hit[codes] * rule["points"]
+                    continue
+                value = feature(rule["feature"])
+                if op == "per":
+                    score += np.minimum(value * rule["points"], rule.get("cap", SPAM_SCORE_MAX))
+                elif op == ">=":
+                    score += (value >= rule["value"]) * rule["points"]
+                else:
+                    score += (value < rule["value"]) * rule["points"]
+            return np.clip(score, 0, SPAM_SCORE_MAX).astype(np.uint8)
+
+    def _report_counts(self, np, numbers, digits):
+        """Report count per row, joined against the store's sorted keys in one search"""
+        keys, counts = self.store.report_arrays(None if self.store.preload else _strings(numbers))
+        result = np.zeros(len(digits), dtype=np.int64)
+        present = digits >= 0
+        fits = np.count_nonzero(present, axis=1) <= _MAX_INT_DIGITS
+        wide = np.flatnonzero(~fits)
+        if len(wide):
+            # Too long for an int64 key (so never valid E.164): look these up one by one
+            for i in wide:
+                found = self.store.lookup(numbers[int(i)])
+                if found:
+                    result[i] = found[0]
+        if not len(keys):
+            return result
+        width = digits.shape[1]
+        # Horner's rule across the digit columns gives each number's integer key.
+        # Digits are left-aligned, so a row with p padding columns after its last
+        # digit comes out as key * 10**p; too wide a matrix would overflow that.
+        ints = np.zeros(len(digits), dtype=np.int64)
+        if width <= _MAX_INT_DIGITS:
+            for column in np.ascontiguousarray(np.maximum(digits, 0).T):
+                ints *= 10
+                ints += column
+            padding = np.argmax(present[:, ::-1], axis=1)
+            ints //= 10 ** padding.astype(np.int64)
+        else:
+            for column in np.ascontiguousarray(digits.T):
+                np.multiply(ints, 10, out=ints, where=column >= 0)
+                np.add(ints, column, out=ints, where=column >= 0)
+        at = np.minimum(np.searchsorted(keys, ints), len(keys) - 1)
+        found = fits & (keys[at] == ints)
+        result[found] = counts[at[found]]
+        return result
+
+
+
+def _strings(numbers):
+    """A TextColumn or sequence of numbers as a list of strings"""
+    if hasattr(numbers, "ends"):
+        return [numbers[i] for i in range(len(numbers))]
+    return list(numbers)
+
+
+def _digit_matrix(np, numbers):
+    """(rows, width) int8 matrix of each number's digits, left-aligned, -1 for padding and '+'"""
+    if hasattr(numbers, "ends"):  # TextColumn: scatter its packed bytes straight into the matrix
+        ends = np.frombuffer(numbers.ends, dtype=np.uint64).astype(np.int64)
+        starts = np.concatenate(([0], ends[:-1]))
+        lengths = ends - starts
+        width = int(lengths.max()) if len(lengths) else 1
+        data = np.frombuffer(bytes(numbers.data), dtype=np.uint8)
+        rows = np.repeat(np.arange(len(ends)), lengths)
+        chars = np.zeros((len(ends), width), dtype=np.uint8)
+        chars[rows, np.arange(len(data)) - np.repeat(starts, lengths)] = data
+    else:
+        encoded = np.array(list(numbers), dtype=np.bytes_)
+        if encoded.dtype.itemsize == 0:
+            encoded = encoded.astype("S1")
+        chars = encoded.view(np.uint8).reshape(len(encoded), encoded.dtype.itemsize)
+    digits = chars.astype(np.int8) - 48
+    digits[(chars < 48) | (chars > 57)] = -1
+    return digits
+
+
+def _longest_runs(np, digits):
+    """Length of the longest run of one repeated digit in each row"""
+    n, width = digits.shape
+    if not width:
+        return np.zeros(n, dtype=np.int64)
+    same = np.ascontiguousarray(((digits[:, 1:] == digits[:, :-1]) & (digits[:, 1:] >= 0)).T)
+    run = np.zeros(n, dtype=np.int8)
+    best = np.zeros(n, dtype=np.int8)
+    for column in same:
+        run += 1
+        run *= column  # a break in the run resets it to 0
+        np.maximum(best, run, out=best)
+    return np.where((digits >= 0).any(axis=1), best.astype(np.int64) + 1, 0)
+
+
+def _categories(np, column, n):
+    """(codes, distinct values) for a CategoryColumn or a sequence of strings; None -> code len(values)"""
+    if column is None:
+        return np.zeros(n, dtype=np.int64), []
+    if hasattr(column, "codes"):
+        return np.frombuffer(column.codes, dtype=np.uint32).astype(np.int64), list(column.values)
+    values = list(dict.fromkeys(column))
+    index = {value: code for code, value in enumerate(values)}
+    return np.fromiter(map(index.__getitem__, column), dtype=np.int64, count=n), values
@@ -0,0 +1,185 @@
+"""Tk widgets for the Telephony Intelligence Suite GUI."""
+import re
+import heapq
+import tkinter as tk
+from tkinter import ttk
+from array import array
+
+_NUMERIC = re.compile(r'\s*(-?\d+(?:\.\d+)?)')
+
+
+def sort_key(value):
+    """Numbers (including '7/10' style scores) sort numerically, everything else as text"""
+    if isinstance(value, (int, float)):
+        return (0, value, "")
+    m = _NUMERIC.match(str(value))
+    if m:
+        return (0, float(m.group(1)), str(value))
+    return (1, 0, str(value).lower())
+
+
+class VirtualGrid(tk.Frame):
+    """Treeview that only holds widgets for the visible window of rows
+
+    The source is any object with len() and source[i] -> tuple of column
+    values. Sorting and filtering rearrange an index array over the source;
+    scrolling just rewrites the values of the few visible Treeview items.
+    A source may also offer sort_keys(col, key) -> per-row keys and
+    matcher(text) -> row predicate (see telephony_columns.ColumnView), so
+    sorting and filtering read single columns instead of whole rows.
+    """
+
+    def __init__(self, master, columns, source=(), column_width=120, **kw):
+        super().__init__(master, **kw)
+        self.columns = tuple(columns)
+        self.source = source
+        self.view = None  # array of source indexes, None = identity
+        self._seen = 0  # source rows already folded into the view
+        self.offset = 0
+        self.sort_column = None
+        self.sort_reverse = False
+        self.filter_text = ""
+
+        self.tree = ttk.Treeview(self, columns=self.columns, show="headings", selectmode="browse")
+        for col in self.columns:
+            self.tree.heading(col, text=col, command=lambda c=col: self.sort_by(c))
+            self.tree.column(col, width=column_width)
+        self.tree.pack(side="left", fill="both", expand=True)
+
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.items = []
+        self.tree.bind("<Configure>", lambda e: self.resize())
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self.on_wheel)
+        self.tree.bind("<Up>", lambda e: self.scroll(-1) or "break")
+        self.tree.bind("<Down>", lambda e: self.scroll(1) or "break")
+        self.tree.bind("<Prior>", lambda e: self.scroll(-len(self.items)) or "break")
+        self.tree.bind("<Next>", lambda e: self.scroll(len(self.items)) or "break")
+
+    # ---------- data ----------
+
+    def set_source(self, source):
+        """Show a new source, keeping the current sort and filter"""
+        self.source = source
+        self.offset = 0
+        self.rebuild_view()
+
+    def __len__(self):
+        return len(self.source) if self.view is None else len(self.view)
+
+    def refresh(self):
+        """Pick up rows appended to the source since the last call"""
+        if self.view is not None:
+            matches = self._matcher()
+            new = [i for i in range(self._seen, len(self.source)) if matches(i)]
+            self._seen = len(self.source)
+            if new and self.sort_column is None:
+                self.view.extend(new)
+            elif new:
+                # Merge the sorted newcomers in linearly instead of re-sorting everything
+                key = self._key()
+                new.sort(key=key, reverse=self.sort_reverse)
+                self.view = array('L', heapq.merge(self.view, new, key=key, reverse=self.sort_reverse))
+        self.render()
+
+    def rebuild_view(self):
+        """Recompute the index array from the current sort column and filter"""
+        n = len(self.source)
+        self._seen = n
+        if self.sort_column is None and not self.filter_text:
+            self.view = None
+        else:
+            indexes = range(n)
+            if self.filter_text:
+                indexes = list(filter(self._matcher(), indexes))
+            if self.sort_column is not None:
+                indexes = sorted(indexes, key=self._key(), reverse=self.sort_reverse)
+            self.view = array('L', indexes)
+        self.render()
+
+    def _key(self):
+        """Sort key on a source index for the sort column"""
+        col = self.columns.index(self.sort_column)
+        source = self.source
+        if hasattr(source, "sort_keys"):
+            return source.sort_keys(col, sort_key).__getitem__
+        return lambda i: sort_key(source[i][col])
+
+    def _matcher(self):
+        """Filter predicate on a source index"""
+        text = self.filter_text
+        source = self.source
+        if not text:
+            return lambda i: True
+        if hasattr(source, "matcher"):
+            return source.matcher(text)
+        return lambda i: any(text in str(value).lower() for value in source[i])
+
+    def sort_by(self, column):
+        """Sort on a column; clicking the same heading again reverses the order"""
+        if self.sort_column == column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column, self.sort_reverse = column, False
+        for col in self.columns:
+            arrow = (" ▼" if self.sort_reverse else " ▲") if col == column else ""
+            self.tree.heading(col, text=col + arrow)
+        self.rebuild_view()
+
+    def set_filter(self, text):
+        """Only show rows where some column contains text (case-insensitive)"""
+        self.filter_text = text.strip().lower()
+        self.offset = 0
+        self.rebuild_view()
+
+    def row(self, position):
+        """Values of the row at a position in the current view"""
+        index = position if self.view is None else self.view[position]
+        return self.source[index]
+
+    # ---------- rendering ----------
+
+    def resize(self):
+        """Match the number of Treeview items to the rows that fit on screen"""
+        style = ttk.Style(self)
+        row_height = int(style.lookup("Treeview", "rowheight") or 20)
+        visible = max(1, (self.tree.winfo_height() - row_height) // row_height)
+        while len(self.items) < visible:
+            self.items.append(self.tree.insert("", "end", values=()))
+        while len(self.items) > visible:
+            self.tree.delete(self.items.pop())
+        self.render()
+
+    def render(self):
+        total = len(self)
+        visible = len(self.items)
+        self.offset = max(0, min(self.offset, total - visible))
+        for k, iid in enumerate(self.items):
+            position = self.offset + k
+            self.tree.item(iid, values=self.row(position) if position < total else ())
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + visible) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def scroll(self, rows):
+        self.offset += rows
+        self.render()
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.offset = int(float(amount) * len(self))
+        elif unit == "pages":
+            self.offset += int(amount) * len(self.items)
+        else:
+            self.offset += int(amount)
+        self.render()
+
+    def on_wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.scroll(-3)
+        else:
+            self.scroll(3)
+        return "break"
@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telephony_engine import TelephonyEngine  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def clean_env(monkeypatch):
+    """Keep the developer's TELEPHONY_* settings out of the tests, and the tests off the network"""
+    for name in ("TELEPHONY_REGIONS", "TELEPHONY_PREFIXES", "TELEPHONY_SPAM_RULES"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("TELEPHONY_OFFLINE", "1")
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "telephony.db")
+
+
+@pytest.fixture
+def engine(db_path):
+    engine = TelephonyEngine(db_path, cache_size=0)
+    yield engine
+    engine.close()
@@ -0,0 +1,121 @@
+import csv
+import time
+import itertools
+import threading
+
+import pytest
+
+from telephony_batch import enrich_parallel, buffered, run_pipeline, BatchRunner
+
+NUMBERS = ["+14155550123", "+919876543210", "garbage", "+442079460958", "+4915123456789",
+           "(415) 555-0123", "+61212345678", "", "+12025550143", "+33612345678", "+918765432109"]
+
+
+def test_pool_keeps_input_order(engine, db_path):
+    records = list(enrich_parallel(NUMBERS, workers=2, chunk_size=3, db_path=db_path, cache_size=0))
+    assert records == [engine.get_number_details(number) for number in NUMBERS]
+
+
+def test_pool_consumes_input_lazily(db_path):
+    # Two chunks per worker are read ahead; an endless input must not be drained
+    endless = itertools.cycle(NUMBERS[:2])
+    records = enrich_parallel(endless, workers=2, chunk_size=2, db_path=db_path)
+    first = list(itertools.islice(records, 5))
+    records.close()
+    assert [record.e164 for record in first] == ["+14155550123", "+919876543210"] * 2 + ["+14155550123"]
+
+
+def test_buffered_applies_backpressure():
+    produced = []
+
+    def numbers():
+        for i in range(100):
+            produced.append(i)
+            yield i
+
+    stage = buffered(numbers(), maxsize=2)
+    assert next(stage) == 0
+    time.sleep(0.3)
+    # One taken, two queued and one blocked in put
+    assert len(produced) <= 4
+    assert list(stage) == list(range(1, 100))
+
+
+def test_buffered_reraises_upstream_errors_and_closes_upstream():
+    closed = threading.Event()
+
+    def failing():
+        yield 1
+        raise ValueError("bad line")
+
+    def endless():
+        try:
+            yield from itertools.count()
+        finally:
+            closed.set()
+
+    with pytest.raises(ValueError, match="bad line"):
+        list(buffered(failing(), maxsize=2))
+    stage = buffered(endless(), maxsize=2)
+    next(stage)
+    stage.close()
+    assert closed.wait(5)
+
+
+def test_pipeline_streams_a_file_to_csv(db_path, tmp_path):
+    source = tmp_path / "numbers.txt"
+    source.write_text("\n".join(NUMBERS) + "\n", encoding="utf-8")
+    output = tmp_path / "out.csv"
+    stats = run_pipeline(str(source), str(output), workers=1, buffer_size=2, db_path=db_path, cache_size=0)
+    assert (stats.total, stats.failed) == (9, 1)  # the blank line is skipped
+    with open(output, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 9
+    assert (rows[0]["Input"], rows[0]["Country"]) == ("+14155550123", "United States")
+
+
+def drain(runner):
+    """Every row the runner posted, once it has posted its final None"""
+    rows = []
+    for batch in iter(lambda: runner.results.get(timeout=60), None):
+        rows.extend(batch)
+    return rows
+
+
+def test_runner_posts_rows_and_reports_progress(db_path, tmp_path):
+    source = tmp_path / "numbers.txt"
+    lines = [number for number in NUMBERS if number]
+    source.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    runner = BatchRunner(str(source), workers=1, db_path=db_path, post_size=4, cache_size=0)
+    runner.start()
+    rows = drain(runner)
+    assert runner.join(10) and runner.error is None
+    assert [number for number, _ in rows] == lines
+    progress = runner.progress()
+    assert (progress["rows"], progress["fraction"], progress["eta"]) == (10, 1.0, 0)
+
+
+def test_cancel_stops_at_the_next_record_and_closes_the_exporter(db_path, tmp_path):
+    source = tmp_path / "numbers.txt"
+    source.write_text("".join(f"+1415555{i:04d}\n" for i in range(5000)), encoding="utf-8")
+
+    class Exporter:
+        written = 0
+        closed = False
+
+        def write(self, record, number):
+            self.written += 1
+            if self.written == 10:
+                runner.cancel()
+
+        def close(self):
+            self.closed = True
+
+    exporter = Exporter()
+    runner = BatchRunner(str(source), workers=1, db_path=db_path, post_size=3, exporter=exporter, cache_size=0)
+    runner.start()
+    rows = drain(runner)
+    assert runner.join(10) and runner.cancelled
+    assert len(rows) == runner.rows == exporter.written == 10
+    assert exporter.closed
+    assert runner.progress()["fraction"] < 1.0
@@ -0,0 +1,41 @@
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import bench  # noqa: E402
+from synthetic import parse_size, generate_numbers  # noqa: E402
+
+
+def test_parse_size():
+    assert [parse_size(s) for s in ("250", "1k", "1.5K", "2m")] == [250, 1000, 1500, 2000000]
+
+
+def test_datasets_are_seeded_and_repeat_numbers():
+    numbers = generate_numbers(1000, seed=3, duplicate_rate=0.3)
+    assert numbers == generate_numbers(1000, seed=3, duplicate_rate=0.3)
+    assert numbers != generate_numbers(1000, seed=4, duplicate_rate=0.3)
+    assert len(numbers) == 1000 and len(set(numbers)) <= 700
+
+
+def test_compare_flags_throughput_and_memory_regressions():
+    baseline = {"a": {"rows_per_sec": 1000, "peak_rss_mb": 100}, "b": {"rows_per_sec": 1000, "peak_rss_mb": 100}}
+    results = {"a": {"rows_per_sec": 800, "peak_rss_mb": 130}, "b": {"rows_per_sec": 700, "peak_rss_mb": 200},
+               "new": {"rows_per_sec": 1}}
+    regressions = bench.compare(results, baseline, tolerance=0.25)
+    assert len(regressions) == 2 and all(line.startswith("b:") for line in regressions)
+
+
+def test_suite_runs_and_checks_against_a_baseline(tmp_path, capsys):
+    baseline = str(tmp_path / "baseline.json")
+    args = ["--sizes", "40", "--spam-sizes", "0", "--only", "detect_region,spam_score_many",
+            "--workdir", str(tmp_path), "--baseline", baseline]
+    assert bench.main(args + ["--save-baseline"]) == 0
+    with open(baseline, encoding="utf-8") as f:
+        saved = json.load(f)
+    assert set(saved) == {"detect_region/40", "spam_score_many/40/spam0"}
+    assert saved["detect_region/40"]["rows"] == 40
+
+    assert bench.main(args + ["--check", "--tolerance", "1000"]) == 0
+    assert "No regressions" in capsys.readouterr().err
@@ -0,0 +1,56 @@
+import time
+
+from telephony_cache import ResultCache
+from telephony_engine import TelephonyEngine
+
+
+def test_prefix_info_on_a_cache_hit_is_cached_as_a_copy(db_path):
+    engine = TelephonyEngine(db_path, persist_cache=True)
+    plain = engine.enrich("+14155550123", advanced=False)
+    assert plain.prefix_info is None
+
+    engine.prefix_info = True
+    with_prefix = engine.enrich("+14155550123", advanced=False)
+    assert with_prefix.prefix_info is not None
+    assert plain.prefix_info is None  # the record first handed out is unchanged
+    assert engine.cache.get("+14155550123", False) is with_prefix
+    engine.close()
+
+    # The persistent tier holds the record with the prefix analysis too
+    engine = TelephonyEngine(db_path, persist_cache=True)
+    assert engine.cache.get("+14155550123", False) == with_prefix
+    engine.close()
+
+
+def test_lru_evicts_the_least_recently_used():
+    cache = ResultCache(maxsize=2)
+    for e164 in ("+1", "+2"):
+        cache.put(e164, False, e164)
+    cache.get("+1", False)
+    cache.put("+3", False, "+3")
+    assert cache.get("+2", False) is None
+    assert (cache.get("+1", False), cache.get("+3", False)) == ("+1", "+3")
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    cache = ResultCache(ttl=10)
+    cache.put("+1", False, "record")
+    now[0] += 9
+    assert cache.get("+1", False) == "record"
+    now[0] += 2
+    assert cache.get("+1", False) is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_spellings_share_an_entry_and_spam_reports_invalidate_it(db_path):
+    engine = TelephonyEngine(db_path)
+    first = engine.enrich("+44 20 7946 0958", advanced=False)
+    assert engine.enrich("0044 20 7946 0958", advanced=False) is first
+    engine.report_spam("+442079460958")
+    again = engine.enrich("+442079460958", advanced=False)
+    assert again.spam_score > first.spam_score
+    assert engine.cache.stats()["hits"] == 1
+    engine.close()
@@ -0,0 +1,28 @@
+import os
+import sys
+import json
+import subprocess
+
+from telephony_cli import main, build_parser, SERVICE_OPTIONS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_leaves_the_service_stack_unloaded():
+    code = ("import sys, json, telephony_cli; "
+            "print(json.dumps([m for m in ('telephony_service', 'asyncio', 'concurrent.futures') if m in sys.modules]))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert json.loads(out.stdout) == []
+
+
+def test_serve_options_default_to_the_service():
+    args = build_parser().parse_args(["serve", "--port", "0"])
+    assert {name: getattr(args, name) for name in SERVICE_OPTIONS} == {
+        "host": None, "port": 0, "chunk_size": None, "max_pending": None, "max_connections": None}
+
+
+def test_lookup_prints_one_json_object_per_number(db_path, capsys):
+    assert main(["--db", db_path, "lookup", "+14155550123", "garbage"]) == 1
+    out, err = capsys.readouterr()
+    assert [json.loads(line)["Country"] for line in out.splitlines()] == ["United States"]
+    assert "Could not parse number: garbage" in err
@@ -0,0 +1,69 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+from telephony_columns import BatchStore, BatchStats
+from telephony_widgets import sort_key
+
+NUMBERS = ["+14155550123", "+919876543210", "+442079460958", "+4915123456789", "+14155550123",
+           "+442071234567", "+61212345678", "+12025550143", "+918765432109", "+33612345678"]
+FIELDS = ("international", "country", "carrier", "valid", "spam_score", "number_type")
+
+
+@pytest.fixture
+def store(engine):
+    store = BatchStore()
+    for number in NUMBERS:
+        store.add(engine.get_number_details(number), number)
+    store.add(None)
+    return store
+
+
+def test_sort_keys_order_rows_like_the_display_values(store):
+    view = store.view(FIELDS)
+    for col in range(len(FIELDS)):
+        keys = view.sort_keys(col, sort_key)
+        fast = sorted(range(len(view)), key=keys.__getitem__)
+        slow = sorted(range(len(view)), key=lambda i: sort_key(view[i][col]))
+        assert [view[i][col] for i in fast] == [view[i][col] for i in slow]
+
+
+def test_sort_keys_cover_rows_added_later(engine, store):
+    view = store.view(FIELDS)
+    assert len(view.sort_keys(0, sort_key)) == 10
+    store.add(engine.get_number_details("+12025550199"))
+    assert len(view.sort_keys(0, sort_key)) == len(view.sort_keys(1, sort_key)) == 11
+
+
+@pytest.mark.parametrize("text", ["united", "+44", "0123+91", "true", "10", "mobile", "nothing like it"])
+def test_matcher_agrees_with_the_display_rows(store, text):
+    view = store.view(FIELDS)
+    matches = view.matcher(text)
+    assert [i for i in range(len(view)) if matches(i)] == \
+        [i for i in range(len(view)) if any(text in str(value).lower() for value in view[i])]
+
+
+def test_aggregates(store):
+    assert (store.total, store.failed) == (10, 1)
+    assert store.valid == sum(store.record(i).valid for i in range(10))
+    assert dict(store.top("country", 2))["United States"] == 3
+    assert sum(store.spam_histogram) == 10
+    assert [record.e164 for record in store.records()] == NUMBERS
+    assert next(store.rows()) == ("+14155550123", store.record(0))
+
+
+def test_summary_matches_row_at_a_time_stats(store):
+    stats = BatchStats()
+    for record in store.records():
+        stats.add(record)
+    stats.add(None)
+    assert store.summary() == stats.summary()
+
+
+def test_import_does_not_load_the_batch_pipeline():
+    code = "import sys, telephony_columns; print('telephony_batch' in sys.modules)"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
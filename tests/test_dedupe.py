@@ -0,0 +1,38 @@
+from telephony_batch import enrich_unique, DedupeStats
+
+ROWS = ["+91 98765 43210", "+14155550123", "0091 98765 43210", "garbage", "098765 43210",
+        "+14155550123", "(415) 555-0123", "+91 98765 43210"]
+
+
+def test_fan_out_keeps_input_order_and_spelling(db_path):
+    dedupe = DedupeStats()
+    rows = list(enrich_unique(ROWS, 1, db_path=db_path, dedupe=dedupe, cache_size=0))
+    assert [number for number, _ in rows] == ROWS
+    e164 = [record.e164 if record else None for _, record in rows]
+    assert e164 == ["+919876543210", "+14155550123", "+919876543210", None, "+919876543210",
+                    "+14155550123", "+14155550123", "+919876543210"]
+    # Every spelling of a number shares one record
+    assert rows[0][1] is rows[2][1] is rows[4][1] is rows[7][1]
+    assert (dedupe.rows, dedupe.unique, dedupe.repeated, dedupe.respelled) == (8, 2, 2, 3)
+
+
+def test_matches_enriching_every_row(engine, db_path):
+    rows = list(enrich_unique(ROWS, 1, chunk_size=2, db_path=db_path, cache_size=0))
+    assert [record for _, record in rows] == [engine.get_number_details(n) for n in ROWS]
+
+
+def test_forgotten_numbers_are_enriched_again(db_path):
+    dedupe = DedupeStats()
+    rows = list(enrich_unique(ROWS, 1, db_path=db_path, dedupe=dedupe, memo_size=1, cache_size=0))
+    assert [record.e164 if record else None for _, record in rows][:3] == \
+        ["+919876543210", "+14155550123", "+919876543210"]
+    assert dedupe.unique > 2
+
+
+def test_pool_matches_single_process(db_path):
+    single, pooled = DedupeStats(), DedupeStats()
+    expected = list(enrich_unique(ROWS, 1, db_path=db_path, dedupe=single))
+    rows = list(enrich_unique(ROWS, 2, chunk_size=2, db_path=db_path, dedupe=pooled))
+    assert rows == expected
+    assert rows[0][1] is rows[2][1] is rows[4][1] is rows[7][1]
+    assert vars(pooled) == vars(single)
@@ -0,0 +1,28 @@
+import logging
+
+
+def test_region_detection_errors_are_logged(engine, caplog, monkeypatch):
+    def broken(number):
+        raise RuntimeError("corrupt metadata")
+
+    monkeypatch.setattr(engine.region_index, "resolve", broken)
+    with caplog.at_level(logging.ERROR, logger="telephony_engine"):
+        assert engine.detect_region_from_number("+14155550123") == engine.region_index.default_region
+    assert "corrupt metadata" in caplog.text
+
+
+def test_national_and_international_spellings_enrich_alike(engine):
+    national = engine.get_number_details("(415) 555-0123")
+    international = engine.get_number_details("+1 415 555 0123", advanced=True)
+    assert national.e164 == international.e164 == "+14155550123"
+    assert (national.country, national.region_code, national.calling_code) == ("United States", "US", 1)
+    assert not national.advanced and international.advanced
+    assert engine.get_number_details("not a number") is None
+
+
+def test_lookups_are_saved_to_history(engine):
+    record = engine.get_number_details("+442079460958")
+    engine.save_to_history("+442079460958", record)
+    rows, cursor = engine.history_page()
+    assert [row[2:5] for row in rows] == [("+442079460958", "United Kingdom", record.carrier)]
+    assert cursor is None
@@ -0,0 +1,47 @@
+import csv
+import gzip
+import json
+import sys
+
+import pytest
+
+from telephony_export import Exporter, open_exporter
+
+
+def test_exporter_needs_write_chunk(tmp_path):
+    class Incomplete(Exporter):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete(str(tmp_path / "out.txt"))
+
+
+def test_columns_and_formats(engine, tmp_path):
+    record = engine.get_number_details("+14155550123")
+    records = [record, None, record]
+    with open_exporter(str(tmp_path / "out.csv"), columns=["e164", "valid"]) as exporter:
+        exporter.write_many(records)
+    with open(tmp_path / "out.csv", newline="", encoding="utf-8") as f:
+        assert list(csv.reader(f)) == [["E.164", "Valid"], ["+14155550123", "True"], ["+14155550123", "True"]]
+    with open_exporter(str(tmp_path / "out.jsonl.gz"), columns=["country", "e164"]) as exporter:
+        exporter.write_many(records)
+    with gzip.open(tmp_path / "out.jsonl.gz", "rt", encoding="utf-8") as f:
+        assert [json.loads(line) for line in f][0] == {"Country": "United States", "E.164": "+14155550123"}
+
+
+def test_input_column(engine, tmp_path):
+    record = engine.get_number_details("+14155550123")
+    rows = [("(415) 555-0123", record), ("junk", None), ("+1 415 555 0123", record)]
+    with open_exporter(str(tmp_path / "out.csv"), columns=["input", "e164"]) as exporter:
+        exporter.write_rows(rows)
+    with open(tmp_path / "out.csv", newline="", encoding="utf-8") as f:
+        assert list(csv.reader(f)) == [["Input", "E.164"], ["(415) 555-0123", "+14155550123"],
+                                       ["+1 415 555 0123", "+14155550123"]]
+
+
+@pytest.mark.parametrize("name, module", [("out.arrow", "pyarrow"), ("out.csv.zst", "zstandard")])
+def test_missing_dependency_leaves_no_file(tmp_path, monkeypatch, name, module):
+    monkeypatch.setitem(sys.modules, module, None)  # makes the import fail
+    with pytest.raises(RuntimeError):
+        open_exporter(str(tmp_path / name))
+    assert not (tmp_path / name).exists()
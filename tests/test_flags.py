@@ -0,0 +1,60 @@
+import io
+import threading
+
+import pytest
+
+from telephony_flags import FlagCache
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def png(size=(320, 200), color=(200, 0, 0, 255)):
+    buf = io.BytesIO()
+    Image.new("RGBA", size, color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+@pytest.fixture
+def bundle(tmp_path):
+    bundle = tmp_path / "bundle"
+    bundle.mkdir()
+    (bundle / "GB.png").write_bytes(png())
+    (bundle / "in.png").write_bytes(png(color=(255, 153, 51, 255)))
+    (bundle / "notes.txt").write_text("not a flag")
+    return bundle
+
+
+def test_environment_keeps_the_cache_offline(tmp_path):
+    assert FlagCache(str(tmp_path / "cache")).offline
+    assert not FlagCache(str(tmp_path / "cache"), offline=False).offline
+
+
+def test_prewarm_resizes_the_bundle_onto_disk(tmp_path, bundle):
+    flags = FlagCache(str(tmp_path / "cache"), size=(60, 40))
+    assert flags.prewarm(bundle_dir=str(bundle)) == 2
+    assert Image.open(io.BytesIO(flags.cached("GB"))).size == (60, 40)
+
+    # A new cache (e.g. the next start) serves the same bytes from disk
+    again = FlagCache(str(tmp_path / "cache"), size=(60, 40))
+    assert again.cached("gb") is None
+    assert again.get("GB") == flags.get("gb")
+    assert again.fetches == 0
+
+
+def test_misses_are_fetched_once_and_remembered(tmp_path, monkeypatch):
+    flags = FlagCache(str(tmp_path / "cache"))
+    calls = []
+    release = threading.Event()
+
+    def fetch(code):
+        calls.append(code)
+        release.wait(5)
+        return None
+
+    monkeypatch.setattr(flags, "_fetch", fetch)
+    futures = [flags.get_async("FR") for _ in range(3)]
+    release.set()
+    assert [future.result(5) for future in futures] == [None] * 3
+    assert flags.get("fr") is None
+    assert calls == ["fr"]
+    assert flags.get("not a code") is None
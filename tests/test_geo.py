@@ -0,0 +1,61 @@
+import logging
+
+import pytest
+
+from telephony_geo import GeoResolver, location_query, place_query
+
+
+@pytest.fixture
+def geo(db_path):
+    geo = GeoResolver(db_path, min_interval=0)
+    yield geo
+    geo.close()
+
+
+def test_gazetteer_logs_failures_and_retries_them_on_rerun(geo, caplog, monkeypatch):
+    answers = {"London, United Kingdom": (51.5, -0.12)}
+
+    def geocode(query):
+        if query not in answers:
+            raise OSError("timed out")
+        return answers[query]
+
+    monkeypatch.setattr(geo, "_geocode", geocode)
+    queries = ["London, United Kingdom", "Paris, France"]
+    with caplog.at_level(logging.WARNING, logger="telephony_geo"):
+        geo.build_gazetteer(queries)
+    assert "Paris, France" in caplog.text and "timed out" in caplog.text
+    assert geo.cached("London, United Kingdom") and not geo.cached("Paris, France")
+
+    answers["Paris, France"] = (48.85, 2.35)
+    assert geo.build_gazetteer(queries) == 1
+    assert geo.resolve("Paris, France") == (48.85, 2.35)
+
+
+def test_offline_lookups_only_answer_from_the_cache(db_path, tmp_path):
+    gazetteer = tmp_path / "gazetteer.csv"
+    gazetteer.write_text('query,latitude,longitude\n"London, United Kingdom",51.5,-0.12\n"Atlantis, Nowhere",,\n',
+                         encoding="utf-8")
+    geo = GeoResolver(db_path)  # TELEPHONY_OFFLINE is set for the tests
+    assert geo.offline
+    assert geo.import_csv(str(gazetteer)) == 2
+    assert geo.resolve("London, United Kingdom") == (51.5, -0.12)
+    assert geo.cached("Atlantis, Nowhere") and geo.resolve("Atlantis, Nowhere") is None
+    assert not geo.cached("Paris, France") and geo.resolve("Paris, France") is None
+    assert geo.resolve_async("London, United Kingdom").result(5) == (51.5, -0.12)
+
+    exported = tmp_path / "exported.csv"
+    assert geo.export_csv(str(exported)) == 2
+    geo.close()
+
+    # The cache lives in the database; the export round-trips to another host
+    geo = GeoResolver(str(tmp_path / "other.db"))
+    geo.import_csv(str(exported))
+    assert geo.resolve("London, United Kingdom") == (51.5, -0.12)
+    geo.close()
+
+
+def test_location_queries_use_the_most_specific_known_place(engine):
+    assert location_query(engine.get_number_details("+14155550123")) == "San Francisco, United States"
+    assert place_query("Unknown", "Bavaria", "Germany") == "Bavaria, Germany"
+    assert place_query("Unknown", "Unknown", "Unknown") is None
@@ -0,0 +1,45 @@
+import threading
+
+from telephony_history import HistoryWriter
+
+
+def test_flush_racing_close_returns(engine, db_path):
+    for _ in range(50):
+        writer = HistoryWriter(db_path, flush_interval=0.01)
+        flusher = threading.Thread(target=writer.flush)
+        flusher.start()
+        writer.close()
+        flusher.join(5)
+        assert not flusher.is_alive()
+        writer.flush()  # after close: returns at once
+
+
+def test_close_writes_everything_queued(engine, db_path):
+    record = engine.get_number_details("+14155550123")
+    writer = HistoryWriter(db_path)
+    for _ in range(1200):
+        writer.record(record.international, record)
+    writer.close()
+    assert writer.written == 1200
+
+
+def test_failed_writes_are_retried_then_counted(engine, db_path, caplog):
+    record = engine.get_number_details("+14155550123")
+    writer = HistoryWriter(str(db_path) + ".empty", flush_interval=0.01)  # no lookup_history table
+    for _ in range(3):
+        writer.record(record.international, record)
+    assert writer.flush(5) is False
+    assert (writer.written, writer.dropped) == (0, 3)
+    assert writer.close() is False
+    messages = [r.getMessage() for r in caplog.records if r.name == "telephony_history"]
+    assert any("retrying 3 rows" in m for m in messages)
+    assert any("dropping 3 rows" in m for m in messages)
+
+
+def test_flush_and_close_report_success(engine, db_path):
+    record = engine.get_number_details("+14155550123")
+    writer = HistoryWriter(db_path)
+    writer.record(record.international, record)
+    assert writer.flush(5) is True
+    assert writer.close() is True
+    assert (writer.written, writer.dropped) == (1, 0)
@@ -0,0 +1,55 @@
+import sqlite3
+
+from telephony_history import HistoryReader
+
+
+def fill(db_path):
+    conn = sqlite3.connect(db_path)
+    rows = []
+    for i in range(57):
+        # Several rows per second, so pages have to break ties on id
+        rows.append((f"2024-03-{1 + i // 20:02d} 12:00:{i // 3:02d}", f"+1415555{i:04d}",
+                     "United States" if i % 2 else "India", "Verizon" if i % 3 else "Jio", 1, i % 10, "{}"))
+    conn.executemany("INSERT INTO lookup_history (timestamp, phone_number, country, carrier, valid, spam_score, data) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    return conn
+
+
+def all_pages(reader, **filters):
+    seen, cursor = [], None
+    while True:
+        rows, cursor = reader.page(cursor, limit=10, **filters)
+        seen += rows
+        if cursor is None:
+            return seen
+
+
+def test_pages_cover_every_row_once_newest_first(engine, db_path):
+    conn = fill(db_path)
+    reader = HistoryReader(conn)
+    rows = all_pages(reader)
+    ids = [row[0] for row in rows]
+    assert len(ids) == len(set(ids)) == 57
+    assert [(r[1], r[0]) for r in rows] == sorted(((r[1], r[0]) for r in rows), reverse=True)
+
+
+def test_filters(engine, db_path):
+    reader = HistoryReader(fill(db_path))
+    assert {r[3] for r in all_pages(reader, country="India")} == {"India"}
+    assert len(all_pages(reader, country="India", carrier="Jio")) == 10
+    numbers = {r[2] for r in all_pages(reader, number="+1415555001*")}
+    assert numbers == {f"+1415555{i:04d}" for i in range(10, 20)}
+    assert [r[2] for r in all_pages(reader, number="+14155550001")] == ["+14155550001"]
+    assert len(all_pages(reader, until="2024-03-01")) == 20
+    assert len(all_pages(reader, since="2024-03-03")) == 17
+
+
+def test_deep_pages_seek_the_index(engine, db_path):
+    conn = fill(db_path)
+    reader = HistoryReader(conn)
+    cursor = reader.page(limit=10)[1]
+    for filters in ({}, {"country": "India"}, {"carrier": "Jio"}, {"since": "2024-03-02"}):
+        sql, params = reader._query(cursor, 10, **filters)
+        plan = " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+        assert "SEARCH" in plan and "SCAN" not in plan, plan
@@ -0,0 +1,120 @@
+import os
+
+import pytest
+
+from telephony_batch import create_job, run_job, run_pipeline, enrich_unique
+from telephony_jobs import JobStore, read_numbers_from
+
+NUMBERS = ["+14155550123", "+44 20 7946 0958", "not a number", "+14155550123", "+8613812345678",
+           "+919876543210", "", "+33612345678", "00442079460958", "+5511987654321"] * 5
+
+
+@pytest.fixture
+def input_path(tmp_path):
+    path = tmp_path / "numbers.txt"
+    path.write_text("\n".join(NUMBERS) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def reference(input_path, db_path, tmp_path):
+    out = str(tmp_path / "reference.csv")
+    run_pipeline(input_path, out, workers=1, db_path=db_path, cache_size=0)
+    with open(out, encoding="utf-8") as f:
+        return f.read()
+
+
+def interrupt(db_path, job, rows):
+    """Consume a job for a few rows, checkpointing every row, then stop it"""
+    jobs = JobStore(db_path)
+    try:
+        stream = jobs.run(job, lambda numbers: enrich_unique(numbers, 1, db_path=db_path, cache_size=0), every=1)
+        for _ in range(rows):
+            next(stream)
+        stream.close()
+        return jobs.get(job)
+    finally:
+        jobs.close()
+
+
+def test_read_numbers_from_offsets(input_path):
+    offsets = []
+    lines = list(read_numbers_from(input_path, 0, offsets))
+    assert lines == [n for n in NUMBERS if n]
+    # Reading from any saved offset continues with the next line
+    rest = list(read_numbers_from(input_path, offsets[4]))
+    assert rest == lines[5:]
+    assert offsets[-1] == os.path.getsize(input_path)
+
+
+def test_resume_matches_uninterrupted_run(input_path, db_path, tmp_path):
+    want = reference(input_path, db_path, tmp_path)
+    out = str(tmp_path / "job.csv")
+    job = create_job(db_path, input_path, out, workers=1, cache_size=0)
+
+    paused = interrupt(db_path, job, 17)
+    assert paused.status == "paused"
+    assert paused.rows == 17
+    assert 0 < paused.offset < os.path.getsize(input_path)
+
+    run_job(job, db_path)
+    with open(out, encoding="utf-8") as f:
+        assert f.read() == want
+    jobs = JobStore(db_path)
+    try:
+        done = jobs.get(job)
+        assert (done.status, done.rows) == ("done", len([n for n in NUMBERS if n]))
+    finally:
+        jobs.close()
+
+
+def test_finished_job_is_not_resumed(input_path, db_path, tmp_path):
+    out = str(tmp_path / "job.csv")
+    job = create_job(db_path, input_path, out, workers=1, cache_size=0)
+    run_job(job, db_path)
+    os.remove(out)
+    with pytest.raises(ValueError, match="done"):
+        run_job(job, db_path)
+    assert not os.path.exists(out)
+
+
+def test_changed_input_is_not_resumed(input_path, db_path, tmp_path):
+    job = create_job(db_path, input_path, str(tmp_path / "job.csv"), workers=1, cache_size=0)
+    interrupt(db_path, job, 3)
+    with open(input_path, "a", encoding="utf-8") as f:
+        f.write("+12125550100\n")
+    with pytest.raises(ValueError, match="changed"):
+        run_job(job, db_path)
+
+
+def test_job_without_output_needs_the_gui(input_path, db_path):
+    # GUI batches that were not streamed to a file have no output path
+    job = create_job(db_path, input_path, None, history=False)
+    with pytest.raises(ValueError, match="no output file"):
+        run_job(job, db_path)
+
+
+def test_job_with_partial_options_resumes(input_path, db_path, tmp_path):
+    """Jobs stored with only some settings fall back to the defaults"""
+    want = reference(input_path, db_path, tmp_path)
+    out = str(tmp_path / "job.csv")
+    jobs = JobStore(db_path)
+    try:
+        job = jobs.create(input_path, out, {"history": False})
+    finally:
+        jobs.close()
+    run_job(job, db_path)
+    with open(out, encoding="utf-8") as f:
+        assert f.read() == want
+
+
+def test_discard(input_path, db_path, tmp_path):
+    job = create_job(db_path, input_path, str(tmp_path / "job.csv"), workers=1, cache_size=0)
+    interrupt(db_path, job, 5)
+    jobs = JobStore(db_path)
+    try:
+        jobs.discard(job)
+        with pytest.raises(KeyError):
+            jobs.get(job)
+        assert list(jobs.results(job)) == []
+    finally:
+        jobs.close()
@@ -0,0 +1,74 @@
+import re
+import json
+
+import pytest
+
+from telephony_cli import main
+from telephony_metrics import Metrics, METRICS, BUCKETS
+
+
+@pytest.fixture
+def global_metrics():
+    """Leave the process-wide registry as the test found it"""
+    enabled = METRICS.enabled
+    METRICS.reset()
+    yield METRICS
+    METRICS.enable(enabled)
+    METRICS.reset()
+
+
+def test_disabled_timers_record_nothing():
+    metrics = Metrics(enabled=False)
+    with metrics.timer("stage"):
+        pass
+    metrics.counter("events").inc()
+    assert metrics.timer("stage").count == 0 and metrics.counter("events").value == 0
+
+
+def test_percentiles_come_from_the_buckets():
+    metrics = Metrics(enabled=True)
+    timer = metrics.timer("stage")
+    timer.observe(3000, count=98)  # 3µs
+    timer.observe(2_000_000, count=2)  # 2ms
+    assert timer.percentile(0.5) == 5e-6
+    assert timer.percentile(0.99) == 2.5e-3
+    assert timer.max_ns == 2_000_000
+    assert metrics.rows()[0][:2] == ("stage", 100)
+
+
+def test_drain_and_merge_carry_worker_metrics():
+    worker, parent = Metrics(enabled=True), Metrics(enabled=True)
+    worker.timer("chunk").observe(1000, count=3)
+    worker.counter("rows").inc(5)
+    parent.timer("chunk").observe(1000)
+    parent.merge(json.loads(json.dumps(worker.drain())))
+    assert parent.timer("chunk").count == 4 and parent.counter("rows").value == 5
+    assert worker.timer("chunk").count == 0 and worker.drain() == {"timers": {}, "counters": {}}
+
+
+def test_prometheus_exposition():
+    metrics = Metrics(enabled=True)
+    metrics.timer("carrier").observe(3000, count=2)
+    metrics.counter("parse_errors").inc()
+    metrics.gauge("cache_size", lambda: 7)
+    metrics.gauge("broken", lambda: 1 / 0)
+    text = metrics.to_prometheus()
+    buckets = re.findall(r'telephony_stage_seconds_bucket\{stage="carrier",le="([^"]+)"\} (\d+)', text)
+    assert len(buckets) == len(BUCKETS) + 1
+    assert buckets[-1] == ("+Inf", "2") and dict(buckets)["1e-06"] == "0" and dict(buckets)["5e-06"] == "2"
+    assert 'telephony_stage_seconds_count{stage="carrier"} 2\n' in text
+    assert "# TYPE telephony_parse_errors_total counter\ntelephony_parse_errors_total 1\n" in text
+    assert "telephony_cache_size 7\n" in text and "broken" not in text
+
+
+@pytest.mark.parametrize("name", ["metrics.json", "metrics.prom"])
+def test_cli_writes_stage_timings(db_path, tmp_path, capsys, global_metrics, name):
+    path = str(tmp_path / name)
+    assert main(["--db", db_path, "--metrics", path, "lookup", "+14155550123"]) == 0
+    with open(path, encoding="utf-8") as f:
+        data = f.read()
+    if name.endswith(".json"):
+        timers = json.loads(data)["timers"]
+        assert timers["resolve"]["count"] == 1 and timers["build_record"]["count"] == 1
+    else:
+        assert 'telephony_stage_seconds_count{stage="resolve"} 1\n' in data
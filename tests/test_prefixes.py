@@ -0,0 +1,60 @@
+import os
+
+import phonenumbers
+import pytest
+from phonenumbers import carrier
+from phonenumbers.geocoder import GEOCODE_DATA, GEOCODE_LONGEST_PREFIX
+from phonenumbers.prefix import _prefix_description_for_number
+
+from telephony_prefixes import PrefixIndex, compile_index, prefix_index
+
+
+@pytest.fixture(scope="module")
+def index_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("prefixes") / "telephony_prefixes.idx")
+    compile_index(path)
+    return path
+
+
+@pytest.fixture(scope="module")
+def index(index_path):
+    return PrefixIndex(index_path)
+
+
+@pytest.mark.parametrize("e164", ["+14155550123", "+442079460958", "+8613812345678", "+919876543210",
+                                  "+33612345678", "+5511987654321"])
+def test_matches_phonenumbers(index, e164):
+    num = phonenumbers.parse(e164)
+    place_len, place_id, carrier_len, carrier_id = index.match(e164[1:])
+    # The raw prefix lookup, without geocoder's fallback to the country name
+    place = _prefix_description_for_number(GEOCODE_DATA, GEOCODE_LONGEST_PREFIX, num, "en")
+    assert (index.label(place_id) if place_id >= 0 else "") == place
+    assert (index.label(carrier_id) if carrier_id >= 0 else "") == carrier.name_for_number(num, "en")
+
+
+def test_describe(index):
+    assert index.describe("+14155550123", "1") == "Prefix +1 41555: San Francisco, CA"
+
+
+@pytest.mark.parametrize("text", ["+1 415-555-0123", "(415) 555-0123", "1-415", "1x4155550123"])
+def test_match_stops_at_non_digits(index, text):
+    digits = text.lstrip("+")
+    end = next((i for i, ch in enumerate(digits) if not ch.isdigit()), len(digits))
+    assert index.match(digits) == index.match(digits[:end])
+
+
+def test_user_table_overrides(tmp_path):
+    table = tmp_path / "prefixes.csv"
+    table.write_text("prefix,description,carrier\n+1 415 555,Test Exchange,Test Carrier\n", encoding="utf-8")
+    path = str(tmp_path / "telephony_prefixes.idx")
+    index = prefix_index(path, str(table))
+    assert index.describe("+14155550123", "1") == \
+        "Prefix +1 415555: Test Exchange; Carrier block +1 415555: Test Carrier"
+
+
+def test_stale_index_is_rejected(index_path, tmp_path):
+    table = tmp_path / "prefixes.csv"
+    table.write_text("+44 20,London (test)\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        PrefixIndex(index_path, str(table))
+    assert os.path.exists(index_path)
@@ -0,0 +1,37 @@
+import json
+import pickle
+
+from telephony_record import NumberRecord, LABELS
+
+
+def test_fields_keep_native_types(engine):
+    record = engine.get_number_details("+442079460958")
+    assert (record.calling_code, record.valid, record.region_code) == (44, True, "GB")
+    assert isinstance(record.spam_score, int) and isinstance(record.timezones, tuple)
+    assert not hasattr(record, "__dict__")
+
+
+def test_display_formats_only_at_the_edge(engine):
+    basic = engine.get_number_details("+442079460958")
+    shown = basic.display()
+    assert list(shown) == [label for attr, label in LABELS.items() if attr not in
+                           ("portability", "prefix_info", "social_media")]
+    assert (shown["Country Code"], shown["Valid"], shown["Network Type"]) == ("+44", "True", "Fixed line")
+    assert shown["Spam Score"] == f"{basic.spam_score}/10"
+    advanced = engine.get_number_details("+442079460958", advanced=True)
+    assert advanced.advanced and "Portability Status" in advanced.display()
+
+
+def test_json_and_pickle_round_trip(engine):
+    record = engine.get_number_details("+14155550123", advanced=True)
+    assert NumberRecord.from_json(record.to_json()) == record
+    assert pickle.loads(pickle.dumps(record)) == record
+    # Data cached by older versions (detail dicts) is not mistaken for a record
+    assert NumberRecord.from_json(json.dumps({"Country": "United States"})) is None
+
+
+def test_replace_copies(engine):
+    record = engine.get_number_details("+14155550123")
+    changed = record.replace(prefix_info="Prefix +1 415")
+    assert changed.prefix_info == "Prefix +1 415" and record.prefix_info is None
+    assert changed.replace(prefix_info=None) == record
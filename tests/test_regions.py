@@ -0,0 +1,64 @@
+import phonenumbers
+import pytest
+from phonenumbers import NumberParseException
+
+from telephony_regions import RegionIndex, RegionDetector, region_name
+
+
+@pytest.mark.parametrize("number, region, e164", [
+    ("+442079460958", "GB", "+442079460958"),
+    ("00919876543210", "IN", "+919876543210"),
+    ("09876543210", "IN", "+919876543210"),
+    ("(415) 555-0123", "US", "+14155550123"),
+    ("442079460958", "GB", "+442079460958"),  # calling code without the +
+    ("+1 604 596 1480", "CA", "+16045961480"),
+])
+def test_resolve_parses_once_into_the_right_region(number, region, e164):
+    found, num = RegionIndex().resolve(number)
+    assert found == region
+    assert phonenumbers.format_number(num, phonenumbers.PhoneNumberFormat.E164) == e164
+
+
+def test_candidate_regions_are_tried_in_priority_order(monkeypatch):
+    assert RegionIndex(["GB", "IN"]).resolve("020 7946 0958")[0] == "GB"
+    assert RegionIndex(["IN", "GB"]).resolve("020 7946 0958")[0] == "IN"
+    monkeypatch.setenv("TELEPHONY_REGIONS", "gb, in")
+    index = RegionIndex()
+    assert (index.regions, index.default_region) == (("GB", "IN"), "GB")
+
+
+def test_unmatched_national_numbers_fall_back_to_the_default_region():
+    index = RegionIndex(["JP", "GB"])
+    assert index.resolve("555")[0] == "JP"
+    with pytest.raises(NumberParseException):
+        index.resolve("garbage")
+
+
+def test_region_name():
+    assert region_name("GB") == "United Kingdom"
+    assert region_name("XK") == "Kosovo"
+    assert region_name("ZZ") == "ZZ"
+
+
+@pytest.mark.parametrize("typed", ["+44 20 7946 0958", "09876543210", "+1 604 596 1480", "0049 151 23456789",
+                                   "(415) 555-0123"])
+def test_incremental_detection_matches_detecting_from_scratch(typed):
+    index = RegionIndex()
+    detector = RegionDetector(index)
+    # Type it, then delete it again character by character
+    ends = list(range(1, len(typed) + 1))
+    for end in ends + ends[::-1]:
+        text = typed[:end]
+        assert detector.detect(text) == RegionDetector(index).detect(text), text
+
+
+def test_detection_while_typing():
+    detector = RegionDetector()
+    assert detector.quick("+4") is None and detector.detect("+4") == ((), False)
+    assert detector.quick("+44") == "GB"
+    assert detector.detect("+44") == (("GB", "GG", "IM", "JE"), False)
+    assert detector.quick("+44 2") is None  # calling code unchanged since the last detect()
+    assert detector.detect("+44 2079460958") == (("GB", "GG", "IM", "JE"), True)
+    assert detector.detect("09876543210") == (("IN", "DE", "BR"), True)
+    # Deleting a digit starts over instead of keeping the narrowed candidates
+    assert detector.detect("0987654321") == (("DE", "FR", "JP"), True)
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from telephony_service import EnrichmentService, ServiceClient, ServiceError
+
+
+@pytest.fixture(scope="module")
+def service(tmp_path_factory):
+    service = EnrichmentService(port=0, workers=1, db_path=str(tmp_path_factory.mktemp("service") / "t.db"))
+    url = service.start_in_thread().result(60)
+    client = ServiceClient(url)
+    yield service, client
+    client.close()
+    service.stop_thread()
+
+
+def run(service, coroutine):
+    return asyncio.run_coroutine_threadsafe(coroutine, service._loop).result(30)
+
+
+def test_lookup_keeps_the_spelling_and_rejects_garbage(service):
+    service, client = service
+    result = client.lookup("(415) 555-0123", advanced=False)
+    assert result["number"] == "(415) 555-0123"
+    assert result["e164"] == "+14155550123"
+    assert client.lookup("garbage", advanced=False) == {"number": "garbage", "error": "Could not parse number"}
+    assert [r.get("e164") for r in client.bulk(["+14155550123", "junk"])] == ["+14155550123", None]
+
+
+def test_concurrent_spellings_share_one_worker_call(service):
+    service, client = service
+    sent = []
+    run_chunk = service._run_chunk
+
+    async def recording(numbers, advanced):
+        sent.append(list(numbers))
+        return await run_chunk(numbers, advanced)
+
+    async def lookups():
+        service._run_chunk = recording
+        try:
+            return await asyncio.gather(*(service.lookup(n) for n in
+                                          ("+1 415 555 0123", "(415) 555-0123", "+14155550123")))
+        finally:
+            del service._run_chunk
+
+    results = run(service, lookups())
+    assert sent == [["+14155550123"]]
+    assert len(set(results)) == 1
+
+
+def test_unexpected_errors_get_a_500(service, caplog):
+    service, client = service
+
+    async def broken(*args):
+        raise RuntimeError("boom")
+
+    service._route = broken
+    try:
+        with pytest.raises(ServiceError) as error:
+            client.health()
+        assert error.value.status == 500
+    finally:
+        del service._route
+    assert any("Service error" in r.getMessage() for r in caplog.records)
+    assert client.health()["status"] == "ok"
+
+
+def test_backlog_past_max_pending_is_refused_with_503(service, monkeypatch):
+    service, client = service
+    monkeypatch.setattr(service, "max_pending", 0)
+    status, body = client.request("GET", "/v1/lookup?number=%2B14155550123")
+    assert status == 503 and b"Overloaded" in body
+    monkeypatch.undo()
+    assert client.lookup("+14155550123")["e164"] == "+14155550123"
+
+
+def test_oversized_bodies_get_a_413(service, monkeypatch):
+    service, client = service
+    monkeypatch.setattr(service, "max_body", 16)
+    with pytest.raises(ServiceError) as error:
+        client.bulk(["+14155550123"] * 10)
+    assert error.value.status == 413
@@ -0,0 +1,67 @@
+import json
+import random
+
+import pytest
+
+from telephony_engine import TelephonyEngine
+from telephony_spam import SpamScorer, validate_rules, load_rules
+
+np = pytest.importorskip("numpy")
+
+CARRIERS = ["Verizon", "Unknown", "voip", "", "Vodafone UK", "China Mobile"]
+COUNTRIES = ["United States", "India", "United Kingdom", "China"]
+
+
+def sample_numbers(seed=0, count=400):
+    rng = random.Random(seed)
+    numbers = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.2:
+            digit = str(rng.randint(0, 9))
+            numbers.append("+1" + digit * rng.randint(6, 10))
+        elif kind < 0.3:
+            numbers.append("+" + str(rng.randint(1, 99999)))  # short
+        elif kind < 0.35:
+            numbers.append("+" + "9" * 19)  # longer than an int64 key
+        else:
+            numbers.append("+1415" + "".join(rng.choice("0123456789") for _ in range(7)))
+    return numbers
+
+
+@pytest.fixture(params=[True, False], ids=["preload", "queries"])
+def reported_engine(request, db_path):
+    engine = TelephonyEngine(db_path, cache_size=0, preload_spam=request.param)
+    for number in sample_numbers()[::7] + ["+" + "9" * 19]:
+        for _ in range(random.Random(number).randint(1, 4)):
+            engine.spam.add_report(number, "Scam")
+    yield engine
+    engine.close()
+
+
+def test_vector_scores_match_scalar(reported_engine):
+    numbers = sample_numbers()
+    carriers = [CARRIERS[i % len(CARRIERS)] for i in range(len(numbers))]
+    countries = [COUNTRIES[i % len(COUNTRIES)] for i in range(len(numbers))]
+    scorer = reported_engine.scorer
+    scores = scorer.score(numbers, carriers, countries)
+    assert scores.dtype == np.uint8
+    assert scores.tolist() == [scorer.score_one(n, c, k) for n, c, k in zip(numbers, carriers, countries)]
+
+
+def test_custom_rules(reported_engine, tmp_path):
+    rules = [{"name": "china", "feature": "country", "op": "in", "value": ["china"], "points": 5},
+             {"name": "long", "feature": "digits", "op": ">=", "value": 12, "points": 3}]
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(rules), encoding="utf-8")
+    scorer = SpamScorer(reported_engine.spam, load_rules(str(path)))
+    assert scorer.score_one("+8613812345678", "China Mobile", "China") == 8
+    assert scorer.score(["+8613812345678", "+14155550123"], ["", ""], ["China", "United States"]).tolist() == [8, 0]
+
+
+@pytest.mark.parametrize("rule", [{"feature": "nope", "op": ">=", "value": 1, "points": 1},
+                                  {"feature": "digits", "op": "~", "value": 1, "points": 1},
+                                  {"feature": "digits", "op": ">=", "points": 1}])
+def test_invalid_rules(rule):
+    with pytest.raises(ValueError):
+        validate_rules([rule])
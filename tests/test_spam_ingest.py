@@ -0,0 +1,83 @@
+import json
+import random
+import sqlite3
+
+import pytest
+
+from telephony_engine import TelephonyEngine
+from telephony_spam import read_feed
+
+
+def reports(engine):
+    return {number: (count, last, spam_type) for number, count, last, spam_type in engine.conn.execute(
+        "SELECT phone_number, report_count, last_reported, spam_type FROM spam_reports")}
+
+
+def test_ingest_csv_upserts(engine, tmp_path):
+    engine.report_spam("+442079460958", "Robocall")
+    feed = tmp_path / "feed.csv"
+    feed.write_text("phone,category,count,timestamp\n"
+                    "+44 20 7946 0958,Scam,3,2030-01-01T00:00:00Z\n"
+                    "00442079460958,,2,2020-01-01\n"
+                    "not a number,Scam,1,\n"
+                    "+14155550123,Telemarketing,,1700000000\n"
+                    "+14155550123,Fraud,1,1600000000\n", encoding="utf-8")
+    stats = engine.ingest_spam_feed(str(feed))
+    assert (stats.rows, stats.invalid, stats.reports, stats.new) == (5, 1, 7, 1)
+    got = reports(engine)
+    assert got["+442079460958"] == (6, "2030-01-01 00:00:00", "Scam")
+    assert got["+14155550123"] == (2, "2023-11-14 22:13:20", "Telemarketing")
+    # The in-memory reports were swapped for the loaded ones
+    assert engine.spam.lookup("+442079460958")[0] == 6
+
+
+def test_ingest_ndjson_and_headerless_csv(engine, tmp_path):
+    ndjson = tmp_path / "feed.ndjson"
+    ndjson.write_text(json.dumps({"number": "+14155550123", "type": "Scam", "reports": 4}) + "\n"
+                      "not json\n[1, 2]\n", encoding="utf-8")
+    plain = tmp_path / "feed.txt"
+    plain.write_text("+14155550123\n+14155550123,Robocall\n", encoding="utf-8")
+    assert list(read_feed(str(plain), "csv")) == [("+14155550123", None, 1, None),
+                                                  ("+14155550123", "Robocall", 1, None)]
+    engine.ingest_spam_feed(str(ndjson))
+    engine.ingest_spam_feed(str(plain), "csv")
+    count, _, spam_type = reports(engine)["+14155550123"]
+    assert (count, spam_type) == (6, "Robocall")
+
+
+def test_ingest_chunks_agree(engine, tmp_path):
+    rng = random.Random(3)
+    records = [(f"+1415555{rng.randint(0, 300):04d}", rng.choice(["Scam", None]), rng.randint(1, 3),
+                f"2024-01-{rng.randint(1, 28):02d} 00:00:00") for _ in range(2000)]
+    engine.spam.ingest(iter(records), chunk_size=37)
+    want = {}
+    for number, _, count, _ in records:
+        want[number] = want.get(number, 0) + count
+    assert {n: c for n, (c, _, _) in reports(engine).items()} == want
+
+
+def test_ingest_rolls_back_on_error(engine):
+    def broken():
+        yield "+14155550123", "Scam", 1, None
+        raise RuntimeError("feed went away")
+
+    with pytest.raises(RuntimeError):
+        engine.spam.ingest(broken(), chunk_size=1)
+    assert reports(engine) == {}
+
+
+def test_duplicate_rows_fold_into_one(db_path):
+    TelephonyEngine(db_path).close()
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP INDEX idx_spam_reports_number")
+    conn.executemany("INSERT INTO spam_reports (phone_number, report_count, last_reported, spam_type) "
+                     "VALUES (?, ?, ?, ?)", [("+14155550123", 2, "2024-01-01 00:00:00", "Scam"),
+                                             ("+14155550123", 3, "2024-02-01 00:00:00", None),
+                                             ("(415) 555-0123", 1, "2023-01-01 00:00:00", "Old")])
+    conn.commit()
+    conn.close()
+    engine = TelephonyEngine(db_path)
+    try:
+        assert reports(engine) == {"+14155550123": (6, "2024-02-01 00:00:00", "Scam")}
+    finally:
+        engine.close()
@@ -0,0 +1,58 @@
+import sqlite3
+
+import pytest
+
+from telephony_engine import TelephonyEngine
+
+LEGACY_ROWS = [
+    ("+14155550123", 2, "Scam", "2024-01-01 10:00:00"),
+    ("(415) 555-0123", 1, "Robocall", "2024-02-01 10:00:00"),
+    ("0044 20 7946 0958", 3, None, "2024-01-01 10:00:00"),
+    ("+44 20 7946 0958", 1, "Telemarketing", "2023-01-01 10:00:00"),
+    ("garbage", 1, None, "2024-01-01 10:00:00"),
+]
+
+
+@pytest.fixture
+def legacy_db(db_path):
+    """A database written before reports were normalized: mixed spellings, one row per report"""
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        CREATE TABLE spam_reports (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            phone_number TEXT,
+            report_count INTEGER DEFAULT 1,
+            last_reported DATETIME DEFAULT CURRENT_TIMESTAMP,
+            spam_type TEXT
+        )
+    ''')
+    conn.execute("CREATE INDEX idx_spam_reports_phone ON spam_reports(phone_number)")
+    conn.executemany("INSERT INTO spam_reports (phone_number, report_count, spam_type, last_reported) "
+                     "VALUES (?, ?, ?, ?)", LEGACY_ROWS)
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+@pytest.mark.parametrize("preload", [True, False], ids=["preload", "queries"])
+def test_legacy_reports_are_normalized_and_folded(legacy_db, preload):
+    engine = TelephonyEngine(legacy_db, cache_size=0, preload_spam=preload)
+    assert engine.spam.lookup("+14155550123") == (3, "Robocall")
+    assert engine.spam.lookup("+442079460958") == (4, "Telemarketing")
+    assert engine.spam.lookup("+19999999999") is None
+    assert engine.spam.lookup_many(["+14155550123", "+19999999999", "+442079460958"]) == {
+        "+14155550123": (3, "Robocall"), "+442079460958": (4, "Telemarketing")}
+    # Unparseable rows are kept as they were
+    assert engine.conn.execute("SELECT COUNT(*) FROM spam_reports").fetchone()[0] == 3
+    engine.close()
+
+
+def test_reports_are_counted_on_one_indexed_row(engine):
+    for _ in range(3):
+        engine.report_spam("(415) 555-0123")
+    assert engine.spam.lookup("+14155550123") == (3, None)
+    plan = engine.conn.execute("EXPLAIN QUERY PLAN SELECT report_count FROM spam_reports "
+                               "WHERE phone_number = ?", ("+14155550123",)).fetchall()
+    assert "idx_spam_reports_number" in plan[0][-1]
+    engine.spam.reload()
+    assert engine.spam.lookup("+14155550123") == (3, None)
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import startup  # noqa: E402
+
+
+@pytest.mark.parametrize("module", sorted(startup.IMPORTS))
+def test_cold_import_stays_off_the_banned_modules(module, tmp_path):
+    run = startup.run_child(startup.IMPORT_CHILD.format(module=module), str(tmp_path))
+    assert startup.forbidden_imports(run["modules"], startup.IMPORTS[module]) == []
+
+
+def test_budget_check():
+    assert startup.forbidden_imports(["asyncio", "asyncio.events", "asyncios", "json"], ("asyncio",)) == \
+        ["asyncio", "asyncio.events"]
+    budget = {"import:a": 100, "import:b": 100}
+    overruns = startup.over_budget({"import:a": 120, "import:b": 130, "import:c": 999}, budget, 0.25)
+    assert overruns == ["import:b: 130 ms, budget 100 ms (+25%)"]
@@ -0,0 +1,43 @@
+import pytest
+
+tk = pytest.importorskip("tkinter")
+
+from telephony_widgets import VirtualGrid, sort_key  # noqa: E402
+
+
+@pytest.fixture
+def root():
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("no display")
+    yield root
+    root.destroy()
+
+
+def shown(grid):
+    return [grid.row(i) for i in range(len(grid))]
+
+
+def test_sort_key_orders_numbers_numerically():
+    values = ["10/10", "Unknown", 2.5, "9/10", "-1", "abc"]
+    assert sorted(values, key=sort_key) == ["-1", 2.5, "9/10", "10/10", "abc", "Unknown"]
+
+
+def test_grid_sorts_filters_and_merges_new_rows(root):
+    rows = [(3, "c"), (10, "ab"), (1, "b")]
+    grid = VirtualGrid(root, ("n", "name"), source=rows)
+    grid.sort_by("n")
+    assert shown(grid) == [(1, "b"), (3, "c"), (10, "ab")]
+    grid.set_filter(" B ")
+    assert shown(grid) == [(1, "b"), (10, "ab")]
+
+    rows.append((5, "bb"))
+    rows.append((7, "x"))
+    grid.refresh()
+    assert shown(grid) == [(1, "b"), (5, "bb"), (10, "ab")]
+
+    grid.sort_by("n")  # same heading again: descending
+    assert shown(grid) == [(10, "ab"), (5, "bb"), (1, "b")]
+    grid.set_filter("")
+    assert shown(grid) == [(10, "ab"), (7, "x"), (5, "bb"), (3, "c"), (1, "b")]